@@ -1,15 +1,17 @@
 import re
 import weakref
+from bisect import bisect_right
 from AppKit import NSTextView, NSColor, NSFont, NSMiniControlSize, NSOnState, NSOffState, NSFontAttributeName, \
-    NSIntersectsRect, NSRulerView, NSNotificationCenter, NSNotFound, NSFontNameAttribute, NSString, NSTextStorageDidProcessEditingNotification, \
-    NSNumberFormatter, NSNumber, NSFocusRingTypeNone, NSUnionRect
+    NSRulerView, NSNotificationCenter, NSString, NSTextStorageDidProcessEditingNotification, \
+    NSNumberFormatter, NSNumber, NSFocusRingTypeNone, NSTextStorageEditedCharacters, NSTextViewDidChangeSelectionNotification
 from objc import super
 import vanilla
 from vanilla.vanillaTextEditor import VanillaTextEditorDelegate
 from objc import python_method
 from defconAppKit.controls.placardScrollView import DefconAppKitPlacardNSScrollView, PlacardPopUpButton
 from defconAppKit.windows.popUpWindow import InteractivePopUpWindow
-from defconAppKit.tools.featureTextTools import breakFeatureTextIntoRuns, findBlockOpenLineStarts
+from defconAppKit.tools.featureTextTools import FeatureTextHighlighter
+from defconAppKit.tools.featureTextSymbolIndex import FeatureTextSymbolIndex
 
 
 # -------------------
@@ -94,15 +96,13 @@ class DefconAppKitFeatureTextView(NSTextView):
     def _jumpToLineInterfaceCallback_(self, lineNumber):
         self.jumpToLine_(lineNumber)
 
+    def getLineOffsets(self):
+        vanillaWrapper = self.vanillaWrapper()
+        return vanillaWrapper.getLineOffsets()
+
     def jumpToLine_(self, lineNumber):
         lineNumber -= 1
-        text = self.string()
-        lines = text.splitlines()
-        if lineNumber > len(lines):
-            lineStart = len(text)
-        else:
-            precedingLines = lines[:lineNumber]
-            lineStart = len(u"\n".join(precedingLines)) + 1
+        lineStart = self.getLineOffsets().getOffsetForLine(lineNumber)
         self.setSelectedRange_((lineStart, 0))
         self.scrollRangeToVisible_((lineStart, 0))
 
@@ -143,6 +143,11 @@ class DefconAppKitFeatureTextEditorDelegate(VanillaTextEditorDelegate):
     def textViewDidChangeSelection_(self, notification):
         self.vanillaWrapper()._selectionChangedCallback()
 
+    def symbolIndexChanged_(self, sender):
+        vanillaWrapper = self.vanillaWrapper()
+        if vanillaWrapper is not None:
+            vanillaWrapper._updatePopUp()
+
 
 # ----------------------
 # Jump To Line Interface
@@ -205,9 +210,7 @@ class DefconAppKitLineNumberView(NSRulerView):
 
     def init(self):
         self = super(DefconAppKitLineNumberView, self).init()
-        self._existingText = None
-        self._existingClientViewWidth = None
-        self._lineRects = []
+        self._labelWidths = {}
         return self
 
     def dealloc(self):
@@ -215,75 +218,74 @@ class DefconAppKitLineNumberView(NSRulerView):
         notificationCenter.removeObserver_(self)
         super(DefconAppKitLineNumberView, self).dealloc()
 
+    @python_method
+    def _getLabelWidth(self, label):
+        width = self._labelWidths.get(label)
+        if width is None:
+            # don't let the cache grow with the line count
+            if len(self._labelWidths) > 1000:
+                self._labelWidths.clear()
+            text = NSString.stringWithString_(label)
+            width, height = text.sizeWithAttributes_({NSFontAttributeName : rulerFont})
+            self._labelWidths[label] = width
+        return width
+
+    @python_method
+    def _getNumberedLineCount(self, lineOffsets):
+        count = lineOffsets.getLineCount()
+        # an empty last line is not numbered
+        if count > 1 and lineOffsets.getOffsetForLine(count - 1) == lineOffsets.getTextLength():
+            count -= 1
+        return count
+
     def requiredThickness(self):
-        count = len(self._lineRects)
-        count = NSString.stringWithString_(str(count))
-        width, height = count.sizeWithAttributes_({NSFontNameAttribute : rulerFont})
+        clientView = self.clientView()
+        count = 1
+        if clientView is not None and clientView.vanillaWrapper() is not None:
+            count = self._getNumberedLineCount(clientView.getLineOffsets())
+        # the widest label has as many digits as the line count
+        width = self._getLabelWidth("8" * len(str(count)))
         return width + 10
 
-    def _updateRects(self):
+    def drawHashMarksAndLabelsInRect_(self, rect):
         clientView = self.clientView()
-        clientFrame = clientView.frame()
-        if clientFrame[1][0] == 0 or clientFrame[1][1] == 0:
+        if clientView.vanillaWrapper() is None:
+            return
+        lineOffsets = clientView.getLineOffsets()
+        textLength = lineOffsets.getTextLength()
+        if not textLength:
             return
-        text = clientView.string()
-        attributedString = clientView.attributedString()
-        font = clientView.font()
-        pointSize = font.pointSize()
         layoutManager = clientView.layoutManager()
         textContainer = clientView.textContainer()
-        previousLineBottom = 0
-        lineStart = 0
-        lineRects = []
-        for index, line in enumerate(text.splitlines()):
-            index += 1
-            lineLength = len(line)
-            rectArray, rectCount = layoutManager.rectArrayForCharacterRange_withinSelectedCharacterRange_inTextContainer_rectCount_(
-                (lineStart, lineLength), (NSNotFound, 0), textContainer, None
-            )
-            # make sure that the first rect has a width
-            if rectArray[0].size[0] == 0:
-                (x, y), (w, h) = rectArray[0]
-                w = 1
-                rectArray = [((x, y), (w, h))] + list(rectArray[1:])
-            # merge the rects
-            rect = rectArray[0]
-            for otherRect in rectArray[1:]:
-                rect = NSUnionRect(rect, otherRect)
-            # store
-            lineRects.append((index, rect))
-            # offset for next line
-            lineStart += lineLength + 1
-            previousLineBottom = rect[0][1] + rect[1][1]
-        self._lineRects = lineRects
-        self._existingText = text
-        self._existingClientViewWidth = clientFrame.size[0]
-
-    def drawHashMarksAndLabelsInRect_(self, rect):
-        clientView = self.clientView()
-        visibleRect = clientView.visibleRect()
-        visibleYMin = visibleRect[0][1]
+        containerOriginX, containerOriginY = clientView.textContainerOrigin()
+        # only the lines in the visible rect are laid out
+        (x, y), (w, h) = clientView.visibleRect()
+        containerRect = ((x - containerOriginX, y - containerOriginY), (w, h))
+        glyphRange = layoutManager.glyphRangeForBoundingRect_inTextContainer_(containerRect, textContainer)
+        characterRange, actualGlyphRange = layoutManager.characterRangeForGlyphRange_actualGlyphRange_(glyphRange, None)
+        characterStart, characterLength = characterRange
+        firstLine = lineOffsets.getLineForOffset(characterStart)
+        lastLine = lineOffsets.getLineForOffset(characterStart + characterLength)
         rulerWidth = self.frame().size[0]
         attributes = {NSFontAttributeName : rulerFont}
-        for index, lineRect in self._lineRects:
-            if not NSIntersectsRect(visibleRect, lineRect):
-                continue
-            text = NSString.stringWithString_(str(index))
-            textWidth, textHeight = text.sizeWithAttributes_(attributes)
-            (xMin, yMin), (w, h) = lineRect
-            y = yMin - visibleYMin
+        for lineNumber in range(firstLine, lastLine + 1):
+            lineStart = lineOffsets.getOffsetForLine(lineNumber)
+            # an empty last line is not numbered
+            if lineStart >= textLength:
+                break
+            glyphIndex = layoutManager.glyphIndexForCharacterAtIndex_(lineStart)
+            lineRect, lineGlyphRange = layoutManager.lineFragmentRectForGlyphAtIndex_effectiveRange_(glyphIndex, None)
+            label = str(lineNumber + 1)
+            textWidth = self._getLabelWidth(label)
             x = rulerWidth - textWidth - 5
+            y = self.convertPoint_fromView_((0, lineRect[0][1] + containerOriginY), clientView)[1]
+            text = NSString.stringWithString_(label)
             text.drawAtPoint_withAttributes_((x, y), attributes)
 
     def clientViewSelectionChanged_(self, notification):
-        clientView = self.clientView()
-        # look to see if the rects need to be recalculated
-        text = clientView.string()
-        if text != self._existingText or clientView.frame().size[0] != self._existingClientViewWidth:
-            self._updateRects()
-            requiredThickness = self.requiredThickness()
-            if requiredThickness != self.ruleThickness():
-                self.setRuleThickness_(requiredThickness)
+        requiredThickness = self.requiredThickness()
+        if requiredThickness != self.ruleThickness():
+            self.setRuleThickness_(requiredThickness)
         self.setNeedsDisplay_(True)
 
 
@@ -306,17 +308,6 @@ class FeatureTextEditor(vanilla.TextEditor):
         font = NSFont.fontWithName_size_("Monaco", 10)
         self._textView.setFont_(font)
         self._textView.setUsesFindPanel_(True)
-        ## line numbers
-        #ruler = DefconAppKitLineNumberView.alloc().init()
-        #ruler.setClientView_(self._textView)
-        #self._nsObject.setVerticalRulerView_(ruler)
-        #self._nsObject.setHasHorizontalRuler_(False)
-        #self._nsObject.setHasVerticalRuler_(True)
-        #self._nsObject.setRulersVisible_(True)
-        #notificationCenter = NSNotificationCenter.defaultCenter()
-        #notificationCenter.addObserver_selector_name_object_(
-        #    ruler, "clientViewSelectionChanged:", NSTextViewDidChangeSelectionNotification, self._textView
-        #)
         # colors
         self._mainColor = NSColor.blackColor()
         self._commentColor = NSColor.colorWithCalibratedWhite_alpha_(.6, 1)
@@ -329,23 +320,43 @@ class FeatureTextEditor(vanilla.TextEditor):
         placardW = 65
         placardH = 16
         self._placardJumps = []
+        self._placardJumpStarts = []
         self._placard = vanilla.Group((0, 0, placardW, placardH))
         self._placard.featureJumpButton = PlacardPopUpButton((0, 0, placardW, placardH),
             [], callback=self._placardFeatureSelectionCallback, sizeStyle="mini")
         self._nsObject.setPlacard_(self._placard.getNSView())
         # registed for syntax coloring notifications
         self._programmaticallySettingText = False
+        self._highlighter = FeatureTextHighlighter()
+        # the symbols are found in the background
+        self._symbolIndex = FeatureTextSymbolIndex(callback=self._symbolIndexCallback)
         delegate = self._textViewDelegate
         delegate.vanillaWrapper = weakref.ref(self)
         notificationCenter = NSNotificationCenter.defaultCenter()
         notificationCenter.addObserver_selector_name_object_(
             self._textViewDelegate, "textStorageDidProcessEditing:", NSTextStorageDidProcessEditingNotification, self._textView.textStorage())
+        # line numbers
+        ruler = DefconAppKitLineNumberView.alloc().init()
+        ruler.setClientView_(self._textView)
+        self._nsObject.setVerticalRulerView_(ruler)
+        self._nsObject.setHasHorizontalRuler_(False)
+        self._nsObject.setHasVerticalRuler_(True)
+        self._nsObject.setRulersVisible_(True)
+        notificationCenter.addObserver_selector_name_object_(
+            ruler, "clientViewSelectionChanged:", NSTextViewDidChangeSelectionNotification, self._textView
+        )
         # set the text
         self.set(text)
 
     def _breakCycles(self):
         notificationCenter = NSNotificationCenter.defaultCenter()
         notificationCenter.removeObserver_(self._textViewDelegate)
+        ruler = self._nsObject.verticalRulerView()
+        if ruler is not None:
+            notificationCenter.removeObserver_(ruler)
+        if self._symbolIndex is not None:
+            self._symbolIndex.close()
+            self._symbolIndex = None
 
     def _fallbackCallback(self, sender):
         pass
@@ -355,15 +366,22 @@ class FeatureTextEditor(vanilla.TextEditor):
     def _highlightSyntaxAsAResultOfEditing(self):
         if self._programmaticallySettingText:
             return
+        textStorage = self._textView.textStorage()
+        # only the attributes changed
+        if not textStorage.editedMask() & NSTextStorageEditedCharacters:
+            return
         string = self._textView.string()
-        editedRange = self._textView.textStorage().editedRange()
-        lineStart, lineLength = string.lineRangeForRange_(editedRange)
-        text = string.substringWithRange_((lineStart, lineLength))
-        self._highlightSyntax(lineStart, text)
-
-    def _highlightSyntax(self, location, text):
-        # convert all text to black
-        self._textView.setTextColor_range_(self._mainColor, (location, len(text)))
+        editedStart, editedLength = textStorage.editedRange()
+        oldLength = editedLength - textStorage.changeInLength()
+        colorRanges = self._highlighter.replaceRange(string, editedStart, oldLength, editedLength)
+        self._highlightSyntax(colorRanges)
+        # only the edit is handed over, the index applies it to its own copy
+        self._symbolIndex.textEdited(editedStart, oldLength, string[editedStart:editedStart + editedLength])
+
+    def _highlightAllSyntax(self):
+        self._highlightSyntax(self._highlighter.getColorRanges())
+
+    def _highlightSyntax(self, colorRanges):
         colors = dict(
             comments=self._commentColor,
             strings=self._stringColor,
@@ -372,44 +390,53 @@ class FeatureTextEditor(vanilla.TextEditor):
             includes=self._includeColor,
             classNames=self._classNameColor,
         )
-        for typ, runs in breakFeatureTextIntoRuns(text):
-            color = colors[typ]
-            for start, end in runs:
-                length = end - start
-                start = location + start
-                self._textView.setTextColor_range_(color, (start, length))
-        # update the pop up
-        self._updatePopUp()
+        # the range of each changed line is given with None
+        # before its runs so that it is first made black
+        colors[None] = self._mainColor
+        for start, end, typ in colorRanges:
+            self._textView.setTextColor_range_(colors[typ], (start, end - start))
 
     # placard support
 
+    def _symbolIndexCallback(self, symbolIndex):
+        # this is called on the worker thread
+        self._textViewDelegate.performSelectorOnMainThread_withObject_waitUntilDone_("symbolIndexChanged:", None, False)
+
     def _updatePopUp(self):
-        text = self.get()
-        ranges = findBlockOpenLineStarts(text)
-        self._placardJumps = ranges
-        titles = [i[0] for i in ranges]
+        if self._symbolIndex is None:
+            return
+        jumps = []
+        for typ, name, start in self._symbolIndex.getSymbols():
+            if typ in ("feature", "table", "class"):
+                title = name
+            elif typ == "include":
+                title = "include(%s)" % name
+            else:
+                title = "%s %s" % (typ, name)
+            jumps.append((title, start))
+        self._placardJumps = jumps
+        self._placardJumpStarts = [start for title, start in jumps]
+        titles = [i[0] for i in jumps]
         self._placard.featureJumpButton.setItems(titles)
+        self._selectionChangedCallback()
 
     def _placardFeatureSelectionCallback(self, sender):
         index = sender.get()
         name, start = self._placardJumps[index]
+        self._jumpToOffset(start)
+
+    def _jumpToOffset(self, start):
         self._textView.setSelectedRange_((start, 0))
         self._textView.scrollRangeToVisible_((start, 0))
         self._textView.setNeedsDisplay_(True)
 
     def _selectionChangedCallback(self):
+        if not self._placardJumps:
+            return
         selectionStart = self._textView.selectedRange()[0]
-        newIndex = None
-        for index, (name, start) in enumerate(self._placardJumps):
-            if newIndex is None:
-                newIndex = index
-                continue
-            if start > selectionStart:
-                break
-            else:
-                newIndex = index
-        if newIndex is not None:
-            self._placard.featureJumpButton.set(newIndex)
+        # the last jump starting at or before the selection
+        newIndex = max(0, bisect_right(self._placardJumpStarts, selectionStart) - 1)
+        self._placard.featureJumpButton.set(newIndex)
 
     # Public Methods
 
@@ -419,10 +446,44 @@ class FeatureTextEditor(vanilla.TextEditor):
         """
         self._programmaticallySettingText = True
         super(FeatureTextEditor, self).set(text)
+        self._highlighter.setText(self._textView.string())
         self._whitespace = _guessMinWhitespace(text)
         self._usesTabs = self._whitespace == "\t"
-        self._highlightSyntax(0, text)
+        self._highlightAllSyntax()
+        self._symbolIndex.textChanged(self.get())
         self._programmaticallySettingText = False
+        # the line count may have changed
+        ruler = self._nsObject.verticalRulerView()
+        if ruler is not None:
+            ruler.clientViewSelectionChanged_(None)
+
+    def getSymbols(self):
+        """
+        Get the symbols defined in the text as a list of (type, name, offset).
+        The types are "feature", "lookup", "table", "languagesystem", "class",
+        "markClass" and "include". The symbols are found in the background,
+        so they may lag behind the latest edits.
+        """
+        return self._symbolIndex.getSymbols()
+
+    def jumpToSymbol(self, name, typ=None):
+        """
+        Select the definition of the symbol with name, and with typ if
+        it is given. Returns False if the symbol could not be found.
+        """
+        symbol = self._symbolIndex.findSymbol(name, typ)
+        if symbol is None:
+            return False
+        self._jumpToOffset(symbol[2])
+        return True
+
+    def getLineOffsets(self):
+        """
+        Get the LineOffsetTable for the text in the editor.
+        """
+        # the highlighter updates the table for every edit of
+        # the text storage and set resets it, so it is current.
+        return self._highlighter.getLineOffsets()
 
     def setWrapLines(self, value):
         """
@@ -438,42 +499,42 @@ class FeatureTextEditor(vanilla.TextEditor):
 
     def setMainColor(self, value):
         self._mainColor = value
-        self._highlightSyntax(0, self.get())
+        self._highlightAllSyntax()
 
     def getMainColor(self):
         return self._mainColor
 
     def setCommentColor(self, value):
         self._commentColor = value
-        self._highlightSyntax(0, self.get())
+        self._highlightAllSyntax()
 
     def getCommentColor(self):
         return self._commentColor
 
     def setKeywordColor(self, value):
         self._keywordColor = value
-        self._highlightSyntax(0, self.get())
+        self._highlightAllSyntax()
 
     def getKeywordColor(self):
         return self._keywordColor
 
     def setTokenColor(self, value):
         self._tokenColor = value
-        self._highlightSyntax(0, self.get())
+        self._highlightAllSyntax()
 
     def getTokenColor(self):
         return self._tokenColor
 
     def setClassColor(self, value):
         self._classNameColor = value
-        self._highlightSyntax(0, self.get())
+        self._highlightAllSyntax()
 
     def getClassColor(self):
         return self._classNameColor
 
     def setIncludeColor(self, value):
         self._includeColor = value
-        self._highlightSyntax(0, self.get())
+        self._highlightAllSyntax()
 
     def getIncludeColor(self):
         return self._includeColor
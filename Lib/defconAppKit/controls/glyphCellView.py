@@ -14,6 +14,10 @@ from math import ceil, floor
 import vanilla
 from objc import python_method
 from defconAppKit.tools.iconCountBadge import addCountBadgeToIcon
+from defconAppKit.tools.glyphCellGrid import GlyphCellGrid
+from defconAppKit.tools.glyphNameIndex import GlyphNameIndex
+from defconAppKit.tools.renderScheduler import RenderScheduler
+from defconAppKit.tools.representationCache import RepresentationCache
 from defconAppKit.windows.popUpWindow import InformationPopUpWindow, HUDTextBox, HUDHorizontalLine
 
 
@@ -153,6 +157,12 @@ class DefconAppKitGlyphCellNSView(NSView):
     compositingOperation = NSCompositePlusDarker
     insertionLocationColor = NSColor.colorWithCalibratedRed_green_blue_alpha_(.16, .3, .85, 1)
     insertionLocationShadowColor = NSColor.whiteColor()
+    placeholderColor = NSColor.whiteColor()
+
+    backgroundRenderingMarginRows = 3
+    cellImageCacheMaxBytes = 128 * 1024 * 1024
+    liveCellResizeIdleDelay = 0.25
+    glyphObservationMarginRows = 10
 
     def initWithFont_cellRepresentationName_detailWindowClass_(self, font, cellRepresentationName, detailWindowClass):
         self = super(DefconAppKitGlyphCellNSView, self).initWithFrame_(((0, 0), (400, 400)))
@@ -166,7 +176,16 @@ class DefconAppKitGlyphCellNSView(NSView):
         self.arrayController.addObserver_forKeyPath_options_context_(self, "arrangedObjects", NSKeyValueObservingOptionNew, 0)
 
         self._glyphNames = []
+        self._glyphNameIndex = GlyphNameIndex()
+        self._glyphItemModel = None
+        self._batchUpdateLevel = 0
+        self._batchUpdateNeedsReload = False
+        self._batchUpdateNeedsLayout = False
+        self._pendingChangedGlyphNames = set()
         self._subscribedGlyphs = {}
+        self._lastObservedRect = None
+        self._glyphSubscriptionCount = 0
+        self._glyphUnsubscriptionCount = 0
         self._font = font
         self.subscribeFont()
 
@@ -176,8 +195,18 @@ class DefconAppKitGlyphCellNSView(NSView):
         self._rowCount = 0
         self._currentSelection = None
 
-        self._clickRectsToIndex = {}
-        self._indexToClickRects = {}
+        self._cellGrid = GlyphCellGrid(cellWidth=self._cellWidth, cellHeight=self._cellHeight)
+
+        self._cellImageCache = RepresentationCache(self.cellImageCacheMaxBytes)
+        self._backingScaleFactor = 1.0
+
+        self._renderScheduler = None
+        self._renderBatchPending = False
+        self._renderObservedCells = False
+        self._lastScheduledRect = None
+
+        self._usesLiveCellResize = False
+        self._inLiveCellResize = False
 
         self._lastSelectionFound = None
         self._lastKeyInputTime = None
@@ -218,10 +247,45 @@ class DefconAppKitGlyphCellNSView(NSView):
     def getGlyphNamesAtIndexes_(self, indexes):
         return [self._glyphNames[i] for i in indexes]
 
+    def setGlyphItemModel_(self, model):
+        """
+        Read the glyph names from model instead of from the items in
+        the array controller. The owner of the model is responsible
+        for keeping the model and the arranged objects in the same
+        order.
+        """
+        self._glyphItemModel = model
+        if model is None:
+            self._glyphNames = [item.Name() for item in self.arrayController.arrangedObjects()]
+            self._glyphNameIndex = GlyphNameIndex(self._glyphNames)
+        else:
+            self._glyphNames = model.getGlyphNames()
+            self._glyphNameIndex = model.getGlyphNameIndex()
+        self._cellGrid.setCellCount(len(self._glyphNames))
+        self.recalculateFrame()
+
+    def getGlyphItemModel(self):
+        return self._glyphItemModel
+
+    def _syncGlyphItemModel(self):
+        # the arranged objects were changed by someone other
+        # than the model owner, so they are the reference.
+        items = list(self.arrayController.arrangedObjects())
+        glyphNames = [item.Name() for item in items]
+        self._glyphItemModel.setGlyphNames(glyphNames, items=items)
+
+    def _glyphItemModelNeedsSync(self):
+        if len(self._glyphItemModel) != self.arrayController.arrangedObjects().count():
+            return True
+        # the list can sort the arranged objects
+        return bool(self.arrayController.sortDescriptors())
+
     def setFont_(self, font):
         self.unSubscribeFont()
         self._font = font
         self.subscribeFont()
+        self._cellImageCache.clear()
+        self._resetRenderScheduler()
         self.recalculateFrame()
 
     def getFont(self):
@@ -236,6 +300,10 @@ class DefconAppKitGlyphCellNSView(NSView):
         w, h = wh
         self._cellWidth = w
         self._cellHeight = h
+        self._cellGrid.setCellSize(wh)
+        self._resetRenderScheduler()
+        if self._usesLiveCellResize:
+            self._beginLiveCellResize()
         self.recalculateFrame()
 
     def getCellSize(self):
@@ -246,6 +314,7 @@ class DefconAppKitGlyphCellNSView(NSView):
 
     def setCellRepresentationArguments_(self, kwargs):
         self._cellRepresentationArguments = kwargs
+        self._resetRenderScheduler()
         self.setNeedsDisplay_(True)
 
     def getCellRepresentationArguments(self):
@@ -254,15 +323,207 @@ class DefconAppKitGlyphCellNSView(NSView):
     def getRepresentationForGlyph_cellRepresentationName_cellRepresentationArguments_(self, glyph, representationName, representationArguments):
         return glyph.getRepresentation(representationName, **representationArguments)
 
+    @python_method
+    def _getCellImage(self, glyph, representationName, representationArguments):
+        # the view's cache owns the images: once an image is stored,
+        # defcon's copy is destroyed so that the byte budget bounds
+        # the memory held by the cell images of all sizes.
+        try:
+            key = (glyph.name, representationName, frozenset(representationArguments.items()))
+        except TypeError:
+            # unhashable arguments can't be cached here
+            return self.getRepresentationForGlyph_cellRepresentationName_cellRepresentationArguments_(glyph, representationName, representationArguments)
+        representation = self._cellImageCache.get(key)
+        if representation is None:
+            representation = self.getRepresentationForGlyph_cellRepresentationName_cellRepresentationArguments_(glyph, representationName, representationArguments)
+            size = self._estimateCellImageBytes(representationArguments)
+            self._cellImageCache.set(key, representation, size, group=glyph.name)
+            if key in self._cellImageCache:
+                glyph.destroyRepresentation(representationName, **representationArguments)
+        return representation
+
+    @python_method
+    def _estimateCellImageBytes(self, representationArguments):
+        width = representationArguments.get("width", self._cellWidth)
+        height = representationArguments.get("height", self._cellHeight)
+        scale = self._backingScaleFactor
+        return int(width * height * scale * scale * 4)
+
+    def setCellImageCacheMaxBytes_(self, value):
+        """
+        Set the number of bytes the cell images may occupy.
+        """
+        self._cellImageCache.setMaxBytes(value)
+
+    def getCellImageCacheMaxBytes(self):
+        return self._cellImageCache.getMaxBytes()
+
+    def getCellImageCacheStats(self):
+        """
+        Get the bytes held, eviction and hit/miss counters of the cell image cache.
+        """
+        return self._cellImageCache.getStats()
+
     def preloadGlyphCellImages(self):
+        if self._renderScheduler is not None:
+            # only the images of observed glyphs are kept, so the
+            # preload is limited to the observed rows.
+            self._renderObservedCells = True
+            self._scheduleGlyphCellRendering()
+            return
         representationName = self._cellRepresentationName
         representationArguments = self._cellRepresentationArguments
         representationArguments["width"] = self._cellWidth
         representationArguments["height"] = self._cellHeight
+        # the glyphs are not observed by the view, so the images are
+        # left in the glyphs where defcon will destroy them on change.
         for glyphName in self._glyphNames:
             glyph = self._font[glyphName]
             self.getRepresentationForGlyph_cellRepresentationName_cellRepresentationArguments_(glyph, representationName, representationArguments)
 
+    # live cell resize
+
+    def setUsesLiveCellResize_(self, value):
+        """
+        Set whether a continuous series of cell size changes should be
+        drawn by scaling the nearest cached cell image. The exact size
+        is rendered once the size has not changed for liveCellResizeIdleDelay
+        seconds or when a live resize of the view ends.
+        """
+        self._usesLiveCellResize = value
+        if not value:
+            self.endLiveCellResize_(None)
+
+    def usesLiveCellResize(self):
+        return self._usesLiveCellResize
+
+    @python_method
+    def _beginLiveCellResize(self):
+        self._inLiveCellResize = True
+        NSObject.cancelPreviousPerformRequestsWithTarget_selector_object_(self, "endLiveCellResize:", None)
+        self.performSelector_withObject_afterDelay_("endLiveCellResize:", None, self.liveCellResizeIdleDelay)
+
+    def endLiveCellResize_(self, sender):
+        NSObject.cancelPreviousPerformRequestsWithTarget_selector_object_(self, "endLiveCellResize:", None)
+        if self._inLiveCellResize:
+            self._inLiveCellResize = False
+            self.setNeedsDisplay_(True)
+
+    @python_method
+    def _getNearestCellImage(self, glyph, representationName, representationArguments):
+        otherArguments = dict(representationArguments)
+        width = otherArguments.pop("width")
+        height = otherArguments.pop("height")
+        nearestKey = None
+        nearestDistance = None
+        for key in self._cellImageCache.getGroupKeys(glyph.name):
+            glyphName, name, arguments = key
+            if name != representationName:
+                continue
+            arguments = dict(arguments)
+            w = arguments.pop("width", None)
+            h = arguments.pop("height", None)
+            if w is None or h is None or arguments != otherArguments:
+                continue
+            distance = abs(w - width) + abs(h - height)
+            if nearestDistance is None or distance < nearestDistance:
+                nearestKey = key
+                nearestDistance = distance
+        if nearestKey is None:
+            return None
+        return self._cellImageCache.get(nearestKey)
+
+    # background rendering
+
+    def setUsesBackgroundRendering_(self, value):
+        """
+        Set whether cell images should be rendered in short batches
+        between events instead of while drawing. The batches run on
+        the main run loop, starting with the visible cells. Cells that
+        have not been rendered yet are drawn as placeholders.
+        """
+        if value and self._renderScheduler is None:
+            self._renderScheduler = RenderScheduler(self._renderGlyphCell)
+        elif not value and self._renderScheduler is not None:
+            self._stopRenderScheduler()
+        self._renderObservedCells = False
+        self._lastScheduledRect = None
+        self.setNeedsDisplay_(True)
+
+    def usesBackgroundRendering(self):
+        return self._renderScheduler is not None
+
+    def getBackgroundRenderingStats(self):
+        """
+        Get the queue depth and hit/miss counters of the background
+        renderer. None is returned if background rendering is off.
+        """
+        if self._renderScheduler is None:
+            return None
+        return self._renderScheduler.getStats()
+
+    @python_method
+    def _resetRenderScheduler(self):
+        if self._renderScheduler is not None:
+            self._renderScheduler.reset()
+            self._lastScheduledRect = None
+
+    @python_method
+    def _stopRenderScheduler(self):
+        NSObject.cancelPreviousPerformRequestsWithTarget_selector_object_(self, "renderGlyphCellBatch:", None)
+        self._renderBatchPending = False
+        self._renderScheduler = None
+
+    @python_method
+    def _renderGlyphCell(self, glyphName):
+        glyph = self.getGlyph_(glyphName)
+        if glyph is None:
+            return None
+        representationArguments = dict(self._cellRepresentationArguments)
+        representationArguments["width"] = self._cellWidth
+        representationArguments["height"] = self._cellHeight
+        return self._getCellImage(glyph, self._cellRepresentationName, representationArguments)
+
+    @python_method
+    def _scheduleRenderBatch(self):
+        # one batch is rendered per pass through the run loop so
+        # that events are handled between batches.
+        if not self._renderBatchPending:
+            self._renderBatchPending = True
+            self.performSelector_withObject_afterDelay_("renderGlyphCellBatch:", None, 0)
+
+    def renderGlyphCellBatch_(self, sender):
+        self._renderBatchPending = False
+        renderScheduler = self._renderScheduler
+        if renderScheduler is None or not self._glyphNames:
+            return
+        glyphNames = renderScheduler.renderBatch()
+        # the glyphs must be observed for the results to be kept
+        start, end = self._getObservedIndexRange()
+        rendered = []
+        for glyphName in glyphNames:
+            glyph = self.getGlyph_(glyphName)
+            if glyph is None or not self._haveIndexInRange(glyphName, start, end):
+                self._forgetGlyphCellImages(glyphName)
+                continue
+            self.subscribeGlyph(glyph)
+            rendered.append(glyphName)
+        self._invalidateGlyphCells(rendered)
+        if renderScheduler.hasPendingJobs():
+            self._scheduleRenderBatch()
+
+    @python_method
+    def _scheduleGlyphCellRendering(self):
+        visibleRect = self.visibleRect()
+        self._lastScheduledRect = visibleRect
+        marginRows = self.backgroundRenderingMarginRows
+        if self._renderObservedCells:
+            marginRows = max(marginRows, self.glyphObservationMarginRows)
+        indexes = self._cellGrid.indexesByDistanceFromRect(visibleRect, marginRows)
+        glyphNames = self._glyphNames
+        self._renderScheduler.schedule([glyphNames[index] for index in indexes])
+        self._scheduleRenderBatch()
+
     def setGlyphDetailModifiers_mouseDown_mouseUp_mouseDragged_mouseMoved_(self,
             modifiers=[], mouseDown=False, mouseUp=False, mouseDragged=False, mouseMoved=False):
         """
@@ -315,6 +576,7 @@ class DefconAppKitGlyphCellNSView(NSView):
             self._subscribedGlyphs[glyph] = (glyphNameChangedCallbackWrapper, glyphChangedCallbackWrapper)
             glyph.addObserver(glyphNameChangedCallbackWrapper, "action", "Glyph.NameChanged")
             glyph.addObserver(glyphChangedCallbackWrapper, "action", "Glyph.Changed")
+            self._glyphSubscriptionCount += 1
 
     @python_method
     def unSubscribeGlyph(self, glyph):
@@ -323,11 +585,67 @@ class DefconAppKitGlyphCellNSView(NSView):
             glyph.removeObserver(glyphNameChangedCallbackWrapper, "Glyph.NameChanged")
             glyph.removeObserver(glyphChangedCallbackWrapper, "Glyph.Changed")
             del self._subscribedGlyphs[glyph]
+            self._glyphUnsubscriptionCount += 1
+            # changes to the glyph are no longer seen,
+            # so its cached images can't be trusted.
+            self._forgetGlyphCellImages(glyph.name)
+
+    @python_method
+    def unSubscribeGlyphNames(self, glyphNames):
+        glyphNames = set(glyphNames)
+        if not glyphNames:
+            return
+        for glyph in list(self._subscribedGlyphs.keys()):
+            if glyph.name in glyphNames:
+                self.unSubscribeGlyph(glyph)
 
     def unSubscribeGlyphs(self):
         glyphs = self._subscribedGlyphs.keys()
         for glyph in list(glyphs):
             self.unSubscribeGlyph(glyph)
+        self._lastObservedRect = None
+
+    def getGlyphObservationStats(self):
+        """
+        Get the number of observed glyphs, the number of live
+        observers and the subscribe/unsubscribe counters.
+        """
+        return dict(
+            glyphs=len(self._subscribedGlyphs),
+            observers=len(self._subscribedGlyphs) * 2,
+            subscribed=self._glyphSubscriptionCount,
+            unsubscribed=self._glyphUnsubscriptionCount
+        )
+
+    @python_method
+    def _getObservedIndexRange(self):
+        # the visible rows plus a margin above and below
+        margin = self.glyphObservationMarginRows * self._cellHeight
+        return self._cellGrid.indexRangeForRect(NSInsetRect(self.visibleRect(), 0, -margin))
+
+    @python_method
+    def _haveIndexInRange(self, glyphName, start, end):
+        for index in self._glyphNameIndex.getIndexes(glyphName):
+            if start <= index < end:
+                return True
+        return False
+
+    @python_method
+    def _forgetGlyphCellImages(self, glyphName):
+        self._cellImageCache.discardGroup(glyphName)
+        if self._renderScheduler is not None:
+            self._renderScheduler.invalidate(glyphName)
+
+    @python_method
+    def _updateGlyphSubscriptions(self):
+        # stop observing glyphs that have been scrolled out of the
+        # observed range. unSubscribeGlyph drops their cached images.
+        self._lastObservedRect = self.visibleRect()
+        start, end = self._getObservedIndexRange()
+        for glyph in list(self._subscribedGlyphs.keys()):
+            glyphName = glyph.name
+            if not self._haveIndexInRange(glyphName, start, end):
+                self.unSubscribeGlyph(glyph)
 
     @python_method
     def _fontInfoChanged(self, notification):
@@ -338,6 +656,8 @@ class DefconAppKitGlyphCellNSView(NSView):
         repName = self.getCellRepresentationName()
         for glyph in self._subscribedGlyphs:
             glyph.destroyRepresentation(repName, **repArgs)
+        self._cellImageCache.clear()
+        self._resetRenderScheduler()
         self.setNeedsDisplay_(True)
 
     @python_method
@@ -345,28 +665,69 @@ class DefconAppKitGlyphCellNSView(NSView):
         data = notification.data
         oldName = data["oldValue"]
         newName = data["newValue"]
-        index = self._glyphNames.index(oldName)
-        self._glyphNames[index] = newName
-        items = self.arrayController.arrangedObjects()
-        items[index].renameGlyphName_(newName)
-        self.setNeedsDisplay_(True)
+        self._forgetGlyphCellImages(oldName)
+        self._forgetGlyphCellImages(newName)
+        index = self._glyphNameIndex.getFirstIndex(oldName)
+        if index is None:
+            return
+        if self._glyphItemModel is not None:
+            self._glyphItemModel.rename(index, newName)
+            item = self._glyphItemModel.getLoadedItem(index)
+            if item is not None:
+                item.renameGlyphName_(newName)
+        else:
+            self._glyphNames[index] = newName
+            self._glyphNameIndex.rename(oldName, newName, index)
+            items = self.arrayController.arrangedObjects()
+            items[index].renameGlyphName_(newName)
+        self._scheduleGlyphCellInvalidation(newName)
 
     @python_method
     def _glyphChanged(self, notification):
         glyph = notification.object
-        if glyph.name not in self._glyphNames:
+        if glyph.name not in self._glyphNameIndex:
             return
-        self.setNeedsDisplay_(True)
+        self._forgetGlyphCellImages(glyph.name)
+        self._scheduleGlyphCellInvalidation(glyph.name)
+
+    @python_method
+    def _scheduleGlyphCellInvalidation(self, glyphName):
+        # changes posted during one run loop turn are
+        # collected and invalidated in a single pass.
+        if not self._pendingChangedGlyphNames:
+            self.performSelector_withObject_afterDelay_("flushGlyphCellInvalidations:", None, 0)
+        self._pendingChangedGlyphNames.add(glyphName)
+
+    def flushGlyphCellInvalidations_(self, sender):
+        glyphNames = self._pendingChangedGlyphNames
+        self._pendingChangedGlyphNames = set()
+        if self._glyphNames:
+            self._invalidateGlyphCells(glyphNames)
+
+    @python_method
+    def _invalidateGlyphCells(self, glyphNames):
+        # only cells in the visible rect need to be redrawn.
+        # the others will be drawn when they are scrolled to.
+        start, end = self._cellGrid.indexRangeForRect(self.visibleRect())
+        for glyphName in glyphNames:
+            for index in self._glyphNameIndex.getIndexes(glyphName):
+                if start <= index < end:
+                    self.setNeedsDisplayInRect_(self._cellGrid.rectForIndex(index))
+
     # --------------
     # NSView methods
     # --------------
 
     def dealloc(self):
+        self._stopRenderScheduler()
         self.unSubscribeFont()
         self.unSubscribeGlyphs()
         self.unsubscribeFromWindow()
         self._glyphNames = None
+        self._glyphNameIndex = None
+        self._glyphItemModel = None
         self._subscribedGlyphs = None
+        self._cellImageCache = None
         self._font = None
         super(DefconAppKitGlyphCellNSView, self).dealloc()
 
@@ -384,6 +745,7 @@ class DefconAppKitGlyphCellNSView(NSView):
 
     def viewDidMoveToWindow(self):
         if self.window() is not None:
+            self._backingScaleFactor = self.window().backingScaleFactor()
             self.subscribeToWindow()
             self.subscribeToScrollViewFrameChange()
             self.recalculateFrame()
@@ -403,6 +765,7 @@ class DefconAppKitGlyphCellNSView(NSView):
             scrollView.setPostsFrameChangedNotifications_(True)
 
     def viewDidEndLiveResize(self):
+        self.endLiveCellResize_(None)
         self.recalculateFrame()
 
     # close notification support
@@ -412,6 +775,8 @@ class DefconAppKitGlyphCellNSView(NSView):
 
     def windowCloseNotification_(self, notification):
         self._windowIsClosed = True
+        # the pending batch requests retain the view
+        self._stopRenderScheduler()
         if self._glyphDetailWindow is not None:
             if self._glyphDetailWindow.getNSWindow() is not None:
                 self._glyphDetailWindow.hide()
@@ -436,10 +801,59 @@ class DefconAppKitGlyphCellNSView(NSView):
     def scrollWheel_(self, event):
         super(DefconAppKitGlyphCellNSView, self).scrollWheel_(event)
 
+    def beginBatchUpdate(self):
+        """
+        Stop reacting to changes in the arranged objects until
+        a balancing call to endBatchUpdate has been made.
+        """
+        self._batchUpdateLevel += 1
+
+    def endBatchUpdate(self):
+        self._batchUpdateLevel -= 1
+        if self._batchUpdateLevel:
+            return
+        if self._batchUpdateNeedsReload:
+            self._batchUpdateNeedsReload = False
+            self._batchUpdateNeedsLayout = False
+            self._reloadGlyphNames()
+        elif self._batchUpdateNeedsLayout:
+            self._batchUpdateNeedsLayout = False
+            self._glyphCountChanged()
+
+    def glyphItemModelDidChange(self):
+        """
+        Tell the view that the owner of the glyph item model changed
+        the model. The model has already updated the glyph names and
+        the name index at the changed indexes, so only the layout of
+        the cells needs to be updated.
+        """
+        if self._batchUpdateLevel:
+            self._batchUpdateNeedsLayout = True
+        else:
+            self._glyphCountChanged()
+
+    def _reloadGlyphNames(self):
+        if self._glyphItemModel is not None:
+            # the model owner reports its own changes, so this
+            # is a change made directly to the array controller.
+            if self._glyphItemModelNeedsSync():
+                self._syncGlyphItemModel()
+        else:
+            self._glyphNames = [item.Name() for item in self.arrayController.arrangedObjects()]
+            self._glyphNameIndex.rebuild(self._glyphNames)
+        self._glyphCountChanged()
+
+    def _glyphCountChanged(self):
+        self._cellGrid.setCellCount(len(self._glyphNames))
+        self.recalculateFrame()
+
     def observeValueForKeyPath_ofObject_change_context_(self, keyPath, obj, change, context):
-        if keyPath == "arrangedObjects":
-            self._glyphNames = [item.Name() for item in obj.arrangedObjects()]
-            self.recalculateFrame()
+        # the array controller reports every change to the arranged
+        # objects as a new setting, without the changed indexes.
+        if keyPath == "arrangedObjects" and self._batchUpdateLevel:
+            self._batchUpdateNeedsReload = True
+        elif keyPath == "arrangedObjects":
+            self._reloadGlyphNames()
 
     def recalculateFrame(self):
         superview = self.superview()
@@ -466,11 +880,12 @@ class DefconAppKitGlyphCellNSView(NSView):
             newWidth = width
         if height > newHeight:
             newHeight = height
-        self._clickRectsToIndex = {}
-        self._indexToClickRects = {}
         self.setFrame_(((0, 0), (newWidth, newHeight)))
         self._columnCount = columnCount
         self._rowCount = rowCount
+        self._cellGrid.setColumnCount(columnCount)
+        self._cellGrid.setCellCount(len(self._glyphNames))
+        self._lastObservedRect = None
         self.setNeedsDisplay_(True)
 
     def drawRect_(self, rect):
@@ -496,6 +911,10 @@ class DefconAppKitGlyphCellNSView(NSView):
 
         selection = self.arrayController.selectionIndexes()
 
+        renderScheduler = self._renderScheduler
+        haveMisses = False
+        liveCellResize = self._inLiveCellResize
+
         left = 0
         top = cellHeight * visibleStart + cellHeight
         index = startIndex
@@ -503,17 +922,31 @@ class DefconAppKitGlyphCellNSView(NSView):
             t = top - cellHeight
             cellRect = ((left, t), (cellWidth, cellHeight))
 
-            self._clickRectsToIndex[cellRect] = index
-            self._indexToClickRects[index] = cellRect
-
             if NSIntersectsRect(rect, cellRect):
                 glyph = self.getGlyph_(glyphName)
                 if glyph is not None:
                     self.subscribeGlyph(glyph)
-                    image = self.getRepresentationForGlyph_cellRepresentationName_cellRepresentationArguments_(glyph, representationName, representationArguments)
-                    image.drawAtPoint_fromRect_operation_fraction_(
-                        (left, t), ((0, 0), (cellWidth, cellHeight)), NSCompositeSourceOver, 1.0
-                    )
+                    image = None
+                    # during a live cell resize, scale the nearest cached size
+                    if liveCellResize:
+                        image = self._getNearestCellImage(glyph, representationName, representationArguments)
+                    if image is not None:
+                        image.drawInRect_fromRect_operation_fraction_(
+                            cellRect, ((0, 0), image.size()), NSCompositeSourceOver, 1.0
+                        )
+                    else:
+                        if renderScheduler is not None:
+                            image = renderScheduler.getResult(glyphName)
+                        else:
+                            image = self._getCellImage(glyph, representationName, representationArguments)
+                        if image is None:
+                            haveMisses = True
+                            self.placeholderColor.set()
+                            NSRectFill(cellRect)
+                        else:
+                            image.drawAtPoint_fromRect_operation_fraction_(
+                                (left, t), ((0, 0), (cellWidth, cellHeight)), NSCompositeSourceOver, 1.0
+                            )
                 if selection.containsIndex_(index):
                     r = ((left, t), (cellWidth, cellHeight))
                     self.selectionColor.set()
@@ -525,6 +958,13 @@ class DefconAppKitGlyphCellNSView(NSView):
                 left = 0
                 top += cellHeight
 
+        if self._lastObservedRect != self.visibleRect():
+            self._updateGlyphSubscriptions()
+
+        if renderScheduler is not None and not liveCellResize:
+            if haveMisses or self._lastScheduledRect != self.visibleRect():
+                self._scheduleGlyphCellRendering()
+
         # lines
         path = NSBezierPath.bezierPath()
 
@@ -563,7 +1003,7 @@ class DefconAppKitGlyphCellNSView(NSView):
         if self._dropTargetBetween is not None or self._dropTargetOn is not None or self._dropTargetSelf:
             # drop on a cell
             if self._dropTargetOn:
-                cellRect = self._indexToClickRects[self._dropTargetOn]
+                cellRect = self._cellGrid.rectForIndex(self._dropTargetOn)
                 cellRect = NSInsetRect(cellRect, 1, 1)
                 path = NSBezierPath.bezierPathWithRect_(cellRect)
                 path.setLineWidth_(2)
@@ -572,8 +1012,8 @@ class DefconAppKitGlyphCellNSView(NSView):
             # drop between cells
             elif self._dropTargetBetween:
                 location1, location2 = self._dropTargetBetween
-                location1 = self._indexToClickRects.get(location1)
-                location2 = self._indexToClickRects.get(location2)
+                location1 = self._cellGrid.rectForIndex(location1)
+                location2 = self._cellGrid.rectForIndex(location2)
                 if location1 is None:
                     (x, y), (w, h) = location2
                     barPositions = [(x, y, h)]
@@ -630,24 +1070,14 @@ class DefconAppKitGlyphCellNSView(NSView):
             selection.addIndexesInRange_((s, c))
 
     def scrollToCell_(self, index):
-        if index not in self._indexToClickRects:
-            top = (index // self._columnCount) * self._cellHeight
-            left = (index % self._columnCount) * self._cellWidth
-            rect = ((left, top), (self._cellWidth, self._cellHeight))
-            self._clickRectsToIndex[rect] = index
-            self._indexToClickRects[index] = rect
-        else:
-            rect = self._indexToClickRects[index]
+        rect = self._cellGrid.rectForIndex(index)
+        if rect is None:
+            return
         self.scrollRectToVisible_(rect)
 
     @python_method
     def rectForIndex(self, index):
-        top = (index // self._columnCount) * self._cellHeight
-        left = (index % self._columnCount) * self._cellWidth
-        rect = ((left, top), (self._cellWidth, self._cellHeight))
-        self._clickRectsToIndex[rect] = index
-        self._indexToClickRects[index] = rect
-        return rect
+        return self._cellGrid.rectForIndex(index)
 
     # mouse
 
@@ -703,12 +1133,7 @@ class DefconAppKitGlyphCellNSView(NSView):
 
     @python_method
     def _findGlyphForLocation(self, location):
-        found = None
-        for rect, index in self._clickRectsToIndex.items():
-            if NSPointInRect(location, rect):
-                found = index
-                break
-        return found
+        return self._cellGrid.indexForPoint(location)
 
     @python_method
     def _handleDetailWindow(self, event, found, mouseDown=False, mouseMoved=False, mouseDragged=False, mouseUp=False, inDragAndDrop=False):
@@ -920,55 +1345,28 @@ class DefconAppKitGlyphCellNSView(NSView):
             inputString = fieldEditor.string()
             inputUnicode = None
 
-            match = None
             matchIndex = None
-            lastResort = None
-            lastResortIndex = None
 
             if len(inputString) == 1:
                 inputUnicode = ord(inputString)
                 glyphName = self._font.unicodeData.glyphNameForUnicode(inputUnicode)
-                if glyphName and glyphName in self._glyphNames:
-                    matchIndex = self._glyphNames.index(glyphName)
+                if glyphName:
+                    matchIndex = self._glyphNameIndex.getFirstIndex(glyphName)
 
             if matchIndex is None:
-                for index, glyphName in enumerate(self._glyphNames):
-                    # if the item starts with the input string, it is considered a match
-                    if glyphName.startswith(inputString):
-                        if match is None:
-                            match = glyphName
-                            matchIndex = index
-                            continue
-                        # only if the item is less than the previous match is it a more relevant match
-                        # example:
-                        # given this order: sys, signal
-                        # and this input string: s
-                        # sys will be the first match, but signal is the more accurate match
-                        if glyphName < match:
-                            match = glyphName
-                            matchIndex = index
-                            continue
-                    # if the item is greater than the input string,it can be used as a last resort
-                    # example:
-                    # given this order: vanilla, zipimport
-                    # and this input string: x
-                    # zipimport will be used as the last resort
-                    if glyphName > inputString:
-                        if lastResort is None:
-                            lastResort = glyphName
-                            lastResortIndex = index
-                            continue
-                        # if existing the last resort is greater than the item
-                        # the item is a closer match to the input string
-                        if lastResort > glyphName:
-                            lastResort = glyphName
-                            lastResortIndex = index
-                            continue
-
-            if matchIndex is not None:
-                newSelection = matchIndex
-            elif lastResortIndex is not None:
-                newSelection = lastResortIndex
+                # the smallest name starting with the input string is
+                # considered a match. if there is none, the smallest
+                # name greater than the input string is used as a last resort.
+                # example:
+                # given this order: sys, signal
+                # and this input string: s
+                # signal is the most accurate match
+                # given this order: vanilla, zipimport
+                # and this input string: x
+                # zipimport will be used as the last resort
+                matchIndex = self._glyphNameIndex.findTypeAheadIndex(inputString)
+
+            newSelection = matchIndex
             if newSelection is not None:
                 self._lastSelectionFound = newSelection
                 selection = NSIndexSet.indexSetWithIndex_(newSelection)
@@ -1169,7 +1567,7 @@ class DefconAppKitGlyphCellNSView(NSView):
         # drop on a specific cell
         if allowDropOnRow and allowDropBetweenRows and rowIndex is not None:
             mouseLocation = self._getMouseLocation()
-            (x, y), (w, h) = self._indexToClickRects[rowIndex]
+            (x, y), (w, h) = self._cellGrid.rectForIndex(rowIndex)
             _s = .35
             left = ((x, y), (w * _s, h))
             right = ((x + w * (1 - _s), y), (w * _s, h))
@@ -1189,7 +1587,7 @@ class DefconAppKitGlyphCellNSView(NSView):
         # drop between cells
         elif allowDropBetweenRows and rowIndex is not None:
             mouseLocation = self._getMouseLocation()
-            (x, y), (w, h) = self._indexToClickRects[rowIndex]
+            (x, y), (w, h) = self._cellGrid.rectForIndex(rowIndex)
             left = ((x, y), (w * .5, h))
             if NSPointInRect(mouseLocation, left):
                 target = (rowIndex - 1, rowIndex)
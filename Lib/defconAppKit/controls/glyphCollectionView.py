@@ -1,8 +1,10 @@
 import weakref
-from AppKit import NSView, NSSegmentStyleSmallSquare, NSSmallSquareBezelStyle
+from contextlib import contextmanager
+from AppKit import NSView, NSSegmentStyleSmallSquare, NSSmallSquareBezelStyle, NSMutableIndexSet, NSMutableArray
 import vanilla
 from defconAppKit.controls.glyphCellView import DefconAppKitGlyphCellNSView, GlyphInformationPopUpWindow, GlyphCellItem
 from defconAppKit.controls.fontInfoView import GradientButtonBar
+from defconAppKit.tools.glyphItemModel import GlyphItemModel
 
 
 class DefconAppKitGlyphCollectionView(NSView):
@@ -106,6 +108,8 @@ class GlyphCollectionView(vanilla.Group):
             otherApplicationDropSettings=None, allowDrag=False, dragAndDropType="DefconAppKitSelectedGlyphIndexesPboardType"):
 
         self._holdCallbacks = True
+        self._batchUpdateLevel = 0
+        self._batchUpdateNeedsRearrange = False
         super(GlyphCollectionView, self).__init__(posSize)
 
         if showModePlacard or placardActionItems is not None:
@@ -158,6 +162,12 @@ class GlyphCollectionView(vanilla.Group):
         self._glyphCellView.vanillaWrapper = weakref.ref(self)
         self._glyphCellView.setAllowsDrag_(allowDrag)
 
+        # the glyph names live in the model, so the cell view can
+        # read them without asking the items in the array controller.
+        self._glyphItemModel = GlyphItemModel(itemFactory=self._wrapItem)
+        self._glyphCellView.setGlyphItemModel_(self._glyphItemModel)
+        self._arrayController.setContent_(NSMutableArray.array())
+
         dropTypes = []
         for d in (selfDropSettings, selfWindowDropSettings, selfDocumentDropSettings, selfApplicationDropSettings, otherApplicationDropSettings):
             if d is not None:
@@ -229,12 +239,19 @@ class GlyphCollectionView(vanilla.Group):
         self._holdCallbacks = False
 
     def getArrayController(self):
+        """
+        Get the array controller. The content of the
+        controller is a mutable array of glyph cell items.
+        """
         return self._glyphCellView.arrayController
 
     _arrayController = property(getArrayController)
 
     def _breakCycles(self):
         self._placard = None
+        if self._glyphCellView is not None:
+            self._glyphCellView.setGlyphItemModel_(None)
+        self._glyphItemModel = None
         self._glyphCellView = None
         super(GlyphCollectionView, self)._breakCycles()
 
@@ -288,19 +305,23 @@ class GlyphCollectionView(vanilla.Group):
 
     def get(self):
         font = self._glyphCellView.getFont()
-        return [font[glyphName] for glyphName in self._glyphCellView._glyphNames if glyphName in font]
+        return [font[glyphName] for glyphName in self._glyphItemModel if glyphName in font]
 
     def setGlyphNames(self, glyphNames):
         self._holdCallbacks = True
         self._glyphCellView.unSubscribeGlyphs()
+        # the items only load their glyphs when they are asked for them
         items = [self._wrapItem(glyphName) for glyphName in glyphNames]
-        self.getArrayController().setContent_(None)
-        self.getArrayController().addObjects_(items)
+        self._glyphItemModel.setGlyphNames(glyphNames, items=items)
+        with self.batchUpdate():
+            # the content is a mutable array so that batches
+            # can edit it in place, see insertGlyphs.
+            self._arrayController.setContent_(NSMutableArray.arrayWithArray_(items))
+            self._glyphCellView.glyphItemModelDidChange()
         self._holdCallbacks = False
-        self._glyphCellView.recalculateFrame()
 
     def getGlyphNames(self):
-        return self._glyphCellView._glyphNames
+        return self._glyphItemModel.getGlyphNames()
 
     def setFont(self, font):
         self._glyphCellView.setFont_(font)
@@ -316,54 +337,146 @@ class GlyphCollectionView(vanilla.Group):
             return
         selection = self.getSelection()
         # list
-        for index in reversed(sorted(selection)):
-            del self[index]
+        self.removeIndexes(selection)
         # call the callback
         if self._deleteCallback is not None:
             self._deleteCallback(self)
 
     def __contains__(self, glyph):
-        return glyph.name in self.getGlyphNames()
+        return glyph.name in self._glyphItemModel
 
     def __getitem__(self, index):
-        return self._arrayController.arrangedObjects()[index].glyph()
+        return self._glyphItemModel.getItem(index).glyph()
 
     def __setitem__(self, index, glyph):
         # list
-        existing = self._arrayController.arrangedObjects()[index]
+        existing = self._glyphItemModel.getItem(index)
         self._glyphCellView.unSubscribeGlyph(existing.glyph())
         existing.setGlyphExternally_(glyph)
+        if index < 0:
+            index += len(self._glyphItemModel)
+        self._glyphItemModel.rename(index, glyph.name)
+        self._glyphCellView.setNeedsDisplay_(True)
 
     def __delitem__(self, index):
-        # list
-        existing = self._arrayController.arrangedObjects()[index]
-        self._glyphCellView.unSubscribeGlyph(existing.glyph())
-        self._arrayController.removeObject_(existing)
+        if index < 0:
+            index += len(self._glyphItemModel)
+        self.removeIndexes([index])
 
     def __len__(self):
-        return self.getArrayController().arrangedObjects().count()
+        return len(self._glyphItemModel)
 
     def append(self, glyph):
-        item = self._wrapItem(glyph.name, glyph=glyph)
-        self.getArrayController().addObject_(item)
-        self.getArrayController().rearrangeObjects()
+        self.extend([glyph])
 
     def remove(self, glyph):
         index = self.index(glyph)
         del self[index]
 
     def index(self, glyph):
-        return self.getGlyphNames().index(glyph.name)
+        return self._glyphItemModel.index(glyph.name)
 
     def insert(self, index, glyph):
-        item = self._wrapItem(glyph.name, glyph=glyph)
-        self.getArrayController().insertObject_atArrangedObjectIndex_(item, index)
-        self.getArrayController().rearrangeObjects()
+        if index < 0:
+            index = max(0, index + len(self._glyphItemModel))
+        index = min(index, len(self._glyphItemModel))
+        self.insertGlyphs([index], [glyph])
 
     def extend(self, glyphs):
-        items = [self._wrapItem(glyph.name, glyph=glyph) for glyph in glyphs]
-        self.getArrayController().addObjects_(items)
-        self.getArrayController().rearrangeObjects()
+        glyphs = list(glyphs)
+        start = len(self._glyphItemModel)
+        self.insertGlyphs(range(start, start + len(glyphs)), glyphs)
+
+    # ---------------
+    # batched updates
+    # ---------------
+
+    @contextmanager
+    def batchUpdate(self):
+        """
+        A context manager that groups changes to the contents of the view.
+        The cell view is updated once, when the outermost batch ends.
+
+            with view.batchUpdate():
+                for glyph in glyphs:
+                    view.append(glyph)
+        """
+        self._batchUpdateLevel += 1
+        self._glyphCellView.beginBatchUpdate()
+        try:
+            yield
+        finally:
+            self._batchUpdateLevel -= 1
+            if self._batchUpdateLevel == 0 and self._batchUpdateNeedsRearrange:
+                self._batchUpdateNeedsRearrange = False
+                self._arrayController.rearrangeObjects()
+            self._glyphCellView.endBatchUpdate()
+
+    def _rearrangeObjects(self):
+        if self._batchUpdateLevel:
+            self._batchUpdateNeedsRearrange = True
+        else:
+            self._arrayController.rearrangeObjects()
+
+    def _makeIndexSet(self, indexes):
+        indexSet = NSMutableIndexSet.indexSet()
+        for index in indexes:
+            indexSet.addIndex_(index)
+        return indexSet
+
+    def insertGlyphs(self, indexes, glyphs):
+        """
+        Insert glyphs at indexes. The indexes are the positions
+        the glyphs will have after the insertion.
+        """
+        pairs = sorted(zip(indexes, glyphs), key=lambda pair: pair[0])
+        if not pairs:
+            return
+        indexes = [index for index, glyph in pairs]
+        glyphNames = [glyph.name for index, glyph in pairs]
+        items = [self._wrapItem(glyph.name, glyph=glyph) for index, glyph in pairs]
+        self._glyphItemModel.insert(indexes, glyphNames, items)
+        with self.batchUpdate():
+            # inserting through the array controller posts an
+            # arrangedObjects change of its own, so the items go
+            # straight into the content and the batch rearranges
+            # the controller once when it ends.
+            self._arrayController.content().insertObjects_atIndexes_(items, self._makeIndexSet(indexes))
+            self._glyphCellView.glyphItemModelDidChange()
+            self._rearrangeObjects()
+
+    def removeIndexes(self, indexes):
+        """
+        Remove the glyphs at indexes.
+        """
+        if not indexes:
+            return
+        model = self._glyphItemModel
+        glyphNames = set(model[index] for index in indexes)
+        indexSet = self._makeIndexSet(indexes)
+        model.remove(indexes)
+        # stop observing the glyphs that are no longer shown
+        self._glyphCellView.unSubscribeGlyphNames([glyphName for glyphName in glyphNames if glyphName not in model])
+        with self.batchUpdate():
+            self._arrayController.removeObjectsAtArrangedObjectIndexes_(indexSet)
+            self._glyphCellView.glyphItemModelDidChange()
+
+    def moveIndexes(self, indexes, destination):
+        """
+        Move the glyphs at indexes to destination. The destination
+        is an index in the contents before the move, as with a drop
+        between cells. The moved glyphs keep their relative order.
+        """
+        indexes = sorted(set(indexes))
+        if not indexes:
+            return
+        arrangedObjects = self._arrayController.arrangedObjects()
+        objects = [arrangedObjects[index] for index in indexes]
+        newIndexes = self._glyphItemModel.move(indexes, destination)
+        with self.batchUpdate():
+            self._arrayController.removeObjectsAtArrangedObjectIndexes_(self._makeIndexSet(indexes))
+            self._arrayController.insertObjects_atArrangedObjectIndexes_(objects, self._makeIndexSet(newIndexes))
+            self._glyphCellView.glyphItemModelDidChange()
 
     # -----------------
     # placard retrieval
@@ -520,3 +633,68 @@ class GlyphCollectionView(vanilla.Group):
         when lots of cellsneed to be displayed.
         """
         self._glyphCellView.preloadGlyphCellImages()
+
+    def setUsesLiveCellResize(self, value):
+        """
+        Set whether continuous changes to the cell size, such as those
+        coming from a slider, should be drawn by scaling the nearest
+        cached cell images. The cells are rendered at the exact size
+        once the size stops changing.
+        """
+        self._glyphCellView.setUsesLiveCellResize_(value)
+
+    def getUsesLiveCellResize(self):
+        """
+        Get whether cell size changes are drawn with scaled cell images.
+        """
+        return self._glyphCellView.usesLiveCellResize()
+
+    def setCellImageCacheMaxBytes(self, value):
+        """
+        Set the maximum number of bytes the cached cell images may
+        occupy. The least recently used images, across all glyphs
+        and cell sizes, are evicted first.
+        """
+        self._glyphCellView.setCellImageCacheMaxBytes_(value)
+
+    def getCellImageCacheMaxBytes(self):
+        """
+        Get the maximum number of bytes the cached cell images may occupy.
+        """
+        return self._glyphCellView.getCellImageCacheMaxBytes()
+
+    def getCellImageCacheStats(self):
+        """
+        Get a dictionary with the bytes held by the cell image cache
+        and its eviction and hit/miss counters.
+        """
+        return self._glyphCellView.getCellImageCacheStats()
+
+    def getGlyphObservationStats(self):
+        """
+        Get a dictionary with the number of glyphs observed by the cell
+        view, the number of live observers and the subscribe/unsubscribe
+        counters. Only glyphs near the visible cells are observed.
+        """
+        return self._glyphCellView.getGlyphObservationStats()
+
+    def setUsesBackgroundRendering(self, value):
+        """
+        Set whether the cell images should be rendered in short batches
+        on the main run loop, starting with the visible cells. Cells are
+        drawn as placeholders until their images are available.
+        """
+        self._glyphCellView.setUsesBackgroundRendering_(value)
+
+    def getUsesBackgroundRendering(self):
+        """
+        Get whether the cell images are rendered in batches.
+        """
+        return self._glyphCellView.usesBackgroundRendering()
+
+    def getBackgroundRenderingStats(self):
+        """
+        Get a dictionary with the queue depth and hit/miss counters
+        of the background renderer, or None if it is not in use.
+        """
+        return self._glyphCellView.getBackgroundRenderingStats()
@@ -1,10 +1,14 @@
 import weakref
-from AppKit import NSView, NSGraphicsContext, NSColor, NSAffineTransform, NSMenu, NSPoint, NSRectFill, \
+from AppKit import NSObject, NSView, NSGraphicsContext, NSColor, NSAffineTransform, NSMenu, NSPoint, NSRectFill, \
     NSRectFillUsingOperation, NSPointInRect, NSCompositeSourceOver, NSMenuItem
 import vanilla
 from objc import python_method, super
 from defconAppKit.controls.placardScrollView import PlacardScrollView, PlacardPopUpButton, DefconAppKitPlacardNSScrollView
 from defconAppKit.tools import drawing
+from defconAppKit.tools.drawingPlan import DrawingPlan
+from defconAppKit.tools.layerStackCache import getLayerStackCache
+from defconAppKit.tools.glyphLineLayout import GlyphLineLayout
+from defconAppKit.tools.kerningResolver import KerningResolver, GlyphPairIndex
 
 
 defaultAlternateHighlightColor = NSColor.colorWithCalibratedRed_green_blue_alpha_(0.45, 0.50, 0.55, 1.0)
@@ -31,10 +35,13 @@ class DefconAppKitGlyphLineNSView(NSView):
             showFontPostscriptBlues=False,
             showFontPostscriptFamilyBlues=False
         )
+        self._drawingPlan = None
 
         self._glyphRecords = []
         self._alternateRects = {}
         self._currentZeroZeroPoint = NSPoint(0, 0)
+        self._layout = None
+        self._layoutKey = None
 
         self._rightToLeft = False
         self._pointSize = 150
@@ -70,6 +77,7 @@ class DefconAppKitGlyphLineNSView(NSView):
 
     def setGlyphRecords_(self, glyphRecords):
         self._glyphRecords = glyphRecords
+        self._layout = None
         upms = []
         descenders = []
         for glyphRecord in glyphRecords:
@@ -92,6 +100,61 @@ class DefconAppKitGlyphLineNSView(NSView):
     def getGlyphRecords(self):
         return list(self._glyphRecords)
 
+    @python_method
+    def getGlyphRecordsNoCopy(self):
+        """
+        Get the glyph records without copying the list. The list
+        must not be changed. The values in the records can be,
+        followed by invalidateGlyphRecords or invalidateLayout.
+        """
+        return self._glyphRecords
+
+    @python_method
+    def invalidateLayout(self):
+        """
+        Lay out the glyph records again before the next draw.
+        Call this after changing the values in the glyph records.
+        """
+        self._layout = None
+        self.setNeedsDisplay_(True)
+
+    def kerningChangesPosted_(self, sender):
+        vanillaWrapper = self.vanillaWrapper()
+        if vanillaWrapper is not None:
+            vanillaWrapper._resetKerningChanges()
+
+    @python_method
+    def invalidateGlyphRecords(self, recordIndexes):
+        """
+        Lay out the glyph records at recordIndexes, and the
+        records that follow them, again and redraw the part of
+        the view that they cover. Call this after changing the
+        values in a few of the glyph records.
+        """
+        if not recordIndexes:
+            return
+        layout = self._layout
+        if layout is None:
+            self.setNeedsDisplay_(True)
+            return
+        start = layout.getFirstDrawingIndex(recordIndexes)
+        oldExtent = layout.getHorizontalExtent(start)
+        for index in range(start, len(layout)):
+            self._alternateRects.pop(layout.getRecordRect(index), None)
+        layout.updateRecords(self._glyphRecords, recordIndexes)
+        for index in range(start, len(layout)):
+            self._alternateRects[layout.getRecordRect(index)] = layout.getRecordIndex(index)
+        newExtent = layout.getHorizontalExtent(start)
+        (x, y), (w, h) = self.bounds()
+        # the records after start move, so everything
+        # past the first of them needs to be redrawn.
+        if self._rightToLeft:
+            xMax = max(oldExtent[1], newExtent[1])
+            self.setNeedsDisplayInRect_(((x, y), (xMax - x + 1, h)))
+        else:
+            xMin = min(oldExtent[0], newExtent[0])
+            self.setNeedsDisplayInRect_(((xMin - 1, y), (x + w - xMin + 1, h)))
+
     def setPointSize_(self, pointSize):
         self._pointSize = pointSize
         self.recalculateFrame()
@@ -128,6 +191,7 @@ class DefconAppKitGlyphLineNSView(NSView):
 
     def setShowLayers_(self, value):
         self._layerDrawingAttributes = {}
+        self._drawingPlan = None
         self._showLayers = value
         if value:
             for record in self._glyphRecords:
@@ -145,6 +209,7 @@ class DefconAppKitGlyphLineNSView(NSView):
             if layerName not in self._layerDrawingAttributes:
                 self._layerDrawingAttributes[layerName] = {}
             self._layerDrawingAttributes[layerName][attr] = value
+        self._drawingPlan = None
         self.setNeedsDisplay_(True)
 
     def getDrawingAttribute_layerName_(self, attr, layerName):
@@ -155,11 +220,26 @@ class DefconAppKitGlyphLineNSView(NSView):
 
     def setCutoffDisplayPointSizeAttribute_value_(self, attr, value):
         self._cutoffDisplayPointSizes[attr] = value
+        self._drawingPlan = None
         self.setNeedsDisplay_(True)
 
     def getCutoffDisplayPointSizeAttribute_(self, attr):
         return self._cutoffDisplayPointSizes.get(attr, None)
 
+    @python_method
+    def getDrawingPlan(self):
+        """
+        Get the DrawingPlan for the current drawing attributes
+        and point size. It is built again when they change.
+        """
+        plan = self._drawingPlan
+        if plan is None or plan.impliedPointSize != self._impliedPointSize:
+            plan = self._drawingPlan = DrawingPlan(
+                self._fallbackDrawingAttributes, self._layerDrawingAttributes,
+                self._impliedPointSize, self._cutoffDisplayPointSizes
+            )
+        return plan
+
     # ----------------
     # Frame Management
     # ----------------
@@ -283,40 +363,37 @@ class DefconAppKitGlyphLineNSView(NSView):
         if layerSet is None or not self._showLayers:
             layers = [(glyph, None)]
         else:
-            glyphName = glyph.name
             layers = []
-            for layerName in reversed(layerSet.layerOrder):
-                layer = layerSet[layerName]
-                if glyphName not in layer:
-                    continue
-                g = layer[glyphName]
+            for layerName, g in getLayerStackCache(layerSet).getLayerStack(glyph.name):
                 if g == glyph:
                     layerName = None
                 layers.append((g, layerName))
 
         self.drawGlyphBackground(glyph, rect, alternate=alternate)
         if self.needsToDrawRectInGlyphSpace_scale_(rect):
+            plan = self.getDrawingPlan()
             for g, layerName in layers:
+                steps = plan.getSteps(layerName)
                 # draw the image
-                if self.getDrawingAttribute_layerName_("showGlyphImage", layerName):
+                if steps.image:
                     self.drawImage(g, layerName, rect)
                 # draw the blues
-                if layerName is None and self.getDrawingAttribute_layerName_("showFontPostscriptBlues", None):
+                if steps.blues:
                     self.drawBlues(g, layerName, rect)
-                if layerName is None and self.getDrawingAttribute_layerName_("showFontPostscriptFamilyBlues", None):
+                if steps.familyBlues:
                     self.drawFamilyBlues(g, layerName, rect)
                 # draw the margins
-                if self.getDrawingAttribute_layerName_("showGlyphMargins", layerName):
+                if steps.margins:
                     self.drawMargins(g, layerName, rect)
                 # draw the vertical metrics
-                if layerName is None and self.getDrawingAttribute_layerName_("showFontVerticalMetrics", None):
+                if steps.verticalMetrics:
                     self.drawVerticalMetrics(g, layerName, rect)
                 # draw the glyph
-                if self.getDrawingAttribute_layerName_("showGlyphFill", layerName) or self.getDrawingAttribute_layerName_("showGlyphStroke", layerName):
+                if steps.fillAndStroke:
                     self.drawFillAndStroke(g, layerName, rect)
-                if self.getDrawingAttribute_layerName_("showGlyphOnCurvePoints", layerName) or self.getDrawingAttribute_layerName_("showGlyphOffCurvePoints", layerName):
+                if steps.points:
                     self.drawPoints(g, layerName, rect)
-                if self.getDrawingAttribute_layerName_("showGlyphAnchors", layerName):
+                if steps.anchors:
                     self.drawAnchors(g, layerName, rect)
 
         self.drawGlyphForeground(glyph, rect, alternate=alternate)
@@ -345,7 +422,7 @@ class DefconAppKitGlyphLineNSView(NSView):
 
     @python_method
     def drawVerticalMetrics(self, glyph, layerName, rect):
-        drawText = self.getDrawingAttribute_layerName_("showFontVerticalMetricsTitles", layerName) and self._impliedPointSize > self._cutoffDisplayPointSizes["showFontVerticalMetrics"]
+        drawText = self.getDrawingPlan().getSteps(layerName).verticalMetricsTitles
         drawing.drawFontVerticalMetrics(glyph, self._inverseScale, rect, drawText=drawText, backgroundColor=self._backgroundColor, flipped=True)
 
     @python_method
@@ -354,9 +431,11 @@ class DefconAppKitGlyphLineNSView(NSView):
 
     @python_method
     def drawFillAndStroke(self, glyph, layerName, rect):
-        showFill = self.getDrawingAttribute_layerName_("showGlyphFill", layerName)
-        showStroke = self.getDrawingAttribute_layerName_("showGlyphStroke", layerName)
+        steps = self.getDrawingPlan().getSteps(layerName)
+        showFill = steps.fill
+        showStroke = steps.stroke
         fillColor = None
+        strokeColor = None
         if not self._showLayers:
             fillColor = self._glyphColor
             strokeColor = self._strokeColor
@@ -364,10 +443,11 @@ class DefconAppKitGlyphLineNSView(NSView):
 
     @python_method
     def drawPoints(self, glyph, layerName, rect):
-        drawStartPoint = self.getDrawingAttribute_layerName_("showGlyphStartPoints", layerName) and self._impliedPointSize > self._cutoffDisplayPointSizes["showGlyphStartPoints"]
-        drawOnCurves = self.getDrawingAttribute_layerName_("showGlyphOnCurvePoints", layerName) and self._impliedPointSize > self._cutoffDisplayPointSizes["showGlyphOnCurvePoints"]
-        drawOffCurves = self.getDrawingAttribute_layerName_("showGlyphOffCurvePoints", layerName) and self._impliedPointSize > self._cutoffDisplayPointSizes["showGlyphOffCurvePoints"]
-        drawCoordinates = self.getDrawingAttribute_layerName_("showGlyphPointCoordinates", layerName) and self._impliedPointSize > self._cutoffDisplayPointSizes["showGlyphPointCoordinates"]
+        steps = self.getDrawingPlan().getSteps(layerName)
+        drawStartPoint = steps.startPoints
+        drawOnCurves = steps.onCurvePoints
+        drawOffCurves = steps.offCurvePoints
+        drawCoordinates = steps.pointCoordinates
         pointColor = None
         if not self._showLayers:
             pointColor = self._pointColor
@@ -377,7 +457,7 @@ class DefconAppKitGlyphLineNSView(NSView):
 
     @python_method
     def drawAnchors(self, glyph, layerName, rect):
-        drawText = self._impliedPointSize > self._cutoffDisplayPointSizes["showGlyphAnchors"]
+        drawText = self.getDrawingPlan().getSteps(layerName).anchorTitles
         color = None
         if not self._showLayers:
             color = self._glyphColor
@@ -400,6 +480,7 @@ class DefconAppKitGlyphLineNSView(NSView):
     def menuForEvent_(self, event):
         eventLocation = event.locationInWindow()
         eventLocation = self.convertPoint_fromView_(eventLocation, None)
+        self._getLayout()
         for rect, recordIndex in self._alternateRects.items():
             if NSPointInRect(eventLocation, rect):
                 menu = self._makeMenuForGlyphRecord(recordIndex)
@@ -423,73 +504,35 @@ class DefconAppKitGlyphLineNSView(NSView):
         else:
             self.drawRectLeftToRight_(rect)
 
-    def drawRectLeftToRight_(self, rect):
-        self._alternateRects = {}
-        # draw the background
-        bounds = self.bounds()
-        self._backgroundColor.set()
-        NSRectFill(bounds)
-        # create some reusable values
-        scale = self._scale
-        descender = self._descender
-        upm = self._upm
-        # offset for the buffer
-        ctx = NSGraphicsContext.currentContext()
-        ctx.saveGraphicsState()
-        aT = NSAffineTransform.transform()
-        aT.translateXBy_yBy_(self._bufferLeft, self._bufferTop)
-        aT.concat()
-        # offset for the descender
-        aT = NSAffineTransform.transform()
-        aT.scaleBy_(scale)
-        aT.translateXBy_yBy_(0, descender)
-        aT.concat()
-        # flip
-        flipTransform = NSAffineTransform.transform()
-        flipTransform.translateXBy_yBy_(0, upm)
-        flipTransform.scaleXBy_yBy_(1.0, -1.0)
-        flipTransform.concat()
-        # set the glyph color
-        self._glyphColor.set()
-        # draw the records
-        height = upm * scale
-        left = self._bufferLeft
-        bottom = self._bufferTop
+    @python_method
+    def _getLayout(self):
+        rightToLeft = self._rightToLeft
+        viewWidth = 0
+        if rightToLeft:
+            viewWidth = self.bounds().size[0]
+        layoutKey = (self._scale, self._upm, self._descender, self._bufferLeft, self._bufferTop, rightToLeft, viewWidth)
+        if self._layout is None or layoutKey != self._layoutKey:
+            self._layout = GlyphLineLayout(
+                self._glyphRecords, self._scale, self._upm, self._descender, self._bufferLeft, self._bufferTop,
+                rightToLeft=rightToLeft, viewWidth=viewWidth
+            )
+            self._layoutKey = layoutKey
+            # store the glyph rects for the alternate menu
+            layout = self._layout
+            self._alternateRects = {}
+            for index in range(len(layout)):
+                self._alternateRects[layout.getRecordRect(index)] = layout.getRecordIndex(index)
+        return self._layout
 
-        for recordIndex, glyphRecord in enumerate(self._glyphRecords):
-            glyph = glyphRecord.glyph
-            w = glyphRecord.advanceWidth
-            h = glyphRecord.advanceHeight
-            xP = glyphRecord.xPlacement
-            yP = glyphRecord.yPlacement
-            xA = glyphRecord.xAdvance
-            yA = glyphRecord.yAdvance
-            # handle offsets from the record
-            bottom += yP * scale
-            glyphHeight = height + ((h + yA) * scale)
-            glyphLeft = left + (xP * scale)
-            glyphWidth = (w + xA) * scale
-            # store the glyph rect for the alternate menu
-            rect = ((glyphLeft, bottom), (glyphWidth, glyphHeight))
-            self._alternateRects[rect] = recordIndex
-            self._currentZeroZeroPoint = NSPoint(glyphLeft, bottom + height + (descender * scale))
-            # handle placement
-            if xP or yP:
-                aT = NSAffineTransform.transform()
-                aT.translateXBy_yBy_(xP, yP)
-                aT.concat()
-            # draw the glyph
-            rect = ((-xP, descender - yP), (w, upm))
-            self.drawGlyph(glyph, rect, alternate=bool(glyphRecord.alternates))
-            # shift for the next glyph
-            aT = NSAffineTransform.transform()
-            aT.translateXBy_yBy_(w + xA - xP, h + yA - yP)
-            aT.concat()
-            left += glyphWidth
-        ctx.restoreGraphicsState()
+    def drawRectLeftToRight_(self, rect):
+        self._drawLayout(rect, self._bufferLeft)
 
     def drawRectRightToLeft_(self, rect):
-        self._alternateRects = {}
+        self._drawLayout(rect, self.bounds().size[0] - self._bufferLeft)
+
+    @python_method
+    def _drawLayout(self, rect, originX):
+        layout = self._getLayout()
         # draw the background
         bounds = self.bounds()
         self._backgroundColor.set()
@@ -498,12 +541,11 @@ class DefconAppKitGlyphLineNSView(NSView):
         scale = self._scale
         descender = self._descender
         upm = self._upm
-        scrollWidth = bounds.size[0]
         # offset for the buffer
         ctx = NSGraphicsContext.currentContext()
         ctx.saveGraphicsState()
         aT = NSAffineTransform.transform()
-        aT.translateXBy_yBy_(scrollWidth - self._bufferLeft, self._bufferTop)
+        aT.translateXBy_yBy_(originX, self._bufferTop)
         aT.concat()
         # offset for the descender
         aT = NSAffineTransform.transform()
@@ -517,43 +559,18 @@ class DefconAppKitGlyphLineNSView(NSView):
         flipTransform.concat()
         # set the glyph color
         self._glyphColor.set()
-        # draw the records
-        left = scrollWidth - self._bufferLeft
-        bottom = self._bufferTop
-        height = upm * scale
-        previousXA = 0
-        for recordIndex, glyphRecord in enumerate(reversed(self._glyphRecords)):
-            glyph = glyphRecord.glyph
-            w = glyphRecord.advanceWidth
-            h = glyphRecord.advanceHeight
-            xP = glyphRecord.xPlacement
-            yP = glyphRecord.yPlacement
-            xA = glyphRecord.xAdvance
-            yA = glyphRecord.yAdvance
-            # handle offsets from the record
-            bottom += yP * scale
-            glyphHeight = height + ((h + yA) * scale)
-            glyphLeft = left + ((-w + xP - xA) * scale)
-            glyphWidth = (-w - xA) * scale
-            # store the glyph rect for the alternate menu
-            rect = ((glyphLeft, bottom), (glyphWidth, glyphHeight))
-            self._alternateRects[rect] = recordIndex
-            self._currentZeroZeroPoint = NSPoint(glyphLeft, bottom + height + (descender * scale))
-            # handle the placement
-            aT = NSAffineTransform.transform()
-            if xP:
-                xP += previousXA
-            aT.translateXBy_yBy_(-w - xA + xP, yP)
-            aT.concat()
-            # draw the glyph
-            rect = ((-w + xA - xP, descender - yP), (w, upm))
-            self.drawGlyph(glyph, rect, alternate=bool(glyphRecord.alternates))
-            # shift for the next glyph
+        # draw the records that intersect the dirty rect
+        (xMin, yMin), (w, h) = rect
+        glyphRecords = self._glyphRecords
+        for index in layout.getVisibleRange(xMin, xMin + w):
+            glyphRecord = glyphRecords[layout.getRecordIndex(index)]
+            self._currentZeroZeroPoint = NSPoint(*layout.getZeroZeroPoint(index))
+            ctx.saveGraphicsState()
             aT = NSAffineTransform.transform()
-            aT.translateXBy_yBy_(-xP, h + yA - yP)
+            aT.translateXBy_yBy_(*layout.getTranslation(index))
             aT.concat()
-            left += (-w - xP - xA) * scale
-            previousXA = xA
+            self.drawGlyph(glyphRecord.glyph, layout.getGlyphRect(index), alternate=bool(glyphRecord.alternates))
+            ctx.restoreGraphicsState()
         ctx.restoreGraphicsState()
 
 #    # -------------
@@ -619,6 +636,13 @@ class GlyphLineView(PlacardScrollView):
         if alternateHighlightColor is None:
             alternateHighlightColor = defaultAlternateHighlightColor
         self._applyKerning = applyKerning
+        self._kerningResolvers = {}
+        # font > GlyphPairIndex, built when a kerning change needs it
+        self._kerningPairIndexes = None
+        # the kerning and groups objects whose pair or group change
+        # has updated the records, and those that were cleared.
+        self._kerningChangesHandled = set()
+        self._kerningNeedsUpdate = set()
         self._glyphLineView = self.glyphLineViewClass.alloc().init()
         self._glyphLineView.setPointSize_(pointSize)
         self._glyphLineView.setRightToLeft_(rightToLeft)
@@ -648,7 +672,10 @@ class GlyphLineView(PlacardScrollView):
 
     def _breakCycles(self):
         if hasattr(self, "_glyphLineView"):
+            NSObject.cancelPreviousPerformRequestsWithTarget_selector_object_(self._glyphLineView, "kerningChangesPosted:", None)
             self._unsubscribeFromGlyphs()
+            self._kerningResolvers = {}
+            self._kerningPairIndexes = None
             del self._glyphLineView.vanillaWrapper
             del self._glyphLineView
         super(GlyphLineView, self)._breakCycles()
@@ -687,6 +714,8 @@ class GlyphLineView(PlacardScrollView):
                 continue
             handledGlyphs.add(glyph)
             glyph.addObserver(self, "_glyphChanged", "Glyph.Changed")
+            if self._applyKerning:
+                glyph.addObserver(self, "_glyphNameChanged", "Glyph.NameChanged")
             font = glyph.getParent()
             if font is None:
                 continue
@@ -695,18 +724,32 @@ class GlyphLineView(PlacardScrollView):
             handledFonts.add(font)
             font.info.addObserver(self, "_fontChanged", "Info.Changed")
             if self._applyKerning:
+                font.kerning.addObserver(self, "_kerningPairChanged", "Kerning.PairSet")
+                font.kerning.addObserver(self, "_kerningPairChanged", "Kerning.PairDeleted")
+                font.kerning.addObserver(self, "_kerningCleared", "Kerning.Cleared")
+                font.kerning.addObserver(self, "_kerningCleared", "Kerning.Updated")
                 font.kerning.addObserver(self, "_kerningChanged", "Kerning.Changed")
+                font.groups.addObserver(self, "_groupChanged", "Groups.GroupSet")
+                font.groups.addObserver(self, "_groupChanged", "Groups.GroupDeleted")
+                font.groups.addObserver(self, "_groupsCleared", "Groups.Cleared")
+                font.groups.addObserver(self, "_groupsCleared", "Groups.Updated")
+                font.groups.addObserver(self, "_kerningChanged", "Groups.Changed")
+        # the resolvers are kept for fonts that are still displayed
+        for font in list(self._kerningResolvers.keys()):
+            if font not in handledFonts:
+                del self._kerningResolvers[font]
 
     def _unsubscribeFromGlyphs(self):
         handledGlyphs = set()
         handledFonts = set()
-        glyphRecords = self._glyphLineView.getGlyphRecords()
-        for glyphRecord in glyphRecords:
+        for glyphRecord in self._glyphLineView.getGlyphRecordsNoCopy():
             glyph = glyphRecord.glyph
             if glyph in handledGlyphs:
                 continue
             handledGlyphs.add(glyph)
             glyph.removeObserver(self, "Glyph.Changed")
+            if self._applyKerning:
+                glyph.removeObserver(self, "Glyph.NameChanged")
             font = glyph.getParent()
             if font is None:
                 continue
@@ -715,15 +758,89 @@ class GlyphLineView(PlacardScrollView):
             handledFonts.add(font)
             font.info.removeObserver(self, "Info.Changed")
             if self._applyKerning:
+                font.kerning.removeObserver(self, "Kerning.PairSet")
+                font.kerning.removeObserver(self, "Kerning.PairDeleted")
+                font.kerning.removeObserver(self, "Kerning.Cleared")
+                font.kerning.removeObserver(self, "Kerning.Updated")
                 font.kerning.removeObserver(self, "Kerning.Changed")
+                font.groups.removeObserver(self, "Groups.GroupSet")
+                font.groups.removeObserver(self, "Groups.GroupDeleted")
+                font.groups.removeObserver(self, "Groups.Cleared")
+                font.groups.removeObserver(self, "Groups.Updated")
+                font.groups.removeObserver(self, "Groups.Changed")
 
     def _glyphChanged(self, notification):
         self._glyphLineView.setNeedsDisplay_(True)
 
+    def _glyphNameChanged(self, notification):
+        # the kerned pairs are found by glyph name
+        self._kerningPairIndexes = None
+
     def _kerningChanged(self, notification):
-        glyphRecords = self._glyphLineView.getGlyphRecords()
-        self._setKerningInGlyphRecords(glyphRecords)
-        self._glyphLineView.setNeedsDisplay_(True)
+        # the pair and group changes are posted before
+        # Kerning.Changed and Groups.Changed and have already
+        # updated the records. anything else, such as clearing,
+        # needs all of the records to be updated.
+        obj = notification.object
+        if obj in self._kerningNeedsUpdate or obj not in self._kerningChangesHandled:
+            self._setKerningInGlyphRecords(self._glyphLineView.getGlyphRecordsNoCopy())
+            self._glyphLineView.invalidateLayout()
+        self._kerningChangesHandled.discard(obj)
+        self._kerningNeedsUpdate.discard(obj)
+
+    def _kerningChangeHandled(self, obj):
+        # a handled change is only trusted by the Changed notification
+        # posted with it. held notifications can be replayed without
+        # one, so the handled changes are dropped after this pass of
+        # the run loop and a later Changed updates all of the records.
+        if not self._kerningChangesHandled:
+            self._glyphLineView.performSelector_withObject_afterDelay_("kerningChangesPosted:", None, 0)
+        self._kerningChangesHandled.add(obj)
+
+    def _resetKerningChanges(self):
+        self._kerningChangesHandled.clear()
+
+    def _getKerningFontForObject(self, obj):
+        for font in self._getKerningPairIndexes().keys():
+            if font.kerning is obj or font.groups is obj:
+                return font
+        return None
+
+    def _kerningPairChanged(self, notification):
+        self._kerningChangeHandled(notification.object)
+        font = self._getKerningFontForObject(notification.object)
+        if font is None:
+            return
+        lefts, rights = self._getKerningResolver(font).pairChanged(notification.data["key"])
+        positions = self._getKerningPairIndexes()[font].findPairs(lefts, rights)
+        self._updateKerningInGlyphRecords(font, positions)
+
+    def _kerningCleared(self, notification):
+        font = self._getKerningFontForObject(notification.object)
+        if font is not None:
+            self._getKerningResolver(font).clear()
+        self._kerningNeedsUpdate.add(notification.object)
+
+    def _groupChanged(self, notification):
+        self._kerningChangeHandled(notification.object)
+        font = self._getKerningFontForObject(notification.object)
+        if font is None:
+            return
+        change = self._getKerningResolver(font).groupChanged(notification.data["key"])
+        if change is not None:
+            side, glyphNames = change
+            pairIndex = self._getKerningPairIndexes()[font]
+            if side == 0:
+                positions = pairIndex.findLefts(glyphNames)
+            else:
+                positions = pairIndex.findRights(glyphNames)
+            self._updateKerningInGlyphRecords(font, positions)
+
+    def _groupsCleared(self, notification):
+        font = self._getKerningFontForObject(notification.object)
+        if font is not None:
+            self._getKerningResolver(font).clear()
+        self._kerningNeedsUpdate.add(notification.object)
 
     def _fontChanged(self, notification):
         glyphRecords = self._glyphLineView.getGlyphRecords()
@@ -733,17 +850,54 @@ class GlyphLineView(PlacardScrollView):
     # Kerning Support
     # ---------------
 
+    def _getKerningResolver(self, font):
+        resolver = self._kerningResolvers.get(font)
+        if resolver is None:
+            resolver = self._kerningResolvers[font] = KerningResolver(font.kerning, font.groups)
+        return resolver
+
+    def _getKerningPairIndexes(self):
+        # the kerned pairs in the line, by font, following
+        # the pairing in _setKerningInGlyphRecords.
+        if self._kerningPairIndexes is None:
+            glyphRecords = self._glyphLineView.getGlyphRecordsNoCopy()
+            fontPairs = {}
+            previousGlyph = None
+            previousFont = None
+            for index, glyphRecord in enumerate(glyphRecords):
+                glyph = glyphRecord.glyph
+                font = glyph.getParent()
+                if font is not None and font not in fontPairs:
+                    fontPairs[font] = [None] * len(glyphRecords)
+                if previousGlyph is not None and font is not None and (previousFont == font):
+                    fontPairs[font][index - 1] = (previousGlyph.name, glyph.name)
+                previousGlyph = glyph
+                previousFont = font
+            self._kerningPairIndexes = dict((font, GlyphPairIndex(pairs)) for font, pairs in fontPairs.items())
+        return self._kerningPairIndexes
+
+    def _updateKerningInGlyphRecords(self, font, positions):
+        glyphRecords = self._glyphLineView.getGlyphRecordsNoCopy()
+        resolver = self._getKerningResolver(font)
+        changed = []
+        for index in positions:
+            value = resolver.get(glyphRecords[index].glyph.name, glyphRecords[index + 1].glyph.name)
+            if glyphRecords[index].xAdvance != value:
+                glyphRecords[index].xAdvance = value
+                changed.append(index)
+        self._glyphLineView.invalidateGlyphRecords(changed)
+
     def _setKerningInGlyphRecords(self, glyphRecords):
         previousGlyph = None
         previousFont = None
+        resolver = None
         for index, glyphRecord in enumerate(glyphRecords):
             glyph = glyphRecord.glyph
             font = glyph.getParent()
             if previousGlyph is not None and font is not None and (previousFont == font):
-                kern = font.kerning.get((previousGlyph.name, glyph.name))
-                if kern is None:
-                    kern = 0
-                glyphRecords[index - 1].xAdvance = kern
+                if resolver is None or resolver.kerning is not font.kerning:
+                    resolver = self._getKerningResolver(font)
+                glyphRecords[index - 1].xAdvance = resolver.get(previousGlyph.name, glyph.name)
             previousGlyph = glyph
             previousFont = font
 
@@ -776,6 +930,7 @@ class GlyphLineView(PlacardScrollView):
             glyphRecords = glyphs
         # set the records into the view
         self._glyphLineView.setGlyphRecords_(glyphRecords)
+        self._kerningPairIndexes = None
         # subscribe to the new glyphs
         self._subscribeToGlyphs(glyphRecords)
 
@@ -1,4 +1,5 @@
 import vanilla
+from defconAppKit.tools.glyphNamePrefixIndex import GlyphNamePrefixIndex
 
 
 class GlyphNameComboBox(vanilla.EditText):
@@ -8,12 +9,65 @@ class GlyphNameComboBox(vanilla.EditText):
         self._font = font
         self._finalCallback = callback
         self._currentText = ""
+        self._glyphNamePrefixIndex = None
+        self._layer = None
+        self._subscribeLayer()
 
     def _breakCycles(self):
+        self._unsubscribeLayer()
         self._font = None
         self._finalCallback = None
         super(GlyphNameComboBox, self)._breakCycles()
 
+    # ----------------
+    # glyph name index
+    # ----------------
+
+    def _subscribeLayer(self):
+        if self._font is None:
+            return
+        self._layer = self._font.layers.defaultLayer
+        self._layer.addObserver(self, "_glyphAdded", "Layer.GlyphAdded")
+        self._layer.addObserver(self, "_glyphDeleted", "Layer.GlyphDeleted")
+        self._layer.addObserver(self, "_glyphNameChanged", "Layer.GlyphNameChanged")
+        self._font.layers.addObserver(self, "_defaultLayerChanged", "LayerSet.DefaultLayerChanged")
+
+    def _unsubscribeLayer(self):
+        if self._layer is None:
+            return
+        self._layer.removeObserver(self, "Layer.GlyphAdded")
+        self._layer.removeObserver(self, "Layer.GlyphDeleted")
+        self._layer.removeObserver(self, "Layer.GlyphNameChanged")
+        self._font.layers.removeObserver(self, "LayerSet.DefaultLayerChanged")
+        self._layer = None
+        self._glyphNamePrefixIndex = None
+
+    def _getGlyphNamePrefixIndex(self):
+        if self._glyphNamePrefixIndex is None:
+            self._glyphNamePrefixIndex = GlyphNamePrefixIndex(self._font.keys())
+        return self._glyphNamePrefixIndex
+
+    def _glyphAdded(self, notification):
+        if self._glyphNamePrefixIndex is not None:
+            self._glyphNamePrefixIndex.addName(notification.data["name"])
+
+    def _glyphDeleted(self, notification):
+        if self._glyphNamePrefixIndex is not None:
+            self._glyphNamePrefixIndex.removeName(notification.data["name"])
+
+    def _glyphNameChanged(self, notification):
+        if self._glyphNamePrefixIndex is not None:
+            data = notification.data
+            self._glyphNamePrefixIndex.renameName(data["oldValue"], data["newValue"])
+
+    def _defaultLayerChanged(self, notification):
+        self._unsubscribeLayer()
+        self._subscribeLayer()
+
+    # --------
+    # callback
+    # --------
+
     def _textInputCallback(self, sender):
         input = sender.get()
         deleting = False
@@ -21,7 +75,7 @@ class GlyphNameComboBox(vanilla.EditText):
             if self._currentText.startswith(input):
                 deleting = True
         self._currentText = input
-        input, match = _search(input, self._font, deleting=deleting)
+        input, match = _search(input, self._font, deleting=deleting, glyphNamePrefixIndex=self._getGlyphNamePrefixIndex())
         if match is None:
             return
         if match != input:
@@ -37,8 +91,11 @@ class GlyphNameComboBox(vanilla.EditText):
             self._finalCallback(self)
 
 
-def _search(text, font, deleting):
+def _search(text, font, deleting, glyphNamePrefixIndex=None):
     """
+    If glyphNamePrefixIndex is not given, an index
+    is built from the glyph names in font.
+
     >>> from fontTools.agl import AGL2UV
     >>> from defcon import Font
     >>> font = Font()
@@ -57,6 +114,8 @@ def _search(text, font, deleting):
 
     >>> _search("eight.al", font, True)
     ('eight.al', 'eight')
+    >>> _search("eight.altx", font, True)
+    ('eight.altx', 'eight.alt')
     """
     # no text
     if not text:
@@ -74,24 +133,12 @@ def _search(text, font, deleting):
             text = ""
     # fallback. find closest match
     if match is None:
-        glyphNames = list(sorted(glyphNames))
+        if glyphNamePrefixIndex is None:
+            glyphNamePrefixIndex = GlyphNamePrefixIndex(glyphNames)
         if not deleting:
-            for glyphName in glyphNames:
-                if glyphName.startswith(text):
-                    match = glyphName
-                    break
+            match = glyphNamePrefixIndex.firstNameWithPrefix(text)
         else:
-            matches = []
-            for glyphName in glyphNames:
-                if text.startswith(glyphName):
-                    matches.append(glyphName)
-                elif match is not None:
-                    break
-            diff = None
-            for m in matches:
-                d = len(m) - len(text)
-                if diff is None or d < diff:
-                    match = m
+            match = glyphNamePrefixIndex.longestNameThatIsPrefixOf(text)
     return text, match
 
 
@@ -1,17 +1,36 @@
 import vanilla
-from defconAppKit.tools.textSplitter import splitText
+from defconAppKit.tools.textSplitter import CmapResolver, IncrementalTextSplitter, OffsetList
 
 
 class GlyphSequenceEditText(vanilla.EditText):
 
     def __init__(self, posSize, font, callback=None, sizeStyle="regular"):
         self._font = font
+        self._layer = None
+        self._unicodeData = None
+        self._unicodeDataVersion = 0
+        self._glyphSetVersion = 0
+        self._splitter = None
+        # the glyphs are cached for a text and the
+        # unicode data and glyph set versions.
+        self._cacheKey = None
+        self._glyphRecords = []
+        # the number of glyphs in the font before each record
+        self._glyphOffsets = OffsetList([0])
+        self._glyphs = []
+        self._lastChange = None
         self._finalCallback = callback
         super(GlyphSequenceEditText, self).__init__(posSize, callback=self._inputCallback, sizeStyle=sizeStyle)
 
     def _breakCycles(self):
+        self._unsubscribeLayer()
         self._font = None
         self._finalCallback = None
+        self._splitter = None
+        self._glyphRecords = []
+        self._glyphOffsets = OffsetList([0])
+        self._glyphs = []
+        self._lastChange = None
         super(GlyphSequenceEditText, self)._breakCycles()
 
     def _inputCallback(self, sender):
@@ -19,8 +38,120 @@ class GlyphSequenceEditText(vanilla.EditText):
             return
         self._finalCallback(self)
 
-    def get(self):
+    # notifications
+
+    def _subscribeLayer(self):
+        # the default layer, and with it the unicode data, can change
+        layer = self._font.layers.defaultLayer
+        if layer is self._layer:
+            return
+        self._unsubscribeLayer()
+        self._layer = layer
+        self._unicodeData = layer.unicodeData
+        self._unicodeData.addObserver(self, "_unicodeDataChanged", "UnicodeData.Changed")
+        layer.addObserver(self, "_glyphSetChanged", "Layer.GlyphAdded")
+        layer.addObserver(self, "_glyphSetChanged", "Layer.GlyphDeleted")
+        layer.addObserver(self, "_glyphSetChanged", "Layer.GlyphNameChanged")
+        self._unicodeDataChanged(None)
+        self._glyphSetChanged(None)
+
+    def _unsubscribeLayer(self):
+        if self._layer is None:
+            return
+        self._unicodeData.removeObserver(self, "UnicodeData.Changed")
+        self._layer.removeObserver(self, "Layer.GlyphAdded")
+        self._layer.removeObserver(self, "Layer.GlyphDeleted")
+        self._layer.removeObserver(self, "Layer.GlyphNameChanged")
+        self._layer = None
+        self._unicodeData = None
+
+    def _unicodeDataChanged(self, notification):
+        self._unicodeDataVersion += 1
+        if self._splitter is not None:
+            self._splitter.setCmap(CmapResolver(self._unicodeData))
+
+    def _glyphSetChanged(self, notification):
+        self._glyphSetVersion += 1
+
+    # splitting
+
+    def _update(self):
+        # the change to the glyphs is added to the last change
+        self._subscribeLayer()
         text = super(GlyphSequenceEditText, self).get()
-        glyphNames = splitText(text, self._font.unicodeData)
-        glyphs = [self._font[glyphName] for glyphName in glyphNames if glyphName in self._font]
-        return glyphs
+        cacheKey = (text, self._unicodeDataVersion, self._glyphSetVersion)
+        if cacheKey == self._cacheKey:
+            return
+        glyphSetChanged = self._cacheKey is None or cacheKey[2] != self._cacheKey[2]
+        self._cacheKey = cacheKey
+        if self._splitter is None:
+            self._splitter = IncrementalTextSplitter(CmapResolver(self._unicodeData))
+        change = self._splitter.setText(text)
+        font = self._font
+        # any glyph may have been added or removed, so all are looked up again
+        if glyphSetChanged:
+            oldCount = len(self._glyphs)
+            glyphNames = self._splitter.getGlyphNames()
+            self._glyphRecords = [font[glyphName] if glyphName in font else None for glyphName in glyphNames]
+            self._glyphs = [glyph for glyph in self._glyphRecords if glyph is not None]
+            self._glyphOffsets = OffsetList(_countGlyphs(self._glyphRecords, 0, [0]))
+            self._addChange(0, oldCount, list(self._glyphs))
+            return
+        if change is None:
+            return
+        start, length, glyphNames = change
+        offsets = self._glyphOffsets
+        glyphStart = offsets[start]
+        glyphLength = offsets[start + length] - glyphStart
+        newRecords = [font[glyphName] if glyphName in font else None for glyphName in glyphNames]
+        self._glyphRecords[start:start + length] = newRecords
+        newGlyphs = [glyph for glyph in newRecords if glyph is not None]
+        offsets.replace(start + 1, start + length + 1, _countGlyphs(newRecords, glyphStart, []), len(newGlyphs) - glyphLength)
+        self._glyphs[glyphStart:glyphStart + glyphLength] = newGlyphs
+        if glyphLength or newGlyphs:
+            self._addChange(glyphStart, glyphLength, newGlyphs)
+
+    def _addChange(self, start, length, glyphs):
+        if self._lastChange is None:
+            self._lastChange = (start, length, glyphs)
+            return
+        # merge the two changes into one replaced range
+        lastStart, lastLength, lastGlyphs = self._lastChange
+        end = max(lastStart + len(lastGlyphs), start + length)
+        start = min(lastStart, start)
+        oldEnd = end - len(lastGlyphs) + lastLength
+        newEnd = end + len(glyphs) - length
+        self._lastChange = (start, oldEnd - start, self._glyphs[start:newEnd])
+
+    def get(self):
+        self._update()
+        return list(self._glyphs)
+
+    def getGlyphNames(self):
+        """
+        Get the glyph names in the text, including the
+        names of glyphs that are not in the font.
+        """
+        self._update()
+        return list(self._splitter.getGlyphNames())
+
+    def getChange(self):
+        """
+        Get the change to the glyphs since the last call to
+        getChange as (start, length, glyphs): the glyphs from
+        start to start + length were replaced with glyphs.
+        None is returned if nothing changed.
+        """
+        self._update()
+        change = self._lastChange
+        self._lastChange = None
+        return change
+
+
+def _countGlyphs(records, count, counts):
+    # append the number of glyphs up to and including each record
+    for glyph in records:
+        if glyph is not None:
+            count += 1
+        counts.append(count)
+    return counts
@@ -3,6 +3,8 @@ import vanilla
 from objc import python_method
 from defconAppKit.controls.placardScrollView import PlacardScrollView, PlacardPopUpButton
 from defconAppKit.tools import drawing
+from defconAppKit.tools.drawingPlan import DrawingPlan
+from defconAppKit.tools.layerStackCache import getLayerStackCache
 
 
 class DefconAppKitGlyphNSView(NSView):
@@ -28,6 +30,7 @@ class DefconAppKitGlyphNSView(NSView):
             showFontPostscriptBlues=False,
             showFontPostscriptFamilyBlues=False
         )
+        self._drawingPlan = None
 
         # cached vertical metrics
         self._unitsPerEm = 1000
@@ -145,6 +148,7 @@ class DefconAppKitGlyphNSView(NSView):
             if layerName not in self._layerDrawingAttributes:
                 self._layerDrawingAttributes[layerName] = {}
             self._layerDrawingAttributes[layerName][attr] = value
+        self._drawingPlan = None
         self.setNeedsDisplay_(True)
 
     def getDrawingAttribute_layerName_(self, attr, layerName):
@@ -153,6 +157,19 @@ class DefconAppKitGlyphNSView(NSView):
         d = self._layerDrawingAttributes.get(layerName, {})
         return d.get(attr)
 
+    @python_method
+    def getDrawingPlan(self):
+        """
+        Get the DrawingPlan for the current drawing attributes
+        and point size. It is built again when they change.
+        """
+        plan = self._drawingPlan
+        if plan is None or plan.impliedPointSize != self._impliedPointSize:
+            plan = self._drawingPlan = DrawingPlan(
+                self._fallbackDrawingAttributes, self._layerDrawingAttributes, self._impliedPointSize
+            )
+        return plan
+
     def setShowFill_(self, value):
         self.setDrawingAttribute_value_layerName_("showGlyphFill", value, None)
 
@@ -275,38 +292,35 @@ class DefconAppKitGlyphNSView(NSView):
         if layerSet is None:
             layers = [(self._glyph, None)]
         else:
-            glyphName = self._glyph.name
             layers = []
-            for layerName in reversed(layerSet.layerOrder):
-                layer = layerSet[layerName]
-                if glyphName not in layer:
-                    continue
-                glyph = layer[glyphName]
+            for layerName, glyph in getLayerStackCache(layerSet).getLayerStack(self._glyph.name):
                 if glyph == self._glyph:
                     layerName = None
                 layers.append((glyph, layerName))
 
+        plan = self.getDrawingPlan()
         for glyph, layerName in layers:
+            steps = plan.getSteps(layerName)
             # draw the image
-            if self.getDrawingAttribute_layerName_("showGlyphImage", layerName):
+            if steps.image:
                 self.drawImage(glyph, layerName)
             # draw the blues
-            if layerName is None and self.getDrawingAttribute_layerName_("showFontPostscriptBlues", None):
+            if steps.blues:
                 self.drawBlues(glyph, layerName)
-            if layerName is None and self.getDrawingAttribute_layerName_("showFontPostscriptFamilyBlues", None):
+            if steps.familyBlues:
                 self.drawFamilyBlues(glyph, layerName)
             # draw the margins
-            if self.getDrawingAttribute_layerName_("showGlyphMargins", layerName):
+            if steps.margins:
                 self.drawMargins(glyph, layerName)
             # draw the vertical metrics
-            if layerName is None and self.getDrawingAttribute_layerName_("showFontVerticalMetrics", None):
+            if steps.verticalMetrics:
                 self.drawVerticalMetrics(glyph, layerName)
             # draw the glyph
-            if self.getDrawingAttribute_layerName_("showGlyphFill", layerName) or self.getDrawingAttribute_layerName_("showGlyphStroke", layerName):
+            if steps.fillAndStroke:
                 self.drawFillAndStroke(glyph, layerName)
-            if self.getDrawingAttribute_layerName_("showGlyphOnCurvePoints", layerName) or self.getDrawingAttribute_layerName_("showGlyphOffCurvePoints", layerName):
+            if steps.points:
                 self.drawPoints(glyph, layerName)
-            if self.getDrawingAttribute_layerName_("showGlyphAnchors", layerName):
+            if steps.anchors:
                 self.drawAnchors(glyph, layerName)
 
     def drawBackground(self):
@@ -327,7 +341,7 @@ class DefconAppKitGlyphNSView(NSView):
 
     @python_method
     def drawVerticalMetrics(self, glyph, layerName):
-        drawText = self.getDrawingAttribute_layerName_("showFontVerticalMetricsTitles", layerName) and self._impliedPointSize > 150
+        drawText = self.getDrawingPlan().getSteps(layerName).verticalMetricsTitles
         drawing.drawFontVerticalMetrics(glyph, self._inverseScale, self._drawingRect, drawText=drawText, backgroundColor=self._backgroundColor)
 
     @python_method
@@ -336,23 +350,25 @@ class DefconAppKitGlyphNSView(NSView):
 
     @python_method
     def drawFillAndStroke(self, glyph, layerName):
-        showFill = self.getDrawingAttribute_layerName_("showGlyphFill", layerName)
-        showStroke = self.getDrawingAttribute_layerName_("showGlyphStroke", layerName)
+        steps = self.getDrawingPlan().getSteps(layerName)
+        showFill = steps.fill
+        showStroke = steps.stroke
         drawing.drawGlyphFillAndStroke(glyph, self._inverseScale, self._drawingRect, drawFill=showFill, drawStroke=showStroke, backgroundColor=self._backgroundColor)
 
     @python_method
     def drawPoints(self, glyph, layerName):
-        drawStartPoint = self.getDrawingAttribute_layerName_("showGlyphStartPoints", layerName) and self._impliedPointSize > 175
-        drawOnCurves = self.getDrawingAttribute_layerName_("showGlyphOnCurvePoints", layerName) and self._impliedPointSize > 175
-        drawOffCurves = self.getDrawingAttribute_layerName_("showGlyphOffCurvePoints", layerName) and self._impliedPointSize > 175
-        drawCoordinates = self.getDrawingAttribute_layerName_("showGlyphPointCoordinates", layerName) and self._impliedPointSize > 250
+        steps = self.getDrawingPlan().getSteps(layerName)
+        drawStartPoint = steps.startPoints
+        drawOnCurves = steps.onCurvePoints
+        drawOffCurves = steps.offCurvePoints
+        drawCoordinates = steps.pointCoordinates
         drawing.drawGlyphPoints(glyph, self._inverseScale, self._drawingRect,
             drawStartPoint=drawStartPoint, drawOnCurves=drawOnCurves, drawOffCurves=drawOffCurves, drawCoordinates=drawCoordinates,
             backgroundColor=self._backgroundColor)
 
     @python_method
     def drawAnchors(self, glyph, layerName):
-        drawText = self._impliedPointSize > 50
+        drawText = self.getDrawingPlan().getSteps(layerName).anchorTitles
         drawing.drawGlyphAnchors(glyph, self._inverseScale, self._drawingRect, drawText=drawText, backgroundColor=self._backgroundColor)
 
 
@@ -0,0 +1,125 @@
+defaultCutoffDisplayPointSizes = dict(
+    showFontVerticalMetrics=150,
+    showGlyphStartPoints=175,
+    showGlyphOnCurvePoints=175,
+    showGlyphOffCurvePoints=175,
+    showGlyphPointCoordinates=250,
+    showGlyphAnchors=50
+)
+
+
+class LayerDrawingSteps(object):
+
+    """
+    The draw steps that run for one layer. Each attribute
+    is a bool that has been resolved from the drawing
+    attributes and the point size cutoffs.
+    """
+
+    __slots__ = [
+        "image",
+        "blues",
+        "familyBlues",
+        "margins",
+        "verticalMetrics",
+        "verticalMetricsTitles",
+        "fillAndStroke",
+        "fill",
+        "stroke",
+        "points",
+        "startPoints",
+        "onCurvePoints",
+        "offCurvePoints",
+        "pointCoordinates",
+        "anchors",
+        "anchorTitles"
+    ]
+
+    def __init__(self, getAttribute, isMainLayer, impliedPointSize, cutoffDisplayPointSizes):
+        def aboveCutoff(attr):
+            return impliedPointSize > cutoffDisplayPointSizes[attr]
+
+        self.image = bool(getAttribute("showGlyphImage"))
+        # the font level metrics are only drawn for the main layer
+        self.blues = isMainLayer and bool(getAttribute("showFontPostscriptBlues"))
+        self.familyBlues = isMainLayer and bool(getAttribute("showFontPostscriptFamilyBlues"))
+        self.margins = bool(getAttribute("showGlyphMargins"))
+        self.verticalMetrics = isMainLayer and bool(getAttribute("showFontVerticalMetrics"))
+        self.verticalMetricsTitles = bool(getAttribute("showFontVerticalMetricsTitles")) and aboveCutoff("showFontVerticalMetrics")
+        self.fill = bool(getAttribute("showGlyphFill"))
+        self.stroke = bool(getAttribute("showGlyphStroke"))
+        self.fillAndStroke = self.fill or self.stroke
+        onCurvePoints = bool(getAttribute("showGlyphOnCurvePoints"))
+        offCurvePoints = bool(getAttribute("showGlyphOffCurvePoints"))
+        self.points = onCurvePoints or offCurvePoints
+        self.startPoints = bool(getAttribute("showGlyphStartPoints")) and aboveCutoff("showGlyphStartPoints")
+        self.onCurvePoints = onCurvePoints and aboveCutoff("showGlyphOnCurvePoints")
+        self.offCurvePoints = offCurvePoints and aboveCutoff("showGlyphOffCurvePoints")
+        self.pointCoordinates = bool(getAttribute("showGlyphPointCoordinates")) and aboveCutoff("showGlyphPointCoordinates")
+        self.anchors = bool(getAttribute("showGlyphAnchors"))
+        self.anchorTitles = aboveCutoff("showGlyphAnchors")
+
+
+class DrawingPlan(object):
+
+    """
+    This object resolves the drawing attributes of a view into
+    the draw steps that run for each layer, so that drawing does
+    not need to look up the attributes for every glyph. The plan
+    is only valid for the attributes and the point size that it
+    was built with.
+
+    fallbackAttributes are the attributes for the main layer,
+    given as layer name None. layerAttributes is a dictionary of
+    layer names to attribute dictionaries. Layers that are not
+    in layerAttributes have no draw steps.
+
+    >>> fallback = dict(showGlyphFill=True, showGlyphOnCurvePoints=True, showGlyphStartPoints=True,
+    ...     showFontVerticalMetrics=True, showFontVerticalMetricsTitles=True)
+    >>> layers = dict(background=dict(showGlyphStroke=True, showFontVerticalMetrics=True))
+    >>> plan = DrawingPlan(fallback, layers, impliedPointSize=160)
+    >>> steps = plan.getSteps(None)
+    >>> steps.fillAndStroke, steps.fill, steps.stroke
+    (True, True, False)
+    >>> steps.points, steps.onCurvePoints, steps.startPoints
+    (True, False, False)
+    >>> steps.verticalMetrics, steps.verticalMetricsTitles, steps.anchorTitles
+    (True, True, True)
+    >>> steps = plan.getSteps("background")
+    >>> steps.fillAndStroke, steps.fill, steps.stroke, steps.verticalMetrics
+    (True, False, True, False)
+    >>> steps = plan.getSteps("unknown")
+    >>> steps.fillAndStroke, steps.image
+    (False, False)
+    >>> plan.impliedPointSize
+    160
+
+    - Test the cutoffs
+    >>> plan = DrawingPlan(fallback, layers, impliedPointSize=200)
+    >>> plan.getSteps(None).onCurvePoints
+    True
+    >>> plan = DrawingPlan(fallback, layers, impliedPointSize=200, cutoffDisplayPointSizes=dict(defaultCutoffDisplayPointSizes, showGlyphOnCurvePoints=300))
+    >>> plan.getSteps(None).onCurvePoints
+    False
+    """
+
+    def __init__(self, fallbackAttributes, layerAttributes, impliedPointSize, cutoffDisplayPointSizes=None):
+        if cutoffDisplayPointSizes is None:
+            cutoffDisplayPointSizes = defaultCutoffDisplayPointSizes
+        self.impliedPointSize = impliedPointSize
+        self._steps = {}
+        self._steps[None] = LayerDrawingSteps(fallbackAttributes.get, True, impliedPointSize, cutoffDisplayPointSizes)
+        for layerName, attributes in layerAttributes.items():
+            self._steps[layerName] = LayerDrawingSteps(attributes.get, False, impliedPointSize, cutoffDisplayPointSizes)
+        self._emptySteps = LayerDrawingSteps({}.get, False, impliedPointSize, cutoffDisplayPointSizes)
+
+    def getSteps(self, layerName):
+        """
+        Get the LayerDrawingSteps for layerName.
+        """
+        return self._steps.get(layerName, self._emptySteps)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,254 @@
+import threading
+import time
+import traceback
+from defconAppKit.tools.featureTextTools import findFeatureTextSymbols, SymbolSearchCancelled
+
+
+class FeatureTextSymbolIndex(object):
+
+    """
+    This object finds the symbols in feature text on a background
+    thread. Each call to textChanged or textEdited restarts a delay
+    and the text is only searched once the delay has passed without
+    another change. A search that is running when the text changes
+    is cancelled. The callback, if given, is called with the index
+    on the worker thread after new symbols have been stored.
+
+    The finder is a callable that takes the text and an isCancelled
+    callable and returns a list of symbols. It defaults to
+    findFeatureTextSymbols.
+
+    - Test debouncing
+    >>> index = FeatureTextSymbolIndex(delay=0.05)
+    >>> index.getSymbols()
+    []
+    >>> index.textChanged("feature liga {} liga;")
+    >>> index.textChanged("feature kern {} kern;")
+    >>> index.textChanged("feature kern {} kern;\\nfeature mark {} mark;")
+    >>> index.waitUntilIdle()
+    True
+    >>> index.getSymbols()
+    [('feature', 'kern', 0), ('feature', 'mark', 22)]
+    >>> stats = index.getStats()
+    >>> stats["searches"], stats["debounced"]
+    (1, 2)
+
+    - Test querying
+    >>> index.findSymbol("mark")
+    ('feature', 'mark', 22)
+    >>> index.findSymbol("kern", "lookup") is None
+    True
+
+    - Test edits
+    >>> index.textEdited(0, 0, "table GDEF {} GDEF;\\n")
+    >>> index.textEdited(28, 4, "liga")
+    >>> index.waitUntilIdle()
+    True
+    >>> index.getSymbols()
+    [('table', 'GDEF', 0), ('feature', 'liga', 20), ('feature', 'mark', 42)]
+    >>> index.getStats()["debounced"]
+    3
+
+    - Test cancelling
+    >>> started = threading.Event()
+    >>> gate = threading.Event()
+    >>> def slowFinder(text, isCancelled):
+    ...     started.set()
+    ...     gate.wait()
+    ...     return findFeatureTextSymbols(text, isCancelled)
+    >>> found = []
+    >>> index = FeatureTextSymbolIndex(delay=0, finder=slowFinder, callback=lambda index: found.append(index.getSymbols()))
+    >>> index.textChanged("table GDEF {} GDEF;")
+    >>> started.wait(5)
+    True
+    >>> index.textChanged("table OS/2 {} OS/2;")
+    >>> gate.set()
+    >>> index.waitUntilIdle()
+    True
+    >>> found
+    [[('table', 'OS/2', 0)]]
+    >>> index.getStats()["cancelled"]
+    1
+    >>> index.close()
+    """
+
+    def __init__(self, callback=None, delay=0.3, finder=findFeatureTextSymbols):
+        self._callback = callback
+        self._delay = delay
+        self._finder = finder
+        self._lock = threading.Condition()
+        self._worker = None
+        self._text = ""
+        self._pending = False
+        self._pendingText = None
+        self._pendingEdits = []
+        self._deadline = None
+        self._generation = 0
+        self._searching = False
+        self._closed = False
+        self._symbols = []
+        self.searches = 0
+        self.cancelled = 0
+        self.debounced = 0
+
+    # ------
+    # Access
+    # ------
+
+    def getSymbols(self):
+        """
+        Get the symbols found by the last completed search.
+        """
+        return list(self._symbols)
+
+    def findSymbol(self, name, typ=None):
+        """
+        Get the first symbol with name, and with typ if it is given.
+        None is returned if there is no such symbol.
+        """
+        for symbol in self._symbols:
+            if symbol[1] == name and (typ is None or symbol[0] == typ):
+                return symbol
+        return None
+
+    def getStats(self):
+        """
+        Get a dictionary of counters describing the state of the index.
+        """
+        with self._lock:
+            return dict(
+                pending=self._pending,
+                searching=self._searching,
+                symbols=len(self._symbols),
+                searches=self.searches,
+                cancelled=self.cancelled,
+                debounced=self.debounced
+            )
+
+    # ----------
+    # Scheduling
+    # ----------
+
+    def textChanged(self, text):
+        """
+        Search text once the delay has passed.
+        """
+        with self._lock:
+            self._pendingText = text
+            self._pendingEdits = []
+            self._schedule()
+
+    def textEdited(self, start, oldLength, replacement):
+        """
+        Replace oldLength characters at start with replacement
+        in the text and search it once the delay has passed.
+        The edits are only applied on the worker thread, so this
+        is cheap enough to be called after every keystroke.
+        """
+        with self._lock:
+            self._pendingEdits.append((start, oldLength, replacement))
+            self._schedule()
+
+    def _schedule(self):
+        if self._pending:
+            self.debounced += 1
+        self._pending = True
+        self._deadline = time.time() + self._delay
+        # any running search is out of date
+        self._generation += 1
+        self._startWorker()
+        self._lock.notify_all()
+
+    def cancel(self):
+        """
+        Cancel the pending and the running search. Text changes
+        are kept and searched after the next change.
+        """
+        with self._lock:
+            self._pending = False
+            self._generation += 1
+            self._lock.notify_all()
+
+    def waitUntilIdle(self, timeout=None):
+        """
+        Block until there is no pending or running search.
+        Returns False if the timeout expired first.
+        """
+        with self._lock:
+            return self._lock.wait_for(lambda: not self._pending and not self._searching, timeout)
+
+    def close(self):
+        """
+        Stop the worker thread.
+        """
+        with self._lock:
+            self._closed = True
+            self._pending = False
+            self._generation += 1
+            self._lock.notify_all()
+
+    # ------
+    # Worker
+    # ------
+
+    def _startWorker(self):
+        if self._closed or self._worker is not None:
+            return
+        self._worker = threading.Thread(target=self._work)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while not self._closed:
+                    if self._pending:
+                        remaining = self._deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        self._lock.wait(remaining)
+                    else:
+                        self._lock.wait()
+                if self._closed:
+                    return
+                text = self._pendingText
+                edits = self._pendingEdits
+                self._pending = False
+                self._pendingText = None
+                self._pendingEdits = []
+                generation = self._generation
+                self._searching = True
+            # only this thread reads and writes the text
+            if text is None:
+                text = self._text
+            for start, oldLength, replacement in edits:
+                text = text[:start] + replacement + text[start + oldLength:]
+            self._text = text
+
+            def isCancelled():
+                return generation != self._generation
+
+            symbols = None
+            try:
+                symbols = self._finder(text, isCancelled)
+            except SymbolSearchCancelled:
+                pass
+            except Exception:
+                traceback.print_exc()
+            with self._lock:
+                self._searching = False
+                stored = False
+                if generation != self._generation:
+                    self.cancelled += 1
+                elif symbols is not None:
+                    self._symbols = symbols
+                    self.searches += 1
+                    stored = True
+                self._lock.notify_all()
+            if stored and self._callback is not None:
+                self._callback(self)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
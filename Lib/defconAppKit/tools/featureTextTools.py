@@ -1,4 +1,6 @@
+import os
 import re
+from bisect import bisect_left, bisect_right
 
 # -------------------
 # Syntax Highlighting
@@ -94,6 +96,19 @@ _keywordRE = re.compile(
     "[>\s;(]+"                                    # space, >, ;, (
 )
 
+# the two branches of _keywordRE. the first branch is
+# anchored at the position where the previous run ended.
+_keywordStartRE = re.compile(
+    "(" + "|".join(_keywords.splitlines()) + ")"  # keywords
+    "[>\s;(]+"                                    # space, >, ;, (
+)
+
+_keywordInsideRE = re.compile(
+    "[<\s;]+"                                     # space, <, ;
+    "(" + "|".join(_keywords.splitlines()) + ")"  # keywords
+    "[>\s;(]+"                                    # space, >, ;, (
+)
+
 
 _tokens = """;
 ,
@@ -135,11 +150,22 @@ _stringRE = re.compile(
 
 
 def breakFeatureTextIntoRuns(text):
+    """
+    >>> text = 'feature liga {sub f i by f_i;} liga; @class = [a b]; include(x.fea); name "A"; # c'
+    >>> for name, runs in breakFeatureTextIntoRuns(text):
+    ...     print(name, runs)
+    tokens [(13, 14), (28, 29), (29, 30), (35, 36), (44, 45), (46, 47), (50, 51), (51, 52), (60, 61), (66, 67), (67, 68), (77, 78)]
+    keywords [(0, 8), (21, 25), (51, 61), (67, 74)]
+    classNames [(37, 43)]
+    includes [(53, 68)]
+    strings [(74, 77)]
+    comments [(79, 82)]
+    """
     runs = []
     # tokens
     runs.append(("tokens", _findRuns(text, _tokenRE)))
     # keywords
-    runs.append(("keywords", _findRuns(text, _keywordRE)))
+    runs.append(("keywords", _findKeywordRuns(text)))
     # class names
     runs.append(("classNames", _findRuns(text, _classNameRE)))
     # includes
@@ -152,19 +178,24 @@ def breakFeatureTextIntoRuns(text):
 
 
 def _findRuns(text, pattern):
+    return [m.span() for m in pattern.finditer(text)]
+
+
+def _findKeywordRuns(text):
+    # this matches _keywordRE as if the text was sliced after
+    # each run, so a keyword directly following a run counts
+    # as being at the start of the string.
     runs = []
-    offset = 0
-    while 1:
-        m = pattern.search(text)
+    position = 0
+    length = len(text)
+    while position < length:
+        m = _keywordStartRE.match(text, position)
         if m is None:
-            break
-        else:
-            start, end = m.span()
-            runs.append((start + offset, end + offset))
-            offset = offset + end
-            text = text[end:]
-            if not text:
+            m = _keywordInsideRE.search(text, position)
+            if m is None:
                 break
+        runs.append(m.span())
+        position = m.end()
     return runs
 
 
@@ -186,37 +217,678 @@ _blockOpenScanRE = re.compile(
     "(\{)"
 )
 
-_lineEndRE = re.compile("([\r\n]+)", re.MULTILINE)
-_notLineEndRE = re.compile("(.*$)")
 
+def findBlockOpenLineStarts(text, lineOffsets=None):
+    r"""
+    Find the feature and table blocks in text. A list of
+    (tag, offset of the start of the line) is returned.
+    lineOffsets is an optional LineOffsetTable for text.
 
-def findBlockOpenLineStarts(text):
+    >>> text = "languagesystem DFLT dflt;\n\n# feature test {\nfeature liga {\n} liga;\n  table GDEF {} GDEF;"
+    >>> findBlockOpenLineStarts(text)
+    [('liga', 44), ('GDEF', 67)]
+    """
+    if lineOffsets is None:
+        lineOffsets = LineOffsetTable(text)
     # remove all comments
     strippedText = _commentSubRE.sub("", text)
     # remove all strings
     strippedText = _stringRE.sub("", strippedText)
-    # work through the text
+    # removing comments and strings does not remove
+    # line breaks, so the line numbers are the same
+    strippedLineOffsets = LineOffsetTable(strippedText)
     found = []
-    truncatedText = strippedText
-    offset = 0
-    while True:
-        m = _blockOpenScanRE.search(truncatedText)
-        if m is None:
-            break
-        else:
-            start, end = m.span()
-            start += len(m.group(1))
-            truncatedText = truncatedText[end:]
-            start += offset
-            end += offset
-            offset = end
-            # get the line number=
-            lineBreaks = _lineEndRE.findall(strippedText[:start])
-            lineNumber = len("".join(lineBreaks))
-            # work out the character position
-            lines = text.splitlines()[:lineNumber]
-            characters = sum([len(line) for line in lines])
-            characterIndex = characters + len("".join(lineBreaks[:len(lines)]))
-            # store
-            found.append((m.group(3), characterIndex))
+    for m in _blockOpenScanRE.finditer(strippedText):
+        start = m.start() + len(m.group(1))
+        lineNumber = strippedLineOffsets.getLineForOffset(start)
+        found.append((m.group(3), lineOffsets.getOffsetForLine(lineNumber)))
     return found
+
+
+# ----------------
+# Symbol Searching
+# ----------------
+
+_symbolNameStart = "(?<![A-Za-z0-9_.@\\-])"
+
+_symbolScanRE = re.compile(
+    _symbolNameStart + "feature\\s+(?P<feature>[A-Za-z0-9_]+)\\s*(?:useExtension\\s*)?\\{"
+    "|"
+    + _symbolNameStart + "lookup\\s+(?P<lookup>[A-Za-z0-9_.\\-]+)\\s*(?:useExtension\\s*)?\\{"
+    "|"
+    + _symbolNameStart + "table\\s+(?P<table>[A-Za-z0-9/]+)\\s*\\{"
+    "|"
+    + _symbolNameStart + "languagesystem\\s+(?P<languagesystem>[A-Za-z0-9_]+\\s+[A-Za-z0-9_]+)\\s*;"
+    "|"
+    + _symbolNameStart + "(?P<class>@[A-Za-z0-9_.\\-]+)\\s*="
+    "|"
+    + _symbolNameStart + "markClass\\s[^;]*?(?P<markClass>@[A-Za-z0-9_.\\-]+)\\s*;"
+    "|"
+    + _symbolNameStart + "include\\s*\\(\\s*(?P<include>[^)]*?)\\s*\\)"
+)
+
+_nonLineBreakRE = re.compile("[^\r\n]")
+
+
+class SymbolSearchCancelled(Exception):
+    pass
+
+
+def _blankOut(m):
+    # keep the line breaks so that offsets and lines do not change
+    return _nonLineBreakRE.sub(" ", m.group(0))
+
+
+def findFeatureTextSymbols(text, isCancelled=None):
+    """
+    Find the symbols defined in text. A list of (type, name, offset)
+    is returned in the order of the offsets. The types are "feature",
+    "lookup", "table", "languagesystem", "class", "markClass" and
+    "include". Each mark class is listed once, at its first definition.
+    Symbols in comments and strings are ignored.
+
+    isCancelled is an optional callable. If it returns True
+    while the text is being searched, SymbolSearchCancelled
+    is raised.
+
+    >>> text = "languagesystem DFLT dflt;\\n@UC = [A B];\\nmarkClass [acute] <anchor 0 0> @TOP;\\n" \\
+    ...     "markClass grave <anchor 0 0> @TOP;\\ninclude( kern.fea );\\n# feature test {\\n" \\
+    ...     "lookup foo {\\n} foo;\\nfeature liga {\\n lookup foo;\\n} liga;\\ntable OS/2 {} OS/2;"
+    >>> for symbol in findFeatureTextSymbols(text):
+    ...     print(symbol)
+    ('languagesystem', 'DFLT dflt', 0)
+    ('class', '@UC', 26)
+    ('markClass', '@TOP', 39)
+    ('include', 'kern.fea', 111)
+    ('lookup', 'foo', 149)
+    ('feature', 'liga', 169)
+    ('table', 'OS/2', 205)
+    >>> try:
+    ...     findFeatureTextSymbols(text, isCancelled=lambda: True)
+    ... except SymbolSearchCancelled:
+    ...     print("cancelled")
+    cancelled
+    """
+    # blank out all comments and strings
+    strippedText = _commentSubRE.sub(_blankOut, text)
+    strippedText = _stringRE.sub(_blankOut, strippedText)
+    symbols = []
+    markClasses = set()
+    for i, m in enumerate(_symbolScanRE.finditer(strippedText)):
+        if isCancelled is not None and not i % 100 and isCancelled():
+            raise SymbolSearchCancelled
+        typ = m.lastgroup
+        name = m.group(typ)
+        if typ == "markClass":
+            if name in markClasses:
+                continue
+            markClasses.add(name)
+        symbols.append((typ, name, m.start()))
+    if isCancelled is not None and isCancelled():
+        raise SymbolSearchCancelled
+    return symbols
+
+
+# ----------------
+# Include Resolving
+# ----------------
+
+_includeScanRE = re.compile(
+    _symbolNameStart + "include\\s*\\(\\s*([^)]*?)\\s*\\)"
+)
+
+
+def includeDirForUFOPath(ufoPath):
+    """
+    Get the directory that includes in the features of the
+    UFO at ufoPath are relative to. This is the directory
+    containing the UFO.
+
+    >>> includeDirForUFOPath("/fonts/MyFont.ufo/") == os.path.normpath("/fonts")
+    True
+    """
+    return os.path.dirname(os.path.normpath(os.path.abspath(ufoPath)))
+
+
+def _findIncludes(text):
+    strippedText = _commentSubRE.sub(_blankOut, text)
+    strippedText = _stringRE.sub(_blankOut, strippedText)
+    return [(m.start(), m.end(), m.group(1)) for m in _includeScanRE.finditer(strippedText)]
+
+
+class ResolvedFeatureText(object):
+
+    """
+    Feature text with all includes expanded. The source map
+    is a list of (start, length, path, sourceStart) segments,
+    in the order of start, that relate ranges in the text to
+    ranges in the files they came from. The path of the top
+    level text is None if it was not read from a file.
+    """
+
+    def __init__(self, text, sourceMap, includedPaths, errors):
+        self._text = text
+        self._sourceMap = sourceMap
+        self._segmentStarts = [segment[0] for segment in sourceMap]
+        self._includedPaths = includedPaths
+        self._errors = errors
+
+    def getText(self):
+        return self._text
+
+    def getSourceMap(self):
+        return list(self._sourceMap)
+
+    def getIncludedPaths(self):
+        """
+        Get the paths of the included files in the order
+        in which they were first included.
+        """
+        return list(self._includedPaths)
+
+    def getErrors(self):
+        """
+        Get a list of (path, offset, message) for the includes
+        that could not be expanded. These are left in the text
+        as they were written.
+        """
+        return list(self._errors)
+
+    def getSourceLocation(self, offset):
+        """
+        Get the (path, offset) in the source files that
+        offset in the text came from. None is returned
+        if offset is outside of the text.
+        """
+        if offset < 0 or offset >= len(self._text):
+            return None
+        i = bisect_right(self._segmentStarts, offset) - 1
+        start, length, path, sourceStart = self._sourceMap[i]
+        return path, sourceStart + offset - start
+
+
+class FeatureIncludeResolver(object):
+
+    r"""
+    This object expands the include statements in feature text.
+    Relative include paths are resolved against includeDir, or
+    against the directory of the including file if includeDir
+    is None. Use includeDirForUFOPath to get the includeDir for
+    the features of a UFO.
+
+    The files are cached with their modification time and size
+    and are only read again when one of them changes. Includes
+    that form a cycle or that can not be read are reported as
+    errors and are left in the text.
+
+    >>> import tempfile
+    >>> directory = tempfile.mkdtemp()
+    >>> def write(fileName, text):
+    ...     with open(os.path.join(directory, fileName), "w") as f:
+    ...         f.write(text)
+    >>> write("classes.fea", "@UC = [A B];\n")
+    >>> write("kern.fea", "include(classes.fea);\npos A B -10;\n")
+    >>> resolver = FeatureIncludeResolver(directory)
+    >>> resolved = resolver.resolve("include(kern.fea);\n# include(no.fea);\nfeature liga {} liga;")
+    >>> print(resolved.getText())
+    @UC = [A B];
+    ;
+    pos A B -10;
+    ;
+    # include(no.fea);
+    feature liga {} liga;
+    >>> [os.path.basename(path) for path in resolved.getIncludedPaths()]
+    ['kern.fea', 'classes.fea']
+    >>> path, offset = resolved.getSourceLocation(resolved.getText().index("pos"))
+    >>> os.path.basename(path), offset
+    ('kern.fea', 22)
+    >>> resolved.getSourceLocation(resolved.getText().index("feature"))
+    (None, 38)
+    >>> stats = resolver.getStats()
+    >>> stats["reads"], stats["hits"]
+    (2, 0)
+
+    - Test caching
+    >>> resolved = resolver.resolve("include(kern.fea);")
+    >>> resolver.getStats()["reads"]
+    2
+    >>> write("classes.fea", "@UC = [A B C];\n")
+    >>> resolved = resolver.resolve("include(kern.fea);")
+    >>> resolved.getText().splitlines()[0]
+    '@UC = [A B C];'
+    >>> stats = resolver.getStats()
+    >>> stats["reads"], stats["hits"]
+    (3, 3)
+
+    - Test errors
+    >>> write("a.fea", "include(b.fea);")
+    >>> write("b.fea", "include(a.fea);")
+    >>> resolved = resolver.resolve("include(a.fea);include(missing.fea);")
+    >>> resolved.getText()
+    'include(a.fea);;;include(missing.fea);'
+    >>> for path, offset, message in resolved.getErrors():
+    ...     print(os.path.basename(path), offset, message.split(":")[0])
+    b.fea 0 include cycle
+    <text> 15 could not read include
+
+    >>> import shutil
+    >>> shutil.rmtree(directory)
+    """
+
+    def __init__(self, includeDir=None):
+        self._includeDir = includeDir
+        self._files = {}
+        self.reads = 0
+        self.hits = 0
+
+    def setIncludeDir(self, includeDir):
+        self._includeDir = includeDir
+
+    def getIncludeDir(self):
+        return self._includeDir
+
+    def clear(self):
+        self._files = {}
+
+    def getStats(self):
+        """
+        Get a dictionary of counters describing the state of the cache.
+        """
+        return dict(
+            files=len(self._files),
+            reads=self.reads,
+            hits=self.hits
+        )
+
+    def resolve(self, text, path=None):
+        """
+        Expand the includes in text and return a ResolvedFeatureText.
+        path is the location of text, if it was read from a file.
+        """
+        if path is not None:
+            path = self._normalizePath(path)
+        pieces = []
+        sourceMap = []
+        includedPaths = []
+        errors = []
+        stack = []
+        if path is not None:
+            stack.append(path)
+        self._expand(text, _findIncludes(text), path, stack, pieces, sourceMap, includedPaths, errors)
+        return ResolvedFeatureText("".join(pieces), sourceMap, includedPaths, errors)
+
+    def resolvePath(self, path):
+        """
+        Read the file at path and expand its includes.
+        """
+        text, includes = self._getFile(self._normalizePath(path))
+        return self.resolve(text, path)
+
+    # internal
+
+    def _normalizePath(self, path):
+        return os.path.normpath(os.path.abspath(path))
+
+    def _getIncludePath(self, fileName, path):
+        if self._includeDir is not None:
+            directory = self._includeDir
+        elif path is not None:
+            directory = os.path.dirname(path)
+        else:
+            directory = os.getcwd()
+        return self._normalizePath(os.path.join(directory, fileName))
+
+    def _getFile(self, path):
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == key:
+            self.hits += 1
+            return cached[1], cached[2]
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        self.reads += 1
+        includes = _findIncludes(text)
+        self._files[path] = (key, text, includes)
+        return text, includes
+
+    def _expand(self, text, includes, path, stack, pieces, sourceMap, includedPaths, errors):
+        position = 0
+        for start, end, fileName in includes:
+            self._addPiece(text, position, start, path, pieces, sourceMap)
+            position = start
+            includePath = self._getIncludePath(fileName, path)
+            if includePath in stack:
+                errors.append((path or "<text>", start, "include cycle: %s" % includePath))
+                continue
+            try:
+                includeText, includeIncludes = self._getFile(includePath)
+            except (OSError, UnicodeDecodeError) as e:
+                errors.append((path or "<text>", start, "could not read include: %s" % e))
+                continue
+            if includePath not in includedPaths:
+                includedPaths.append(includePath)
+            stack.append(includePath)
+            self._expand(includeText, includeIncludes, includePath, stack, pieces, sourceMap, includedPaths, errors)
+            stack.pop()
+            position = end
+        self._addPiece(text, position, len(text), path, pieces, sourceMap)
+
+    def _addPiece(self, text, start, end, path, pieces, sourceMap):
+        if start >= end:
+            return
+        if sourceMap:
+            virtualStart = sourceMap[-1][0] + sourceMap[-1][1]
+        else:
+            virtualStart = 0
+        pieces.append(text[start:end])
+        sourceMap.append((virtualStart, end - start, path, start))
+
+
+# ------------
+# Line Offsets
+# ------------
+
+_lineBreakRE = re.compile("\r\n|\r|\n")
+
+
+class LineOffsetTable(object):
+
+    r"""
+    This object stores the offsets at which the lines in a text
+    start. Lines are separated by \n, \r or \r\n. Line numbers
+    start at 0.
+
+    >>> table = LineOffsetTable("abc\ndef\r\n\nghi")
+    >>> table.getLineCount()
+    4
+    >>> [table.getOffsetForLine(i) for i in range(5)]
+    [0, 4, 9, 10, 13]
+    >>> [table.getLineForOffset(i) for i in (0, 3, 4, 8, 9, 10, 13)]
+    [0, 0, 1, 1, 2, 3, 3]
+    >>> table.getLineRange(1)
+    (4, 5)
+
+    - Test editing
+    >>> text = "abc\ndef\r\n\nghi"
+    >>> edits = [(1, 0, "x\ny"), (4, 3, ""), (3, 0, "\r"), (4, 1, "\n"), (0, 0, "\n"), (8, 6, "z\r")]
+    >>> for start, length, newText in edits:
+    ...     text = text[:start] + newText + text[start + length:]
+    ...     table.replaceRange(text, start, length, len(newText))
+    ...     assert table.getLineStarts() == LineOffsetTable(text).getLineStarts()
+    >>> text, table.getLineStarts()
+    ('\nax\n\r\ndez\ri', [0, 1, 4, 6, 10])
+    """
+
+    def __init__(self, text=""):
+        self.rebuild(text)
+
+    def rebuild(self, text):
+        self._lineStarts = [0] + [m.end() for m in _lineBreakRE.finditer(text)]
+        self._textLength = len(text)
+
+    def getLineStarts(self):
+        return list(self._lineStarts)
+
+    def getTextLength(self):
+        return self._textLength
+
+    def getLineCount(self):
+        return len(self._lineStarts)
+
+    def getLineForOffset(self, offset):
+        """
+        Get the number of the line containing offset.
+        """
+        return max(0, bisect_right(self._lineStarts, offset) - 1)
+
+    def getOffsetForLine(self, lineNumber):
+        """
+        Get the offset at which lineNumber starts. The length
+        of the text is returned for lines after the last line.
+        """
+        if lineNumber < 0:
+            return 0
+        if lineNumber >= len(self._lineStarts):
+            return self._textLength
+        return self._lineStarts[lineNumber]
+
+    def getLineRange(self, lineNumber):
+        """
+        Get the (start, length) range of lineNumber,
+        including the line break.
+        """
+        start = self.getOffsetForLine(lineNumber)
+        end = self.getOffsetForLine(lineNumber + 1)
+        return start, end - start
+
+    def replaceRange(self, text, start, oldLength, newLength):
+        """
+        Update the table after the oldLength characters at start
+        have been replaced with newLength characters. text is the
+        text after the change.
+        """
+        delta = newLength - oldLength
+        lineStarts = self._lineStarts
+        # lines starting before the change are not affected
+        head = lineStarts[:bisect_left(lineStarts, start)]
+        if not head:
+            head = [0]
+        # lines starting after the change are shifted
+        tail = [lineStart + delta for lineStart in lineStarts[bisect_right(lineStarts, start + oldLength):]]
+        # scan the changed text. the scan starts one character
+        # early and runs past the end of the change so that a
+        # \r\n pair made or split by the change is found.
+        limit = len(text) + 1
+        if tail:
+            limit = tail[0]
+        middle = []
+        for m in _lineBreakRE.finditer(text, max(0, start - 1)):
+            if m.start() > start + newLength or m.end() >= limit:
+                break
+            if m.end() > head[-1]:
+                middle.append(m.end())
+        self._lineStarts = head + middle + tail
+        self._textLength = len(text)
+
+
+# ----------------------
+# Incremental Highlighting
+# ----------------------
+
+_runTypes = ["tokens", "keywords", "classNames", "includes", "strings", "comments"]
+
+_keywordTrailRE = re.compile(
+    "[>\s;(]*"                                    # space, >, ;, (
+)
+
+
+def _breakFeatureTextLineIntoRuns(line, keywordContinues):
+    # line includes its line break. keywordContinues indicates
+    # that a keyword run on the previous line consumed the line
+    # break, so the run continues into this line. the state
+    # for the next line is returned along with the runs.
+    runs = []
+    runs.extend([("tokens", start, end) for start, end in _findRuns(line, _tokenRE)])
+    position = 0
+    if keywordContinues:
+        position = _keywordTrailRE.match(line).end()
+        if position:
+            runs.append(("keywords", 0, position))
+    else:
+        keywordContinues = False
+    if position < len(line) or not line:
+        keywordContinues = False
+    length = len(line)
+    while position < length:
+        # the line starts after a line break or at the start of the
+        # text, so a keyword at the start of the line is anchored.
+        m = _keywordStartRE.match(line, position)
+        if m is None:
+            m = _keywordInsideRE.search(line, position)
+            if m is None:
+                break
+        runs.append(("keywords", m.start(), m.end()))
+        position = m.end()
+        keywordContinues = position == length
+    for typ, pattern in (("classNames", _classNameRE), ("includes", _includeRE), ("strings", _stringRE), ("comments", _commentRE)):
+        runs.extend([(typ, start, end) for start, end in _findRuns(line, pattern)])
+    return runs, keywordContinues
+
+
+class FeatureTextHighlighter(object):
+
+    r"""
+    This object breaks feature text into runs line by line and
+    keeps the runs and the lexer state at the start of each line.
+    After an edit only the changed lines are lexed again, followed
+    by the lines after them until the lexer state at the start of
+    a line is the same as before the edit.
+
+    The runs are reported as color ranges: a list of (start, end, type)
+    with type None for the range of a whole line, which should be drawn
+    in the main color, followed by the runs in the line in the order
+    in which they should be applied.
+
+    Keywords are found as in breakFeatureTextIntoRuns, except that
+    the leading part of a keyword run does not reach back over a
+    line break.
+
+    >>> highlighter = FeatureTextHighlighter()
+    >>> text = "feature liga {\n  sub f i by f_i;\n} liga;"
+    >>> for start, end, typ in highlighter.setText(text):
+    ...     print(start, end, typ, repr(text[start:end]))
+    0 15 None 'feature liga {\n'
+    13 14 tokens '{'
+    0 8 keywords 'feature '
+    15 33 None '  sub f i by f_i;\n'
+    31 32 tokens ';'
+    15 21 keywords '  sub '
+    24 28 keywords ' by '
+    33 40 None '} liga;'
+    33 34 tokens '}'
+    39 40 tokens ';'
+
+    - Test editing
+    >>> newText = text[:24] + " # by" + text[24:]
+    >>> ranges = highlighter.replaceRange(newText, 24, 0, 5)
+    >>> [(start, end, typ) for start, end, typ in ranges if typ in (None, "comments")]
+    [(15, 38, None), (25, 37, 'comments')]
+    >>> highlighter.getRelexedLineCount()
+    2
+
+    - Test that state changes are carried to the following lines
+    >>> text = "lookupflag\n\n\n(x\ny"
+    >>> ranges = highlighter.setText(text)
+    >>> highlighter.getRuns()[1]
+    ('keywords', [(0, 11), (11, 12), (12, 13), (13, 14)])
+    >>> newText = "lookupflagx" + text[10:]
+    >>> ranges = highlighter.replaceRange(newText, 10, 0, 1)
+    >>> highlighter.getRuns()[1], highlighter.getRelexedLineCount()
+    (('keywords', []), 4)
+    >>> sorted(set(start for start, end, typ in ranges if typ is None))
+    [0, 12, 13, 14]
+    """
+
+    def __init__(self, text=""):
+        self._lineOffsets = LineOffsetTable()
+        self._lineRuns = []
+        self._lineStates = []
+        self._relexedLineCount = 0
+        self.setText(text)
+
+    def getLineOffsets(self):
+        return self._lineOffsets
+
+    def getRelexedLineCount(self):
+        """
+        Get the number of lines that were lexed by the last change.
+        """
+        return self._relexedLineCount
+
+    def setText(self, text):
+        """
+        Lex all of text. The color ranges for all lines are returned.
+        """
+        self._lineOffsets.rebuild(text)
+        self._lineRuns = []
+        self._lineStates = []
+        state = False
+        for lineNumber in range(self._lineOffsets.getLineCount()):
+            self._lineStates.append(state)
+            runs, state = self._lexLine(text, lineNumber, state)
+            self._lineRuns.append(runs)
+        self._relexedLineCount = len(self._lineRuns)
+        return self.getColorRanges()
+
+    def replaceRange(self, text, start, oldLength, newLength):
+        """
+        Update the runs after the oldLength characters at start have
+        been replaced with newLength characters. text is the text after
+        the change. The color ranges for the lines whose text or runs
+        have changed are returned.
+        """
+        lineOffsets = self._lineOffsets
+        firstLine = lineOffsets.getLineForOffset(start)
+        # the previous line changes if the edit completes a \r\n pair
+        if firstLine and start == lineOffsets.getOffsetForLine(firstLine):
+            firstLine -= 1
+        oldLastLine = lineOffsets.getLineForOffset(start + oldLength)
+        lineOffsets.replaceRange(text, start, oldLength, newLength)
+        lastLine = lineOffsets.getLineForOffset(start + newLength)
+        # lex the edited lines
+        state = self._lineStates[firstLine]
+        lineRuns = []
+        lineStates = []
+        for lineNumber in range(firstLine, lastLine + 1):
+            lineStates.append(state)
+            runs, state = self._lexLine(text, lineNumber, state)
+            lineRuns.append(runs)
+        self._lineRuns[firstLine:oldLastLine + 1] = lineRuns
+        self._lineStates[firstLine:oldLastLine + 1] = lineStates
+        changedLines = list(range(firstLine, lastLine + 1))
+        # lex the following lines until the state converges. the
+        # first one is always lexed, as the edit can split a \r\n pair.
+        lineNumber = lastLine + 1
+        while lineNumber < len(self._lineStates):
+            if lineNumber > lastLine + 1 and self._lineStates[lineNumber] == state:
+                break
+            self._lineStates[lineNumber] = state
+            runs, state = self._lexLine(text, lineNumber, state)
+            if runs != self._lineRuns[lineNumber]:
+                self._lineRuns[lineNumber] = runs
+                changedLines.append(lineNumber)
+            lineNumber += 1
+        self._relexedLineCount = lineNumber - firstLine
+        return self._getColorRangesForLines(changedLines)
+
+    def getColorRanges(self):
+        """
+        Get the color ranges for all lines.
+        """
+        return self._getColorRangesForLines(range(len(self._lineRuns)))
+
+    def getRuns(self):
+        """
+        Get the runs in the same form as breakFeatureTextIntoRuns.
+        """
+        runs = dict((typ, []) for typ in _runTypes)
+        for lineNumber, lineRuns in enumerate(self._lineRuns):
+            lineStart = self._lineOffsets.getOffsetForLine(lineNumber)
+            for typ, start, end in lineRuns:
+                runs[typ].append((lineStart + start, lineStart + end))
+        return [(typ, sorted(runs[typ])) for typ in _runTypes]
+
+    # internal
+
+    def _lexLine(self, text, lineNumber, state):
+        start, length = self._lineOffsets.getLineRange(lineNumber)
+        return _breakFeatureTextLineIntoRuns(text[start:start + length], state)
+
+    def _getColorRangesForLines(self, lineNumbers):
+        ranges = []
+        for lineNumber in lineNumbers:
+            lineStart, length = self._lineOffsets.getLineRange(lineNumber)
+            ranges.append((lineStart, lineStart + length, None))
+            ranges.extend([(lineStart + start, lineStart + end, typ) for typ, start, end in self._lineRuns[lineNumber]])
+        return ranges
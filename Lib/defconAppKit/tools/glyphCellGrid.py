@@ -0,0 +1,171 @@
+from math import floor, ceil
+
+
+class GlyphCellGrid(object):
+
+    """
+    This object maps between cell indexes and cell rects for
+    a grid of equally sized cells laid out left to right and
+    top to bottom in a flipped coordinate system. Everything
+    is computed from the cell size, the column count and the
+    cell count so no per-cell data is stored.
+
+    - Test rects
+    >>> grid = GlyphCellGrid(cellWidth=50, cellHeight=40, columnCount=4, cellCount=10)
+    >>> grid.rectForIndex(0)
+    ((0, 0), (50, 40))
+    >>> grid.rectForIndex(5)
+    ((50, 40), (50, 40))
+    >>> grid.rectForIndex(9)
+    ((50, 80), (50, 40))
+    >>> grid.rectForIndex(10) is None
+    True
+    >>> grid.rectForIndex(-1) is None
+    True
+
+    - Test hit testing
+    >>> grid.indexForPoint((0, 0))
+    0
+    >>> grid.indexForPoint((49.9, 39.9))
+    0
+    >>> grid.indexForPoint((50, 40))
+    5
+    >>> grid.indexForPoint((199, 0))
+    3
+    >>> grid.indexForPoint((200, 0)) is None
+    True
+    >>> grid.indexForPoint((120, 90)) is None
+    True
+    >>> grid.indexForPoint((-1, 10)) is None
+    True
+
+    - Test rect ranges
+    >>> grid.indexRangeForRect(((0, 0), (200, 40)))
+    (0, 4)
+    >>> grid.indexRangeForRect(((10, 45), (10, 10)))
+    (4, 8)
+    >>> grid.indexRangeForRect(((0, 70), (200, 500)))
+    (4, 10)
+    >>> grid.indexRangeForRect(((0, 500), (200, 500)))
+    (10, 10)
+
+    - Test distance ordering
+    >>> grid.indexesByDistanceFromRect(((0, 40), (200, 40)))
+    [4, 5, 6, 7]
+    >>> grid.indexesByDistanceFromRect(((0, 40), (200, 40)), marginRows=1)
+    [4, 5, 6, 7, 8, 9, 0, 1, 2, 3]
+
+    - Test empty grids
+    >>> grid = GlyphCellGrid()
+    >>> grid.indexForPoint((10, 10)) is None
+    True
+    >>> grid.rectForIndex(0) is None
+    True
+    >>> grid.indexRangeForRect(((0, 0), (100, 100)))
+    (0, 0)
+    """
+
+    def __init__(self, cellWidth=60, cellHeight=60, columnCount=0, cellCount=0):
+        self.cellWidth = cellWidth
+        self.cellHeight = cellHeight
+        self.columnCount = columnCount
+        self.cellCount = cellCount
+
+    def setCellSize(self, wh):
+        self.cellWidth, self.cellHeight = wh
+
+    def getCellSize(self):
+        return self.cellWidth, self.cellHeight
+
+    def setColumnCount(self, value):
+        self.columnCount = value
+
+    def setCellCount(self, value):
+        self.cellCount = value
+
+    def getRowCount(self):
+        if not self.columnCount:
+            return 0
+        return int(ceil(self.cellCount / float(self.columnCount)))
+
+    def indexForPoint(self, point):
+        """
+        Get the index of the cell containing point.
+        None is returned if no cell contains the point.
+        """
+        if not self.columnCount:
+            return None
+        x, y = point
+        if x < 0 or y < 0:
+            return None
+        column = int(floor(x / self.cellWidth))
+        if column >= self.columnCount:
+            return None
+        row = int(floor(y / self.cellHeight))
+        index = row * self.columnCount + column
+        if index >= self.cellCount:
+            return None
+        return index
+
+    def rectForIndex(self, index):
+        """
+        Get the rect for the cell at index.
+        None is returned if the index is out of range.
+        """
+        if not self.columnCount:
+            return None
+        if index < 0 or index >= self.cellCount:
+            return None
+        row, column = divmod(index, self.columnCount)
+        return ((column * self.cellWidth, row * self.cellHeight), (self.cellWidth, self.cellHeight))
+
+    def rowRangeForRect(self, rect):
+        """
+        Get the (start, end) range of the rows intersecting rect.
+        """
+        (x, y), (w, h) = rect
+        rowCount = self.getRowCount()
+        startRow = max(0, int(floor(y / self.cellHeight)))
+        endRow = int(ceil((y + h) / self.cellHeight))
+        startRow = min(startRow, rowCount)
+        endRow = max(startRow, min(endRow, rowCount))
+        return startRow, endRow
+
+    def indexRangeForRect(self, rect):
+        """
+        Get the (start, end) range of the cell indexes
+        in the rows intersecting rect.
+        """
+        if not self.columnCount:
+            return 0, 0
+        startRow, endRow = self.rowRangeForRect(rect)
+        start = min(startRow * self.columnCount, self.cellCount)
+        end = min(endRow * self.columnCount, self.cellCount)
+        return start, end
+
+    def indexesByDistanceFromRect(self, rect, marginRows=0):
+        """
+        Get the indexes of the cells in the rows intersecting
+        rect followed by the indexes in up to marginRows rows
+        above and below, ordered by their row distance from rect.
+        """
+        if not self.columnCount:
+            return []
+        startRow, endRow = self.rowRangeForRect(rect)
+        rows = list(range(startRow, endRow))
+        for distance in range(1, marginRows + 1):
+            if endRow - 1 + distance < self.getRowCount():
+                rows.append(endRow - 1 + distance)
+            if startRow - distance >= 0:
+                rows.append(startRow - distance)
+        indexes = []
+        for row in rows:
+            start = row * self.columnCount
+            end = min(start + self.columnCount, self.cellCount)
+            indexes.extend(range(start, end))
+        return indexes
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,241 @@
+from bisect import bisect_left, bisect_right
+from defconAppKit.tools.glyphNameIndex import GlyphNameIndex, insertGlyphNames, removeGlyphNames, replaceGlyphNames
+
+
+class GlyphItemModel(object):
+
+    """
+    A sequence of glyph names that creates item objects only
+    when they are asked for. The item factory is called with
+    a glyph name and the result is kept until the index is
+    removed or the names are reset. Views that only need the
+    names can read them without creating any items.
+
+    - Test names
+    >>> created = []
+    >>> def itemFactory(glyphName):
+    ...     created.append(glyphName)
+    ...     return "item:" + glyphName
+    >>> model = GlyphItemModel(["a", "b", "c", "a"], itemFactory=itemFactory)
+    >>> len(model), model[1], list(model)
+    (4, 'b', ['a', 'b', 'c', 'a'])
+    >>> "c" in model, "x" in model
+    (True, False)
+    >>> model.index("a"), model.getIndexes("a")
+    (0, [0, 3])
+    >>> model.index("x")
+    Traceback (most recent call last):
+        ...
+    ValueError: 'x' is not in the model
+
+    - Test lazy items
+    >>> created
+    []
+    >>> model.getItem(2)
+    'item:c'
+    >>> model.getItem(2)
+    'item:c'
+    >>> created, model.getLoadedItemCount()
+    (['c'], 1)
+    >>> model.getLoadedItem(0) is None
+    True
+
+    - Test insertion
+    >>> model.insert([0, 3], ["x", "y"], items=["item:X", None])
+    >>> list(model)
+    ['x', 'a', 'b', 'y', 'c', 'a']
+    >>> model.getLoadedItem(0), model.getLoadedItem(4)
+    ('item:X', 'item:c')
+    >>> model.getIndexes("a")
+    [1, 5]
+
+    - Test removal
+    >>> model.remove([0, 1])
+    >>> list(model), model.getLoadedItem(2)
+    (['b', 'y', 'c', 'a'], 'item:c')
+
+    - Test moving
+    >>> model.move([2], 0)
+    [0]
+    >>> list(model), model.getLoadedItem(0)
+    (['c', 'b', 'y', 'a'], 'item:c')
+    >>> model.move([0, 1], 4)
+    [2, 3]
+    >>> list(model), model.getLoadedItem(2), model.getIndexes("c")
+    (['y', 'a', 'c', 'b'], 'item:c', [2])
+
+    - Test replacing and renaming
+    >>> model.replace(0, "z", item="item:Z")
+    >>> list(model), model.getLoadedItem(0)
+    (['z', 'a', 'c', 'b'], 'item:Z')
+    >>> model.rename(2, "d")
+    >>> list(model), model.getIndexes("d"), model.getLoadedItem(2)
+    (['z', 'a', 'd', 'b'], [2], 'item:c')
+
+    - Test resetting
+    >>> names = model.getGlyphNames()
+    >>> model.setGlyphNames(["q"])
+    >>> names, model.getLoadedItemCount()
+    (['q'], 0)
+    >>> model.setGlyphNames(["q", "r"], items=[None, "item:R"])
+    >>> model.getLoadedItem(0) is None, model.getLoadedItem(1)
+    (True, 'item:R')
+    """
+
+    def __init__(self, glyphNames=None, itemFactory=None):
+        self._glyphNames = []
+        self._glyphNameIndex = GlyphNameIndex()
+        self._items = {}
+        self._itemFactory = itemFactory
+        if glyphNames is not None:
+            self.setGlyphNames(glyphNames)
+
+    # -----
+    # Names
+    # -----
+
+    def setGlyphNames(self, glyphNames, items=None):
+        """
+        Replace all glyph names. Any created items are discarded.
+        Optional items, in the same order as glyphNames, are stored
+        for their positions. None can be given for positions that
+        do not have an item yet.
+        """
+        # the list object is kept so that views sharing it see the change
+        self._glyphNames[:] = glyphNames
+        self._glyphNameIndex.rebuild(self._glyphNames)
+        self._items = {}
+        if items is not None:
+            for index, item in enumerate(items):
+                if item is not None:
+                    self._items[index] = item
+
+    def getGlyphNames(self):
+        """
+        Get the list of glyph names. This is the list used by the
+        model, so it must not be modified directly.
+        """
+        return self._glyphNames
+
+    def getGlyphNameIndex(self):
+        return self._glyphNameIndex
+
+    def __len__(self):
+        return len(self._glyphNames)
+
+    def __iter__(self):
+        return iter(self._glyphNames)
+
+    def __getitem__(self, index):
+        return self._glyphNames[index]
+
+    def __contains__(self, glyphName):
+        return glyphName in self._glyphNameIndex
+
+    def index(self, glyphName):
+        index = self._glyphNameIndex.getFirstIndex(glyphName)
+        if index is None:
+            raise ValueError("%r is not in the model" % glyphName)
+        return index
+
+    def getIndexes(self, glyphName):
+        return self._glyphNameIndex.getIndexes(glyphName)
+
+    # -----
+    # Items
+    # -----
+
+    def getItem(self, index):
+        """
+        Get the item at index, creating it if needed.
+        """
+        if index < 0:
+            index += len(self._glyphNames)
+        item = self._items.get(index)
+        if item is None:
+            item = self._itemFactory(self._glyphNames[index])
+            self._items[index] = item
+        return item
+
+    def getLoadedItem(self, index):
+        """
+        Get the item at index if it has been created.
+        """
+        return self._items.get(index)
+
+    def getLoadedItemCount(self):
+        return len(self._items)
+
+    # -------
+    # Editing
+    # -------
+
+    def insert(self, indexes, glyphNames, items=None):
+        """
+        Insert glyphNames at indexes, which are the positions they will
+        have after the insertion. Optional items, in the same order as
+        glyphNames, are stored for the inserted positions.
+        """
+        indexes = list(indexes)
+        glyphNames = list(glyphNames)
+        if items is None:
+            items = [None] * len(indexes)
+        pairs = sorted(zip(indexes, glyphNames, items), key=lambda pair: pair[0])
+        thresholds = [index - m for m, (index, glyphName, item) in enumerate(pairs)]
+        self._items = dict((index + bisect_right(thresholds, index), item) for index, item in self._items.items())
+        insertGlyphNames(self._glyphNames, self._glyphNameIndex, indexes, glyphNames)
+        for index, glyphName, item in pairs:
+            if item is not None:
+                self._items[index] = item
+
+    def remove(self, indexes):
+        """
+        Remove the glyph names, and their items, at indexes.
+        """
+        removed = sorted(set(indexes))
+        if not removed:
+            return
+        removedSet = set(removed)
+        self._items = dict(
+            (index - bisect_left(removed, index), item)
+            for index, item in self._items.items() if index not in removedSet
+        )
+        removeGlyphNames(self._glyphNames, self._glyphNameIndex, removed)
+
+    def move(self, indexes, destination):
+        """
+        Move the glyph names, and their items, at indexes to destination.
+        The destination is an index before the move. The new indexes of
+        the moved glyph names are returned.
+        """
+        indexes = sorted(set(indexes))
+        if not indexes:
+            return []
+        glyphNames = [self._glyphNames[index] for index in indexes]
+        items = [self._items.get(index) for index in indexes]
+        destination -= bisect_left(indexes, destination)
+        self.remove(indexes)
+        newIndexes = list(range(destination, destination + len(indexes)))
+        self.insert(newIndexes, glyphNames, items)
+        return newIndexes
+
+    def replace(self, index, glyphName, item=None):
+        """
+        Replace the glyph name and the item at index.
+        """
+        replaceGlyphNames(self._glyphNames, self._glyphNameIndex, [index], [glyphName])
+        if item is None:
+            self._items.pop(index, None)
+        else:
+            self._items[index] = item
+
+    def rename(self, index, glyphName):
+        """
+        Change the glyph name at index, keeping the item.
+        """
+        replaceGlyphNames(self._glyphNames, self._glyphNameIndex, [index], [glyphName])
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,306 @@
+from bisect import bisect_left, bisect_right
+
+
+class GlyphLineLayout(object):
+
+    """
+    This object computes where the glyph records in a line are
+    drawn. The positions are computed once and drawing only
+    needs to visit the records that intersect the dirty rect.
+
+    The records are laid out in drawing order. Left to right
+    lines are drawn from the first record and right to left lines
+    from the last record. For each record in drawing order, the
+    layout stores:
+
+    - the record index
+    - the translation, in glyph units, applied before drawing
+    - the glyph rect, in glyph units, given to drawGlyph
+    - the record rect, in view units, used for the alternates menu
+    - the zero zero point, in view units
+
+    The glyph records need glyph, advanceWidth, advanceHeight,
+    xPlacement, yPlacement, xAdvance and yAdvance attributes.
+
+    >>> class Record(object):
+    ...     def __init__(self, glyph, advanceWidth, xPlacement=0, xAdvance=0):
+    ...         self.glyph = glyph
+    ...         self.advanceWidth = advanceWidth
+    ...         self.advanceHeight = 0
+    ...         self.xPlacement = xPlacement
+    ...         self.yPlacement = 0
+    ...         self.xAdvance = xAdvance
+    ...         self.yAdvance = 0
+    >>> records = [Record("a", 500), Record("b", 600, xAdvance=-100), Record("c", 400, xPlacement=50)]
+    >>> layout = GlyphLineLayout(records, scale=0.1, upm=1000, descender=-250, bufferLeft=15, bufferTop=15)
+    >>> len(layout)
+    3
+    >>> layout.getTranslation(2), layout.getGlyphRect(2)
+    ((1050, 0), ((-50, -250), (400, 1000)))
+    >>> layout.getRecordRect(1), layout.getZeroZeroPoint(1)
+    (((65.0, 15.0), (50.0, 100.0)), (65.0, 90.0))
+    >>> layout.getWidth()
+    140.0
+
+    - Test culling
+    >>> list(layout.getVisibleRange(0, 10))
+    []
+    >>> list(layout.getVisibleRange(20, 30))
+    [0]
+    >>> list(layout.getVisibleRange(70, 110))
+    [1]
+    >>> list(layout.getVisibleRange(200, 300))
+    []
+
+    - Test right to left
+    >>> layout = GlyphLineLayout(records, scale=0.1, upm=1000, descender=-250, bufferLeft=15, bufferTop=15,
+    ...     rightToLeft=True, viewWidth=300)
+    >>> [layout.getRecordIndex(i) for i in range(3)]
+    [2, 1, 0]
+    >>> layout.getTranslation(0), layout.getTranslation(1)
+    ((-350, 0), (-900, 0))
+    >>> list(layout.getVisibleRange(210, 290))
+    [0]
+    >>> list(layout.getVisibleRange(0, 130))
+    [1, 2]
+
+    - Test updating
+    >>> records[0].xAdvance = -100
+    >>> layout.updateRecords(records, [0])
+    2
+    >>> layout.getTranslation(2), layout.getRecordRect(2)
+    ((-1300, 0), ((150.0, 15.0), (-40.0, 100.0)))
+    >>> [layout.getRecordIndex(i) for i in range(3)]
+    [2, 1, 0]
+    >>> layout.getHorizontalExtent(2)
+    (90.0, 150.0)
+
+    - Test culling against a scan of random records
+    >>> import random
+    >>> rng = random.Random(0)
+    >>> failures = []
+    >>> for i in range(300):
+    ...     records = [Record("x", rng.choice([0, 100, 300]), rng.choice([0, -50, 50]), rng.choice([0, -400, 200])) for j in range(rng.randint(0, 12))]
+    ...     layout = GlyphLineLayout(records, scale=0.1, upm=1000, descender=-250, bufferLeft=15, bufferTop=15,
+    ...         rightToLeft=rng.random() > 0.5, viewWidth=400)
+    ...     xMin = rng.randint(-50, 400)
+    ...     xMax = xMin + rng.randint(0, 100)
+    ...     visible = [k for k in range(len(layout)) if layout.intersectsHorizontalRange(k, xMin, xMax)]
+    ...     culled = [k for k in layout.getVisibleRange(xMin, xMax) if layout.intersectsHorizontalRange(k, xMin, xMax)]
+    ...     if visible != culled:
+    ...         failures.append(records)
+    ...     if records:
+    ...         changed = rng.sample(range(len(records)), rng.randint(1, len(records)))
+    ...         for recordIndex in changed:
+    ...             records[recordIndex].xAdvance = rng.choice([0, -400, 200])
+    ...         start = layout.updateRecords(records, changed)
+    ...         fresh = GlyphLineLayout(records, scale=0.1, upm=1000, descender=-250, bufferLeft=15, bufferTop=15,
+    ...             rightToLeft=layout._rightToLeft, viewWidth=400)
+    ...         if [layout.getRecordRect(k) for k in range(len(records))] != [fresh.getRecordRect(k) for k in range(len(records))]:
+    ...             failures.append(records)
+    ...         if [layout.getTranslation(k) for k in range(len(records))] != [fresh.getTranslation(k) for k in range(len(records))]:
+    ...             failures.append(records)
+    >>> failures
+    []
+    """
+
+    def __init__(self, glyphRecords, scale, upm, descender, bufferLeft, bufferTop, rightToLeft=False, viewWidth=0):
+        self._scale = scale
+        self._upm = upm
+        self._descender = descender
+        self._rightToLeft = rightToLeft
+        if rightToLeft:
+            self._startLeft = viewWidth - bufferLeft
+        else:
+            self._startLeft = bufferLeft
+        self._startBottom = bufferTop
+        self._recordIndexes = []
+        # the running values before each record
+        self._states = []
+        self._translations = []
+        self._glyphRects = []
+        self._recordRects = []
+        self._zeroZeroPoints = []
+        self._xMins = []
+        self._xMaxs = []
+        self._layOut(glyphRecords, 0)
+
+    def _layOut(self, glyphRecords, start):
+        # lay out the records from the drawing order index start
+        scale = self._scale
+        upm = self._upm
+        descender = self._descender
+        rightToLeft = self._rightToLeft
+        height = upm * scale
+        descenderHeight = descender * scale
+        if start:
+            x, y, left, bottom, previousXA = self._states[start]
+        else:
+            x = y = 0
+            left = self._startLeft
+            bottom = self._startBottom
+            previousXA = 0
+        for values in (self._recordIndexes, self._states, self._translations, self._glyphRects,
+                self._recordRects, self._zeroZeroPoints, self._xMins, self._xMaxs):
+            del values[start:]
+        count = len(glyphRecords)
+        if rightToLeft:
+            order = range(count - 1 - start, -1, -1)
+        else:
+            order = range(start, count)
+        for recordIndex in order:
+            glyphRecord = glyphRecords[recordIndex]
+            self._states.append((x, y, left, bottom, previousXA))
+            w = glyphRecord.advanceWidth
+            h = glyphRecord.advanceHeight
+            xP = glyphRecord.xPlacement
+            yP = glyphRecord.yPlacement
+            xA = glyphRecord.xAdvance
+            yA = glyphRecord.yAdvance
+            bottom += yP * scale
+            glyphHeight = height + ((h + yA) * scale)
+            if rightToLeft:
+                glyphLeft = left + ((-w + xP - xA) * scale)
+                glyphWidth = (-w - xA) * scale
+                if xP:
+                    xP += previousXA
+                translation = (x - w - xA + xP, y + yP)
+                glyphRect = ((-w + xA - xP, descender - yP), (w, upm))
+                x += -w - xA
+                left += (-w - xP - xA) * scale
+                previousXA = xA
+            else:
+                glyphLeft = left + (xP * scale)
+                glyphWidth = (w + xA) * scale
+                translation = (x + xP, y + yP)
+                glyphRect = ((-xP, descender - yP), (w, upm))
+                x += w + xA
+                left += glyphWidth
+            y += h + yA
+            zeroZeroPoint = (glyphLeft, bottom + height + descenderHeight)
+            self._recordIndexes.append(recordIndex)
+            self._translations.append(translation)
+            self._glyphRects.append(glyphRect)
+            self._recordRects.append(((glyphLeft, bottom), (glyphWidth, glyphHeight)))
+            self._zeroZeroPoints.append(zeroZeroPoint)
+            # the horizontal extent of the glyph rect in the view
+            xMin = glyphRect[0][0] * scale + glyphLeft
+            self._xMins.append(xMin)
+            self._xMaxs.append(xMin + w * scale)
+        self._width = abs(left - self._startLeft)
+        self._buildCulling()
+
+    def updateRecords(self, glyphRecords, recordIndexes):
+        """
+        Lay out the records again after the values in the records
+        at recordIndexes changed. Only the records from the first
+        changed record, in drawing order, are laid out again. The
+        drawing order index of that record is returned, or None
+        if recordIndexes is empty.
+        """
+        start = self.getFirstDrawingIndex(recordIndexes)
+        if start is None:
+            return None
+        self._layOut(glyphRecords, start)
+        return start
+
+    def getFirstDrawingIndex(self, recordIndexes):
+        """
+        Get the first drawing order index of the records at
+        recordIndexes, or None if recordIndexes is empty.
+        """
+        if not recordIndexes:
+            return None
+        if self._rightToLeft:
+            return len(self._recordIndexes) - 1 - max(recordIndexes)
+        return min(recordIndexes)
+
+    def getHorizontalExtent(self, start):
+        """
+        Get the smallest and largest x, in view units, covered by
+        the records from the drawing order index start onward,
+        including their record rects. None is returned if there
+        are no such records.
+        """
+        if start >= len(self._recordIndexes):
+            return None
+        xMin = min(self._xMins[start:])
+        xMax = max(self._xMaxs[start:])
+        for (x, y), (w, h) in self._recordRects[start:]:
+            xMin = min(xMin, x, x + w)
+            xMax = max(xMax, x, x + w)
+        return xMin, xMax
+
+    def _buildCulling(self):
+        # the extents are not sorted when there are negative
+        # advances, so the culling searches the running maximum
+        # of the right edges and the running minimum, from the
+        # end, of the left edges. right to left lines are culled
+        # in reverse drawing order so that x increases.
+        xMins = self._xMins
+        xMaxs = self._xMaxs
+        if self._rightToLeft:
+            xMins = xMins[::-1]
+            xMaxs = xMaxs[::-1]
+        runningMaxs = []
+        value = None
+        for xMax in xMaxs:
+            if value is None or xMax > value:
+                value = xMax
+            runningMaxs.append(value)
+        runningMins = []
+        value = None
+        for xMin in reversed(xMins):
+            if value is None or xMin < value:
+                value = xMin
+            runningMins.append(value)
+        runningMins.reverse()
+        self._runningMaxs = runningMaxs
+        self._runningMins = runningMins
+
+    def __len__(self):
+        return len(self._recordIndexes)
+
+    def getRecordIndex(self, index):
+        return self._recordIndexes[index]
+
+    def getTranslation(self, index):
+        return self._translations[index]
+
+    def getGlyphRect(self, index):
+        return self._glyphRects[index]
+
+    def getRecordRect(self, index):
+        return self._recordRects[index]
+
+    def getZeroZeroPoint(self, index):
+        return self._zeroZeroPoints[index]
+
+    def getWidth(self):
+        """
+        Get the distance, in view units, that the line advances.
+        """
+        return self._width
+
+    def intersectsHorizontalRange(self, index, xMin, xMax):
+        return self._xMaxs[index] >= xMin and self._xMins[index] <= xMax
+
+    def getVisibleRange(self, xMin, xMax):
+        """
+        Get the range of drawing order indexes that may intersect
+        the horizontal range from xMin to xMax in view units. All
+        indexes outside of the range do not intersect it.
+        """
+        count = len(self._recordIndexes)
+        first = bisect_left(self._runningMaxs, xMin)
+        last = bisect_right(self._runningMins, xMax)
+        if last <= first:
+            return range(0)
+        if self._rightToLeft:
+            return range(count - last, count - first)
+        return range(first, last)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,270 @@
+from bisect import bisect_left, bisect_right
+from defconAppKit.tools.glyphNamePrefixIndex import GlyphNamePrefixIndex
+
+
+class GlyphNameIndex(object):
+
+    """
+    This object maps glyph names to the indexes at which
+    they appear in a list of glyph names.
+
+    >>> index = GlyphNameIndex(["a", "b", "a", "c"])
+    >>> index.getIndexes("a")
+    [0, 2]
+    >>> index.getIndexes("x")
+    []
+    >>> "b" in index, "x" in index
+    (True, False)
+    >>> index.getFirstIndex("c")
+    3
+    >>> index.getFirstIndex("x") is None
+    True
+    >>> index.rename("a", "d", 2)
+    >>> index.getIndexes("a"), index.getIndexes("d")
+    ([0], [2])
+    >>> index.rename("b", "a", 1)
+    >>> index.getIndexes("a"), "b" in index
+    ([0, 1], False)
+
+    - Test shifting
+    >>> index = GlyphNameIndex(["a", "b", "a", "c"])
+    >>> index.removeIndexes([1, 2])
+    >>> index.getIndexes("a"), index.getIndexes("c"), "b" in index
+    ([0], [1], False)
+    >>> index.insertIndexes([0, 2], ["x", "a"])
+    >>> index.getIndexes("a"), index.getIndexes("x"), index.getIndexes("c")
+    ([1, 2], [0], [3])
+    >>> index.insertIndexes([4, 5], ["b", "a"])
+    >>> index.getIndexes("a"), index.getIndexes("b")
+    ([1, 2, 5], [4])
+    >>> index.removeIndexes([5])
+    >>> index.insertIndexes([5], ["c"])
+    >>> index.getIndexes("a"), index.getIndexes("c")
+    ([1, 2], [3, 5])
+
+    - Test type-ahead
+    >>> index = GlyphNameIndex(["sys", "signal", "vanilla", "signal", "zipimport"])
+    >>> index.findTypeAheadIndex("s")
+    1
+    >>> index.findTypeAheadIndex("x")
+    4
+    >>> index.findTypeAheadIndex("zz") is None
+    True
+    >>> index.removeIndexes([1])
+    >>> index.findTypeAheadIndex("si")
+    2
+    >>> index.insertIndexes([0], ["a"])
+    >>> index.findTypeAheadIndex("0")
+    0
+
+    - Test type-ahead against a scan of random names
+    >>> import random
+    >>> def scan(glyphNames, text):
+    ...     matches = [name for name in glyphNames if name.startswith(text)]
+    ...     if not matches:
+    ...         matches = [name for name in glyphNames if name > text]
+    ...     if not matches:
+    ...         return None
+    ...     return glyphNames.index(min(matches))
+    >>> rng = random.Random(0)
+    >>> def randomName():
+    ...     return "".join(rng.choice("ab.") for i in range(rng.randint(1, 4)))
+    >>> failures = []
+    >>> for i in range(500):
+    ...     glyphNames = [randomName() for j in range(rng.randint(0, 20))]
+    ...     index = GlyphNameIndex(glyphNames)
+    ...     text = randomName()
+    ...     if index.findTypeAheadIndex(text) != scan(glyphNames, text):
+    ...         failures.append((glyphNames, text))
+    >>> failures
+    []
+    """
+
+    def __init__(self, glyphNames=None):
+        self._indexes = {}
+        self._count = 0
+        self._prefixIndex = None
+        if glyphNames is not None:
+            self.rebuild(glyphNames)
+
+    def __contains__(self, glyphName):
+        return glyphName in self._indexes
+
+    def __len__(self):
+        return len(self._indexes)
+
+    def rebuild(self, glyphNames):
+        indexes = {}
+        for i, glyphName in enumerate(glyphNames):
+            if glyphName in indexes:
+                indexes[glyphName].append(i)
+            else:
+                indexes[glyphName] = [i]
+        self._indexes = indexes
+        self._count = len(glyphNames)
+        self._prefixIndex = None
+
+    def getIndexes(self, glyphName):
+        """
+        Get a sorted list of the indexes of glyphName.
+        """
+        return list(self._indexes.get(glyphName, ()))
+
+    def getFirstIndex(self, glyphName):
+        indexes = self._indexes.get(glyphName)
+        if not indexes:
+            return None
+        return indexes[0]
+
+    def removeIndexes(self, indexes):
+        """
+        Remove the entries at indexes, given as positions in the
+        list before the removal, and shift the remaining entries.
+        """
+        removed = sorted(indexes)
+        if not removed:
+            return
+        removedSet = set(removed)
+        first = removed[0]
+        for glyphName in list(self._indexes.keys()):
+            existing = self._indexes[glyphName]
+            # entries before the first removed index do not move
+            if existing[-1] < first:
+                continue
+            kept = [i - bisect_left(removed, i) for i in existing if i not in removedSet]
+            if kept:
+                self._indexes[glyphName] = kept
+            else:
+                del self._indexes[glyphName]
+                self._nameRemoved(glyphName)
+        self._count -= len(removedSet)
+
+    def insertIndexes(self, indexes, glyphNames):
+        """
+        Insert glyphNames at indexes, given as positions in the
+        list after the insertion, and shift the existing entries.
+        """
+        pairs = sorted(zip(indexes, glyphNames))
+        if not pairs:
+            return
+        # the m-th inserted position p lands before an existing
+        # entry at old position i when p - m <= i.
+        thresholds = [i - m for m, (i, glyphName) in enumerate(pairs)]
+        first = thresholds[0]
+        if first < self._count:
+            for glyphName, existing in self._indexes.items():
+                # entries before the first insertion do not move
+                if existing[-1] < first:
+                    continue
+                self._indexes[glyphName] = [i + bisect_right(thresholds, i) for i in existing]
+        self._count += len(pairs)
+        for i, glyphName in pairs:
+            if glyphName not in self._indexes:
+                self._nameAdded(glyphName)
+            entries = self._indexes.setdefault(glyphName, [])
+            entries.insert(bisect_left(entries, i), i)
+
+    def rename(self, oldName, newName, index):
+        """
+        Record that the name at index changed from oldName to newName.
+        """
+        indexes = self._indexes.get(oldName)
+        if indexes is not None and index in indexes:
+            indexes.remove(index)
+            if not indexes:
+                del self._indexes[oldName]
+                self._nameRemoved(oldName)
+        if newName not in self._indexes:
+            self._nameAdded(newName)
+        indexes = self._indexes.setdefault(newName, [])
+        indexes.append(index)
+        indexes.sort()
+
+    # type-ahead
+
+    def _getPrefixIndex(self):
+        # the sorted names are only built when they are first needed.
+        if self._prefixIndex is None:
+            self._prefixIndex = GlyphNamePrefixIndex(self._indexes.keys())
+        return self._prefixIndex
+
+    def _nameAdded(self, glyphName):
+        if self._prefixIndex is not None:
+            self._prefixIndex.addName(glyphName)
+
+    def _nameRemoved(self, glyphName):
+        if self._prefixIndex is not None:
+            self._prefixIndex.removeName(glyphName)
+
+    def findTypeAheadIndex(self, text):
+        """
+        Get the first index of the smallest name that starts with text.
+        If no name starts with text, the first index of the smallest
+        name greater than text is returned. None is returned if
+        there is no such name.
+        """
+        prefixIndex = self._getPrefixIndex()
+        glyphName = prefixIndex.firstNameWithPrefix(text)
+        if glyphName is None:
+            glyphName = prefixIndex.firstNameAfter(text)
+        if glyphName is None:
+            return None
+        return self.getFirstIndex(glyphName)
+
+
+def removeGlyphNames(glyphNames, glyphNameIndex, indexes):
+    """
+    Remove the glyph names at indexes from glyphNames
+    and glyphNameIndex in place.
+
+    >>> glyphNames = ["a", "b", "c", "d"]
+    >>> glyphNameIndex = GlyphNameIndex(glyphNames)
+    >>> removeGlyphNames(glyphNames, glyphNameIndex, [3, 1])
+    >>> glyphNames, glyphNameIndex.getIndexes("c")
+    (['a', 'c'], [1])
+    """
+    for i in sorted(indexes, reverse=True):
+        del glyphNames[i]
+    glyphNameIndex.removeIndexes(indexes)
+
+
+def insertGlyphNames(glyphNames, glyphNameIndex, indexes, newGlyphNames):
+    """
+    Insert newGlyphNames into glyphNames and glyphNameIndex in place.
+    The indexes are the positions that the new names will have once
+    they have been inserted, following NSKeyValueChangeInsertion.
+
+    >>> glyphNames = ["a", "b", "c"]
+    >>> glyphNameIndex = GlyphNameIndex(glyphNames)
+    >>> insertGlyphNames(glyphNames, glyphNameIndex, [1, 4], ["x", "y"])
+    >>> glyphNames
+    ['a', 'x', 'b', 'c', 'y']
+    >>> glyphNameIndex.getIndexes("c"), glyphNameIndex.getIndexes("y")
+    ([3], [4])
+    >>> [glyphNameIndex.getFirstIndex(glyphName) for glyphName in glyphNames] == list(range(5))
+    True
+    """
+    for i, glyphName in sorted(zip(indexes, newGlyphNames)):
+        glyphNames.insert(i, glyphName)
+    glyphNameIndex.insertIndexes(indexes, newGlyphNames)
+
+
+def replaceGlyphNames(glyphNames, glyphNameIndex, indexes, newGlyphNames):
+    """
+    Replace the glyph names at indexes with newGlyphNames
+    in glyphNames and glyphNameIndex in place.
+
+    >>> glyphNames = ["a", "b", "c"]
+    >>> glyphNameIndex = GlyphNameIndex(glyphNames)
+    >>> replaceGlyphNames(glyphNames, glyphNameIndex, [0, 2], ["c", "a"])
+    >>> glyphNames, glyphNameIndex.getIndexes("a"), glyphNameIndex.getIndexes("c")
+    (['c', 'b', 'a'], [2], [0])
+    """
+    for i, glyphName in zip(indexes, newGlyphNames):
+        glyphNameIndex.rename(glyphNames[i], glyphName, i)
+        glyphNames[i] = glyphName
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,106 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+class GlyphNamePrefixIndex(object):
+
+    """
+    This object keeps a sorted list of unique glyph names
+    and answers prefix queries with binary searches.
+
+    >>> index = GlyphNamePrefixIndex(["e", "egrave", "e.alt", "eight", "eight.alt", "f"])
+    >>> index.firstNameWithPrefix("eg")
+    'egrave'
+    >>> index.firstNameWithPrefix("e.")
+    'e.alt'
+    >>> index.firstNameWithPrefix("x") is None
+    True
+    >>> index.longestNameThatIsPrefixOf("eight.al")
+    'eight'
+    >>> index.longestNameThatIsPrefixOf("eighty")
+    'eight'
+    >>> index.longestNameThatIsPrefixOf("x") is None
+    True
+    >>> index.firstNameAfter("eight.alt")
+    'f'
+    >>> index.firstNameAfter("f") is None
+    True
+
+    - Test editing
+    >>> index.addName("eg")
+    >>> index.firstNameWithPrefix("eg")
+    'eg'
+    >>> index.removeName("eg")
+    >>> index.removeName("eg")
+    >>> index.firstNameWithPrefix("eg")
+    'egrave'
+    >>> index.renameName("egrave", "zz")
+    >>> index.firstNameWithPrefix("eg") is None, "zz" in index, len(index)
+    (True, True, 6)
+    """
+
+    def __init__(self, glyphNames=None):
+        self._sortedNames = []
+        self._names = set()
+        if glyphNames is not None:
+            self.rebuild(glyphNames)
+
+    def __contains__(self, glyphName):
+        return glyphName in self._names
+
+    def __len__(self):
+        return len(self._sortedNames)
+
+    def rebuild(self, glyphNames):
+        self._names = set(glyphNames)
+        self._sortedNames = sorted(self._names)
+
+    def addName(self, glyphName):
+        if glyphName in self._names:
+            return
+        self._names.add(glyphName)
+        insort(self._sortedNames, glyphName)
+
+    def removeName(self, glyphName):
+        if glyphName not in self._names:
+            return
+        self._names.remove(glyphName)
+        del self._sortedNames[bisect_left(self._sortedNames, glyphName)]
+
+    def renameName(self, oldName, newName):
+        self.removeName(oldName)
+        self.addName(newName)
+
+    def firstNameWithPrefix(self, prefix):
+        """
+        Get the first name, in sorted order, that starts with prefix.
+        None is returned if no name starts with prefix.
+        """
+        i = bisect_left(self._sortedNames, prefix)
+        if i < len(self._sortedNames) and self._sortedNames[i].startswith(prefix):
+            return self._sortedNames[i]
+        return None
+
+    def firstNameAfter(self, text):
+        """
+        Get the first name, in sorted order, that is greater than text.
+        None is returned if no name is greater than text.
+        """
+        i = bisect_right(self._sortedNames, text)
+        if i < len(self._sortedNames):
+            return self._sortedNames[i]
+        return None
+
+    def longestNameThatIsPrefixOf(self, text):
+        """
+        Get the longest name that text starts with.
+        None is returned if text does not start with any name.
+        """
+        for i in range(len(text), 0, -1):
+            if text[:i] in self._names:
+                return text[:i]
+        return None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,337 @@
+firstGroupPrefix = "public.kern1."
+secondGroupPrefix = "public.kern2."
+
+
+class KerningResolver(object):
+
+    """
+    This object finds the kerning value for a pair of glyphs.
+    The kerning groups that the glyphs belong to are taken into
+    account, following the UFO lookup order: glyph + glyph,
+    glyph + group, group + glyph and group + group. Values that
+    have been found are kept in a cache that holds at most
+    maxCacheSize pairs.
+
+    kerning is a dictionary of pairs, which may be glyph names
+    or kerning group names, to values. groups is a dictionary
+    of group names to lists of glyph names. Both may change
+    as long as the resolver is told about the changes.
+
+    >>> groups = {
+    ...     "public.kern1.O" : ["O", "D", "Q"],
+    ...     "public.kern2.O" : ["O", "C", "Q"],
+    ...     "public.kern2.A" : ["A", "Aacute"],
+    ...     "other" : ["A"]
+    ... }
+    >>> kerning = {
+    ...     ("public.kern1.O", "public.kern2.A") : -30,
+    ...     ("public.kern1.O", "Aacute") : -20,
+    ...     ("Q", "public.kern2.A") : -10,
+    ...     ("Q", "Aacute") : 0,
+    ...     ("T", "public.kern2.O") : -50
+    ... }
+    >>> resolver = KerningResolver(kerning, groups)
+    >>> resolver.get("D", "A"), resolver.get("D", "Aacute"), resolver.get("Q", "A"), resolver.get("Q", "Aacute")
+    (-30, -20, -10, 0)
+    >>> resolver.get("T", "C"), resolver.get("T", "A"), resolver.get("X", "Y")
+    (-50, 0, 0)
+
+    - Test pair changes
+    >>> kerning[("public.kern1.O", "public.kern2.A")] = -40
+    >>> resolver.get("D", "A")
+    -30
+    >>> lefts, rights = resolver.pairChanged(("public.kern1.O", "public.kern2.A"))
+    >>> sorted(lefts), sorted(rights)
+    (['D', 'O', 'Q'], ['A', 'Aacute'])
+    >>> resolver.get("D", "A"), resolver.get("T", "C")
+    (-40, -50)
+    >>> stats = resolver.getStats()
+    >>> stats["invalidations"]
+    4
+
+    - Test group changes
+    >>> groups["public.kern1.O"] = ["O", "Q"]
+    >>> groups["public.kern1.D"] = ["D"]
+    >>> side, glyphNames = resolver.groupChanged("public.kern1.O")
+    >>> side, sorted(glyphNames)
+    (0, ['D'])
+    >>> side, glyphNames = resolver.groupChanged("public.kern1.D")
+    >>> resolver.get("D", "A"), resolver.get("O", "A")
+    (0, -40)
+    >>> del groups["public.kern2.O"]
+    >>> side, glyphNames = resolver.groupChanged("public.kern2.O")
+    >>> resolver.get("T", "C")
+    0
+
+    - Test the cache size
+    >>> resolver = KerningResolver(kerning, groups, maxCacheSize=2)
+    >>> values = [resolver.get(left, "A") for left in "OQDT"]
+    >>> resolver.getStats()["cached"]
+    2
+
+    - Test random changes against a resolver without a cache
+    >>> import random
+    >>> rng = random.Random(0)
+    >>> glyphNames = ["a", "b", "c", "d", "e"]
+    >>> groupNames = [firstGroupPrefix + "x", firstGroupPrefix + "y", secondGroupPrefix + "x", secondGroupPrefix + "y"]
+    >>> groups = {}
+    >>> kerning = {}
+    >>> resolver = KerningResolver(kerning, groups, maxCacheSize=10)
+    >>> failures = []
+    >>> for i in range(2000):
+    ...     if rng.random() < 0.3:
+    ...         groupName = rng.choice(groupNames)
+    ...         groups[groupName] = rng.sample(glyphNames, rng.randint(0, 2))
+    ...         changed = resolver.groupChanged(groupName)
+    ...     else:
+    ...         pair = (rng.choice(glyphNames + groupNames[:2]), rng.choice(glyphNames + groupNames[2:]))
+    ...         if rng.random() < 0.2 and pair in kerning:
+    ...             del kerning[pair]
+    ...         else:
+    ...             kerning[pair] = rng.randint(-5, 5)
+    ...         changed = resolver.pairChanged(pair)
+    ...     left, right = rng.choice(glyphNames), rng.choice(glyphNames)
+    ...     if resolver.get(left, right) != KerningResolver(kerning, groups).get(left, right):
+    ...         failures.append((left, right))
+    >>> failures
+    []
+    """
+
+    def __init__(self, kerning, groups, maxCacheSize=100000):
+        self.kerning = kerning
+        self.groups = groups
+        self._maxCacheSize = maxCacheSize
+        self._cache = {}
+        self._firstGroups = None
+        self._secondGroups = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ------
+    # Lookup
+    # ------
+
+    def get(self, left, right):
+        """
+        Get the kerning value for the glyphs named left and right.
+        0 is returned if there is no value for the pair.
+        """
+        pair = (left, right)
+        value = self._cache.get(pair)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = self._lookup(left, right)
+        cache = self._cache
+        if len(cache) >= self._maxCacheSize:
+            # drop the oldest value
+            if cache:
+                del cache[next(iter(cache))]
+            else:
+                return value
+        cache[pair] = value
+        return value
+
+    def _lookup(self, left, right):
+        if self._firstGroups is None:
+            self._buildGroupMaps()
+        kerning = self.kerning
+        leftGroup = self._firstGroups.get(left)
+        rightGroup = self._secondGroups.get(right)
+        pair = (left, right)
+        if pair in kerning:
+            return kerning[pair]
+        if rightGroup is not None:
+            pair = (left, rightGroup)
+            if pair in kerning:
+                return kerning[pair]
+        if leftGroup is not None:
+            pair = (leftGroup, right)
+            if pair in kerning:
+                return kerning[pair]
+            if rightGroup is not None:
+                pair = (leftGroup, rightGroup)
+                if pair in kerning:
+                    return kerning[pair]
+        return 0
+
+    def _buildGroupMaps(self):
+        self._firstGroups = self._buildGroupMap(firstGroupPrefix)
+        self._secondGroups = self._buildGroupMap(secondGroupPrefix)
+
+    def _buildGroupMap(self, prefix):
+        # a glyph should only be in one kerning group per side.
+        # if it is in more, the first group in sorted order wins.
+        groupMap = {}
+        for groupName in sorted(self.groups.keys(), reverse=True):
+            if not groupName.startswith(prefix):
+                continue
+            for glyphName in self.groups[groupName]:
+                groupMap[glyphName] = groupName
+        return groupMap
+
+    # ------------
+    # Invalidation
+    # ------------
+
+    def _getGlyphNames(self, name, prefix, groupMap):
+        if not name.startswith(prefix):
+            return set([name])
+        return set(glyphName for glyphName in self.groups.get(name, ()) if groupMap.get(glyphName) == name)
+
+    def pairChanged(self, pair):
+        """
+        Discard the cached values affected by a change
+        to the value for pair. The sets of left and right
+        glyph names whose pairs may have a new value are
+        returned as (lefts, rights).
+        """
+        if self._firstGroups is None:
+            self._buildGroupMaps()
+        left, right = pair
+        lefts = self._getGlyphNames(left, firstGroupPrefix, self._firstGroups)
+        rights = self._getGlyphNames(right, secondGroupPrefix, self._secondGroups)
+        cache = self._cache
+        if len(lefts) * len(rights) <= len(cache):
+            for left in lefts:
+                for right in rights:
+                    if cache.pop((left, right), None) is not None:
+                        self.invalidations += 1
+        else:
+            for key in list(cache.keys()):
+                if key[0] in lefts and key[1] in rights:
+                    del cache[key]
+                    self.invalidations += 1
+        return lefts, rights
+
+    def groupChanged(self, groupName):
+        """
+        Discard the cached values affected by a change to
+        the glyphs in the group named groupName. The side of
+        the pairs, 0 for left and 1 for right, and the set of
+        glyph names whose kerning group changed are returned
+        as (side, glyphNames). None is returned if groupName
+        is not a kerning group.
+        """
+        if self._firstGroups is None:
+            self._buildGroupMaps()
+        if groupName.startswith(firstGroupPrefix):
+            side = 0
+            prefix = firstGroupPrefix
+            oldGroupMap = self._firstGroups
+        elif groupName.startswith(secondGroupPrefix):
+            side = 1
+            prefix = secondGroupPrefix
+            oldGroupMap = self._secondGroups
+        else:
+            return None
+        newGroupMap = self._buildGroupMap(prefix)
+        if side == 0:
+            self._firstGroups = newGroupMap
+        else:
+            self._secondGroups = newGroupMap
+        changed = set()
+        for glyphName in set(oldGroupMap) | set(newGroupMap):
+            if oldGroupMap.get(glyphName) != newGroupMap.get(glyphName):
+                changed.add(glyphName)
+        if not changed:
+            return side, changed
+        cache = self._cache
+        for key in list(cache.keys()):
+            if key[side] in changed:
+                del cache[key]
+                self.invalidations += 1
+        return side, changed
+
+    def clear(self):
+        """
+        Discard all cached values and group memberships.
+        """
+        self._cache = {}
+        self._firstGroups = None
+        self._secondGroups = None
+
+    def getStats(self):
+        """
+        Get a dictionary of counters describing the state of the cache.
+        """
+        return dict(
+            cached=len(self._cache),
+            maxCacheSize=self._maxCacheSize,
+            hits=self.hits,
+            misses=self.misses,
+            invalidations=self.invalidations
+        )
+
+
+class GlyphPairIndex(object):
+
+    """
+    This object maps glyph names to the positions of the
+    pairs they are part of in a line of glyphs. pairs is a
+    list with, for each position, a (left, right) tuple of
+    glyph names or None if the position is not kerned.
+
+    >>> index = GlyphPairIndex([("T", "o"), ("o", "T"), None, ("T", "e")])
+    >>> index.findPairs(set(["T"]), set(["o", "e"]))
+    [0, 3]
+    >>> index.findPairs(set(["o"]), set(["x"]))
+    []
+    >>> index.findLefts(set(["o"])), index.findRights(set(["T"]))
+    ([1], [1])
+    >>> len(index)
+    4
+    """
+
+    def __init__(self, pairs):
+        self._count = len(pairs)
+        self._lefts = {}
+        self._rights = {}
+        for position, pair in enumerate(pairs):
+            if pair is None:
+                continue
+            left, right = pair
+            self._lefts.setdefault(left, []).append(position)
+            self._rights.setdefault(right, []).append(position)
+        self._pairs = pairs
+
+    def __len__(self):
+        return self._count
+
+    def findPairs(self, lefts, rights):
+        """
+        Get a sorted list of the positions of the pairs
+        with a left in lefts and a right in rights.
+        """
+        pairs = self._pairs
+        if len(lefts) <= len(rights):
+            return [position for position in self.findLefts(lefts) if pairs[position][1] in rights]
+        return [position for position in self.findRights(rights) if pairs[position][0] in lefts]
+
+    def findLefts(self, glyphNames):
+        """
+        Get a sorted list of the positions of the pairs
+        with a left in glyphNames.
+        """
+        return self._find(self._lefts, glyphNames)
+
+    def findRights(self, glyphNames):
+        """
+        Get a sorted list of the positions of the pairs
+        with a right in glyphNames.
+        """
+        return self._find(self._rights, glyphNames)
+
+    def _find(self, positionMap, glyphNames):
+        positions = []
+        for glyphName in glyphNames:
+            positions.extend(positionMap.get(glyphName, ()))
+        positions.sort()
+        return positions
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
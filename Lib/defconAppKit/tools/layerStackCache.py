@@ -0,0 +1,210 @@
+import weakref
+
+
+class LayerStackCache(object):
+
+    """
+    This object caches, for each glyph name, the glyphs with that
+    name in the layers of a layer set. The glyphs are listed from
+    the bottom layer to the top layer, following the reversed
+    layer order, as (layerName, glyph) tuples. The cache observes
+    the layer set and its layers and drops the stacks that change.
+
+    Use getLayerStackCache to get the cache that is shared by all
+    views that draw glyphs from a layer set.
+
+    >>> class Notification(object):
+    ...     def __init__(self, data=None):
+    ...         self.data = data
+    >>> class Observable(object):
+    ...     def addObserver(self, observer, methodName, notification):
+    ...         pass
+    ...     def removeObserver(self, observer, notification):
+    ...         pass
+    >>> class Layer(dict, Observable):
+    ...     __hash__ = object.__hash__
+    >>> class LayerSet(Observable):
+    ...     def __init__(self, layers):
+    ...         self.layerOrder = [name for name, layer in layers]
+    ...         self.layers = dict(layers)
+    ...     def __getitem__(self, name):
+    ...         return self.layers[name]
+    >>> foreground = Layer(a="a.fore", b="b.fore")
+    >>> background = Layer(a="a.back")
+    >>> layerSet = LayerSet([("foreground", foreground), ("background", background)])
+    >>> cache = LayerStackCache(layerSet)
+    >>> cache.getLayerStack("a")
+    (('background', 'a.back'), ('foreground', 'a.fore'))
+    >>> cache.getLayerStack("b")
+    (('foreground', 'b.fore'),)
+    >>> cache.getLayerStack("x")
+    ()
+
+    - Test glyph changes
+    >>> background["b"] = "b.back"
+    >>> cache.getLayerStack("b")
+    (('foreground', 'b.fore'),)
+    >>> cache._glyphAdded(Notification(dict(name="b")))
+    >>> cache.getLayerStack("b")
+    (('background', 'b.back'), ('foreground', 'b.fore'))
+    >>> background["c"] = background.pop("a")
+    >>> cache._glyphNameChanged(Notification(dict(oldValue="a", newValue="c")))
+    >>> cache.getLayerStack("a"), cache.getLayerStack("c")
+    ((('foreground', 'a.fore'),), (('background', 'a.back'),))
+
+    - Test layer changes
+    >>> layerSet.layerOrder.reverse()
+    >>> cache._layerSetChanged(Notification())
+    >>> cache.getLayerStack("b")
+    (('foreground', 'b.fore'), ('background', 'b.back'))
+    >>> stats = cache.getStats()
+    >>> stats["cached"], stats["hits"], stats["misses"]
+    (1, 1, 7)
+    >>> cache.close()
+
+    - Test sharing
+    >>> getLayerStackCache(layerSet) is getLayerStackCache(layerSet)
+    True
+    """
+
+    def __init__(self, layerSet):
+        self._layerSet = weakref.ref(layerSet)
+        self._stacks = {}
+        self._layers = {}
+        self.hits = 0
+        self.misses = 0
+        layerSet.addObserver(self, "_layerSetChanged", "LayerSet.LayerOrderChanged")
+        layerSet.addObserver(self, "_layerSetChanged", "LayerSet.LayerAdded")
+        layerSet.addObserver(self, "_layerWillBeDeleted", "LayerSet.LayerWillBeDeleted")
+        layerSet.addObserver(self, "_layerSetChanged", "LayerSet.LayerDeleted")
+        layerSet.addObserver(self, "_layerSetChanged", "LayerSet.LayerNameChanged")
+        self._subscribeToLayers()
+
+    def close(self):
+        """
+        Stop observing the layer set and its layers.
+        """
+        self._unsubscribeFromLayers()
+        layerSet = self._layerSet()
+        if layerSet is not None:
+            layerSet.removeObserver(self, "LayerSet.LayerOrderChanged")
+            layerSet.removeObserver(self, "LayerSet.LayerAdded")
+            layerSet.removeObserver(self, "LayerSet.LayerWillBeDeleted")
+            layerSet.removeObserver(self, "LayerSet.LayerDeleted")
+            layerSet.removeObserver(self, "LayerSet.LayerNameChanged")
+        self._stacks = {}
+
+    # ------
+    # Access
+    # ------
+
+    def getLayerStack(self, glyphName):
+        """
+        Get a tuple of (layerName, glyph) for the layers that
+        contain glyphName, from the bottom layer to the top layer.
+        """
+        stack = self._stacks.get(glyphName)
+        if stack is not None:
+            self.hits += 1
+            return stack
+        self.misses += 1
+        layerSet = self._layerSet()
+        if layerSet is None:
+            return ()
+        stack = []
+        for layerName in reversed(layerSet.layerOrder):
+            layer = layerSet[layerName]
+            if glyphName not in layer:
+                continue
+            stack.append((layerName, layer[glyphName]))
+        stack = self._stacks[glyphName] = tuple(stack)
+        return stack
+
+    def clear(self):
+        """
+        Discard all cached stacks.
+        """
+        self._stacks = {}
+
+    def getStats(self):
+        """
+        Get a dictionary of counters describing the state of the cache.
+        """
+        return dict(
+            cached=len(self._stacks),
+            hits=self.hits,
+            misses=self.misses
+        )
+
+    # -------------
+    # Notifications
+    # -------------
+
+    def _subscribeToLayers(self):
+        layerSet = self._layerSet()
+        if layerSet is None:
+            return
+        for layerName in layerSet.layerOrder:
+            layer = layerSet[layerName]
+            layer.addObserver(self, "_glyphAdded", "Layer.GlyphAdded")
+            layer.addObserver(self, "_glyphDeleted", "Layer.GlyphDeleted")
+            layer.addObserver(self, "_glyphNameChanged", "Layer.GlyphNameChanged")
+            self._layers[layer] = layerName
+
+    def _unsubscribeFromLayers(self):
+        for layer in self._layers:
+            self._unsubscribeFromLayer(layer)
+        self._layers = {}
+
+    def _unsubscribeFromLayer(self, layer):
+        layer.removeObserver(self, "Layer.GlyphAdded")
+        layer.removeObserver(self, "Layer.GlyphDeleted")
+        layer.removeObserver(self, "Layer.GlyphNameChanged")
+
+    def _layerWillBeDeleted(self, notification):
+        # stop observing the layer while it is still in the layer set
+        layerSet = self._layerSet()
+        layerName = notification.data["name"]
+        if layerSet is not None and layerName in layerSet:
+            layer = layerSet[layerName]
+            if layer in self._layers:
+                self._unsubscribeFromLayer(layer)
+                del self._layers[layer]
+
+    def _layerSetChanged(self, notification):
+        # the layers, or their order, changed
+        self._unsubscribeFromLayers()
+        self._subscribeToLayers()
+        self._stacks = {}
+
+    def _glyphAdded(self, notification):
+        self._stacks.pop(notification.data["name"], None)
+
+    def _glyphDeleted(self, notification):
+        self._stacks.pop(notification.data["name"], None)
+
+    def _glyphNameChanged(self, notification):
+        data = notification.data
+        self._stacks.pop(data["oldValue"], None)
+        self._stacks.pop(data["newValue"], None)
+
+
+# layer set > LayerStackCache
+_layerStackCaches = weakref.WeakKeyDictionary()
+
+
+def getLayerStackCache(layerSet):
+    """
+    Get the LayerStackCache for layerSet. The cache is created
+    when it is first needed and is shared until the layer set
+    is released.
+    """
+    cache = _layerStackCaches.get(layerSet)
+    if cache is None:
+        cache = _layerStackCaches[layerSet] = LayerStackCache(layerSet)
+    return cache
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,202 @@
+import time
+import traceback
+
+
+class RenderScheduler(object):
+
+    """
+    This object renders items in priority order, a batch at a
+    time, so that the rendering can be spread over several passes
+    of a run loop. Items are identified by hashable keys. The
+    renderer is a callable that takes a key and returns the
+    rendered result. It is only called from renderBatch, on the
+    thread that calls renderBatch.
+
+    Each call to schedule replaces the pending work with a new
+    list of keys, ordered from most to least important, so jobs
+    for keys that are no longer wanted are dropped. reset drops
+    all results and pending jobs.
+
+    Each call to renderBatch renders pending jobs until batchDuration
+    seconds have passed. At least one job is rendered per batch.
+
+    - Test rendering
+    >>> order = []
+    >>> def renderer(key):
+    ...     order.append(key)
+    ...     return key.upper()
+    >>> scheduler = RenderScheduler(renderer)
+    >>> scheduler.getResult("a") is None
+    True
+    >>> scheduler.schedule(["a", "b", "c", "a"])
+    >>> scheduler.hasPendingJobs()
+    True
+    >>> scheduler.renderBatch()
+    ['a', 'b', 'c']
+    >>> scheduler.hasPendingJobs()
+    False
+    >>> scheduler.getResult("b")
+    'B'
+    >>> stats = scheduler.getStats()
+    >>> stats["hits"], stats["misses"], stats["rendered"], stats["queueDepth"]
+    (1, 1, 3, 0)
+
+    - Test that existing results are not rendered again
+    >>> scheduler.schedule(["c", "d"])
+    >>> scheduler.renderBatch()
+    ['d']
+    >>> order
+    ['a', 'b', 'c', 'd']
+
+    - Test invalidation
+    >>> scheduler.invalidate("a")
+    >>> scheduler.getResult("a") is None
+    True
+    >>> scheduler.reset()
+    >>> scheduler.getResult("b") is None
+    True
+    >>> scheduler.getStats()["results"]
+    0
+
+    - Test time slicing and dropping stale jobs
+    >>> now = [0]
+    >>> def slowRenderer(key):
+    ...     now[0] += 0.01
+    ...     return key
+    >>> scheduler = RenderScheduler(slowRenderer, batchDuration=0.025, clock=lambda: now[0])
+    >>> scheduler.schedule(["a", "b", "c", "d", "e"])
+    >>> scheduler.renderBatch()
+    ['a', 'b', 'c']
+    >>> scheduler.getStats()["queueDepth"]
+    2
+    >>> scheduler.schedule(["x", "a", "y"])
+    >>> scheduler.getStats()["dropped"]
+    2
+    >>> scheduler.renderBatch()
+    ['x', 'y']
+    >>> scheduler.renderBatch()
+    []
+    """
+
+    def __init__(self, renderer, batchDuration=0.02, clock=time.time):
+        self._renderer = renderer
+        self._batchDuration = batchDuration
+        self._clock = clock
+        self._queue = []
+        self._queuePosition = 0
+        self._results = {}
+        self.hits = 0
+        self.misses = 0
+        self.rendered = 0
+        self.dropped = 0
+        self.batches = 0
+
+    # ------
+    # Access
+    # ------
+
+    def getResult(self, key):
+        """
+        Get the result for key. None is returned if the key
+        has not been rendered.
+        """
+        result = self._results.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def hasResult(self, key):
+        return key in self._results
+
+    def hasPendingJobs(self):
+        return self._queuePosition < len(self._queue)
+
+    def getStats(self):
+        """
+        Get a dictionary of counters describing the state of the scheduler.
+        """
+        return dict(
+            queueDepth=len(self._queue) - self._queuePosition,
+            results=len(self._results),
+            hits=self.hits,
+            misses=self.misses,
+            rendered=self.rendered,
+            dropped=self.dropped,
+            batches=self.batches
+        )
+
+    # ----------
+    # Scheduling
+    # ----------
+
+    def schedule(self, keys):
+        """
+        Replace the pending jobs with keys. The keys should
+        be ordered from the highest priority to the lowest.
+        Keys that already have results are skipped.
+        """
+        pending = set(self._queue[self._queuePosition:])
+        queue = []
+        queued = set()
+        for key in keys:
+            if key in queued or key in self._results:
+                continue
+            queue.append(key)
+            queued.add(key)
+        self.dropped += len(pending - queued)
+        self._queue = queue
+        self._queuePosition = 0
+
+    def invalidate(self, key):
+        """
+        Discard the result for key.
+        """
+        self._results.pop(key, None)
+
+    def reset(self):
+        """
+        Discard all results and pending jobs.
+        """
+        self.dropped += len(self._queue) - self._queuePosition
+        self._queue = []
+        self._queuePosition = 0
+        self._results = {}
+
+    # ---------
+    # Rendering
+    # ---------
+
+    def renderBatch(self):
+        """
+        Render pending jobs until the batch duration has passed.
+        The keys that have new results are returned.
+        """
+        if not self.hasPendingJobs():
+            return []
+        self.batches += 1
+        clock = self._clock
+        deadline = clock() + self._batchDuration
+        queue = self._queue
+        rendered = []
+        while self._queuePosition < len(queue):
+            key = queue[self._queuePosition]
+            self._queuePosition += 1
+            result = None
+            try:
+                result = self._renderer(key)
+            except Exception:
+                traceback.print_exc()
+            if result is not None:
+                self._results[key] = result
+                self.rendered += 1
+                rendered.append(key)
+            if clock() >= deadline:
+                break
+        return rendered
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
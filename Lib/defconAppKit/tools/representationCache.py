@@ -0,0 +1,166 @@
+from collections import OrderedDict
+
+
+class RepresentationCache(object):
+
+    """
+    A least recently used cache with a byte budget. Each value
+    is stored with a size, given in bytes, and an optional group
+    that can be used to discard related values together. When the
+    total size exceeds the budget, the least recently used values
+    are evicted. The cache knows nothing about the values it holds
+    so it can be used with any drawing backend.
+
+    - Test storage and eviction
+    >>> cache = RepresentationCache(maxBytes=100)
+    >>> cache.set("a60", "A", 40, group="a")
+    >>> cache.set("b60", "B", 40, group="b")
+    >>> cache.get("a60")
+    'A'
+    >>> cache.set("a80", "A2", 40, group="a")
+    >>> cache.get("b60") is None
+    True
+    >>> sorted(cache.keys())
+    ['a60', 'a80']
+    >>> stats = cache.getStats()
+    >>> stats["bytes"], stats["evictions"], stats["hits"], stats["misses"]
+    (80, 1, 1, 1)
+
+    - Test groups
+    >>> sorted(cache.getGroupKeys("a"))
+    ['a60', 'a80']
+    >>> cache.getGroupKeys("b")
+    []
+    >>> cache.discardGroup("a")
+    >>> len(cache), cache.getStats()["bytes"]
+    (0, 0)
+
+    - Test replacing values
+    >>> cache.set("c", "C", 30)
+    >>> cache.set("c", "C2", 50)
+    >>> cache.get("c"), cache.getStats()["bytes"]
+    ('C2', 50)
+
+    - Test values larger than the budget
+    >>> cache.set("d", "D", 500)
+    >>> "d" in cache
+    False
+    >>> "c" in cache
+    True
+
+    - Test changing the budget
+    >>> cache.setMaxBytes(10)
+    >>> len(cache), cache.getStats()["evictions"]
+    (0, 2)
+    """
+
+    def __init__(self, maxBytes=128 * 1024 * 1024):
+        self._maxBytes = maxBytes
+        self._items = OrderedDict()
+        self._groups = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def keys(self):
+        return list(self._items.keys())
+
+    def setMaxBytes(self, value):
+        self._maxBytes = value
+        self._evict()
+
+    def getMaxBytes(self):
+        return self._maxBytes
+
+    def get(self, key):
+        """
+        Get the value for key and mark it as recently used.
+        None is returned if the key is not in the cache.
+        """
+        item = self._items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def set(self, key, value, size, group=None):
+        """
+        Store value for key. size is the number of bytes
+        the value is expected to hold.
+        """
+        self._discard(key)
+        if size > self._maxBytes:
+            return
+        self._items[key] = (value, size, group)
+        self._bytes += size
+        if group is not None:
+            self._groups.setdefault(group, set()).add(key)
+        self._evict()
+
+    def discard(self, key):
+        self._discard(key)
+
+    def getGroupKeys(self, group):
+        """
+        Get the keys of the values stored with group.
+        """
+        return list(self._groups.get(group, ()))
+
+    def discardGroup(self, group):
+        """
+        Discard all values stored with group.
+        """
+        for key in list(self._groups.get(group, ())):
+            self._discard(key)
+
+    def clear(self):
+        self._items.clear()
+        self._groups.clear()
+        self._bytes = 0
+
+    def getStats(self):
+        """
+        Get a dictionary of counters describing the state of the cache.
+        """
+        return dict(
+            count=len(self._items),
+            bytes=self._bytes,
+            maxBytes=self._maxBytes,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions
+        )
+
+    # internal
+
+    def _discard(self, key):
+        item = self._items.pop(key, None)
+        if item is None:
+            return
+        value, size, group = item
+        self._bytes -= size
+        if group is not None:
+            keys = self._groups[group]
+            keys.discard(key)
+            if not keys:
+                del self._groups[group]
+
+    def _evict(self):
+        while self._bytes > self._maxBytes and self._items:
+            key = next(iter(self._items))
+            self._discard(key)
+            self.evictions += 1
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
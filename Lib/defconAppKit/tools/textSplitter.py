@@ -1,3 +1,7 @@
+import re
+from bisect import bisect_right
+
+
 def characterToGlyphName(c, cmap):
     v = ord(c)
     v = cmap.get(v)
@@ -6,6 +10,55 @@ def characterToGlyphName(c, cmap):
     return v
 
 
+class CmapResolver(object):
+
+    """
+    This object flattens a cmap, which maps code points to glyph
+    names or lists of glyph names, into a map of code points to
+    the first glyph name. It can be given to splitText and
+    iterSplitText in place of the cmap. Keep the resolver for as
+    long as the cmap does not change.
+
+    >>> resolver = CmapResolver({65:["A", "A.alt"], 66:"B", 67:[]})
+    >>> resolver.getGlyphName("A"), resolver.getGlyphName("C") is None
+    ('A', True)
+    >>> resolver.getGlyphNames("ABC?", ".notdef")
+    ['A', 'B', '.notdef', '.notdef']
+    """
+
+    def __init__(self, cmap):
+        flat = {}
+        for code, glyphName in cmap.items():
+            if isinstance(glyphName, list):
+                if not glyphName:
+                    continue
+                glyphName = glyphName[0]
+            # keyed by character to save an ord call per character
+            flat[chr(code)] = glyphName
+        self._cmap = flat
+
+    def getGlyphName(self, c):
+        return self._cmap.get(c)
+
+    def getGlyphNames(self, text, fallback):
+        """
+        Get the glyph names for all characters in text.
+        """
+        get = self._cmap.get
+        return [get(c, fallback) for c in text]
+
+
+# the grammar of the text, with // tried before /.
+# - an escaped slash: //
+# - a glyph name: / followed by the name and an optional space
+# - a run of characters
+_splitTextRE = re.compile(
+    "(//)"
+    "|/([^/ ]*) ?"
+    "|([^/]+)"
+)
+
+
 def splitText(text, cmap, fallback=".notdef"):
     """
     Break a string of characters or / delimited glyph names
@@ -47,42 +100,431 @@ def splitText(text, cmap, fallback=".notdef"):
     >>> splitText("*/aacute .%//", {42:"asterisk", 46:"period"})
     ['asterisk', 'aacute', 'period', '.notdef', 'slash']
     """
-    # escape //
-    text = text.replace("//", "/slash ")
-    #
+    glyphNames, held = _splitChunk(text, _getGlyphNamesGetter(cmap), fallback, True)
+    return glyphNames
+
+
+def _iterChunks(text, chunkSize=65536):
+    if isinstance(text, str):
+        for i in range(0, len(text), chunkSize):
+            yield text[i:i + chunkSize]
+    elif hasattr(text, "read"):
+        while True:
+            chunk = text.read(chunkSize)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        for chunk in text:
+            yield chunk
+
+
+def iterSplitText(text, cmap, fallback=".notdef"):
+    """
+    Iterate over the glyph names in a string of characters or
+    / delimited glyph names. The glyph names are the same as
+    those returned by splitText, but they are produced as the
+    text is read. text can be a string, an iterable of strings
+    or a file-like object with a read method. Glyph names and
+    // may be split across the strings.
+
+    >>> names = iterSplitText("*/aacute .%//", {42:"asterisk", 46:"period"})
+    >>> next(names)
+    'asterisk'
+    >>> list(names)
+    ['aacute', 'period', '.notdef', 'slash']
+    >>> list(iterSplitText(["/aac", "ute /", "/ *", "/", "/"], {42:"asterisk"}))
+    ['aacute', 'slash', '.notdef', 'asterisk', 'slash']
+    >>> import io
+    >>> list(iterSplitText(io.StringIO("1//2 /three"), {49:"one", 50:"two"}))
+    ['one', 'slash', 'two', '.notdef', 'three']
+
+    - Test chunked input against whole input
+    >>> import random
+    >>> rng = random.Random(0)
+    >>> failures = []
+    >>> for i in range(500):
+    ...     text = "".join(rng.choice("/ ab*") for j in range(rng.randint(0, 20)))
+    ...     cuts = sorted(rng.randint(0, len(text)) for j in range(rng.randint(0, 4)))
+    ...     chunks = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+    ...     if list(iterSplitText(chunks, {42:"asterisk"})) != splitText(text, {42:"asterisk"}):
+    ...         failures.append(chunks)
+    >>> failures
+    []
+    """
+    getGlyphNames = _getGlyphNamesGetter(cmap)
+    held = ""
+    for chunk in _iterChunks(text):
+        glyphNames, held = _splitChunk(held + chunk, getGlyphNames, fallback, False)
+        yield from glyphNames
+    glyphNames, held = _splitChunk(held, getGlyphNames, fallback, True)
+    yield from glyphNames
+
+
+def _splitChunk(text, getGlyphNames, fallback, final):
+    # returns the glyph names and the text that could not be split
+    # yet. unless this is the final chunk, a glyph name at the end
+    # may continue in the next chunk so it is held back.
     glyphNames = []
-    compileStack = None
-    for c in text:
-        # start a glyph name compile.
-        if c == "/":
-            # finishing a previous compile.
-            if compileStack is not None:
-                # only add the compile if something has been added to the stack.
-                if compileStack:
-                    glyphNames.append("".join(compileStack))
-            # reset the stack.
-            compileStack = []
-        # adding to or ending a glyph name compile.
-        elif compileStack is not None:
-            # space. conclude the glyph name compile.
-            if c == " ":
-                # only add the compile if something has been added to the stack.
-                if compileStack:
-                    glyphNames.append("".join(compileStack))
-                compileStack = None
-            # add the character to the stack.
-            else:
-                compileStack.append(c)
-        # adding a character that needs to be converted to a glyph name.
-        else:
-            glyphName = characterToGlyphName(c, cmap)
+    for m in _splitTextRE.finditer(text):
+        escape, glyphName, characters = m.groups()
+        if characters is not None:
+            glyphNames.extend(getGlyphNames(characters, fallback))
+        elif escape is not None:
+            glyphNames.append("slash")
+        elif not final and m.end() == len(text):
+            return glyphNames, text[m.start():]
+        # only add the compile if something has been compiled.
+        elif glyphName:
+            glyphNames.append(glyphName)
+    return glyphNames, ""
+
+
+def _getGlyphNamesGetter(cmap):
+    if isinstance(cmap, CmapResolver):
+        return cmap.getGlyphNames
+    return _makeGlyphNamesGetter(cmap)
+
+
+def _makeGlyphNamesGetter(cmap):
+    # the cmap is not flattened for a single call, but
+    # each character is only looked up once.
+    resolved = {}
+
+    def getGlyphNames(text, fallback):
+        glyphNames = []
+        for c in text:
+            glyphName = resolved.get(c)
             if glyphName is None:
-                glyphName = fallback
+                glyphName = characterToGlyphName(c, cmap)
+                if glyphName is None:
+                    glyphName = fallback
+                resolved[c] = glyphName
             glyphNames.append(glyphName)
-    # catch remaining compile.
-    if compileStack is not None and compileStack:
-        glyphNames.append("".join(compileStack))
-    return glyphNames
+        return glyphNames
+
+    return getGlyphNames
+
+
+# -----------------
+# Incremental Split
+# -----------------
+
+def _commonPrefixLength(text1, text2, limit):
+    # binary search with slice comparisons, which
+    # are much faster than comparing characters.
+    if text1[:limit] == text2[:limit]:
+        return limit
+    low = 0
+    high = limit
+    while high - low > 1:
+        middle = (low + high) // 2
+        if text1[low:middle] == text2[low:middle]:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def _commonSuffixLength(text1, text2, limit):
+    length1 = len(text1)
+    length2 = len(text2)
+    if text1[length1 - limit:] == text2[length2 - limit:]:
+        return limit
+    low = 0
+    high = limit
+    while high - low > 1:
+        middle = (low + high) // 2
+        if text1[length1 - middle:length1 - low] == text2[length2 - middle:length2 - low]:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+class OffsetList(object):
+
+    """
+    This object stores a nondecreasing list of offsets, such as the
+    positions at which tokens start. replace changes a range of the
+    offsets and shifts the offsets after the range. The shift is not
+    applied right away: it is kept as a pending delta for all offsets
+    from an index on, and is only moved when the next replacement is
+    somewhere else. Repeated edits at the same place, as with typing,
+    don't touch the offsets after the edit.
+
+    >>> offsets = OffsetList([0, 2, 5, 9])
+    >>> offsets.replace(1, 2, [2, 3, 4], 1)
+    >>> len(offsets), offsets[3], offsets[-1]
+    (6, 4, 10)
+    >>> offsets.bisectRight(6), offsets.bisectRight(5), offsets.bisectRight(-1)
+    (5, 4, 0)
+    >>> offsets.replace(0, 1, [], -2)
+    >>> offsets.getList()
+    [0, 1, 2, 4, 8]
+
+    - Test random edits against a list
+    >>> import random
+    >>> rng = random.Random(0)
+    >>> expected = []
+    >>> offsets = OffsetList()
+    >>> failures = []
+    >>> for i in range(2000):
+    ...     start = rng.randint(0, len(expected))
+    ...     end = rng.randint(start, min(len(expected), start + 3))
+    ...     low = expected[start - 1] if start else 0
+    ...     values = sorted(low + rng.randint(0, 3) for j in range(rng.randint(0, 3)))
+    ...     high = values[-1] if values else low
+    ...     delta = high - (expected[end - 1] if end else 0) + rng.randint(0, 2)
+    ...     expected[start:end] = values
+    ...     expected[start + len(values):] = [offset + delta for offset in expected[start + len(values):]]
+    ...     offsets.replace(start, end, values, delta)
+    ...     value = rng.randint(-1, high + 5)
+    ...     if offsets.bisectRight(value) != bisect_right(expected, value):
+    ...         failures.append(i)
+    ...     if [offsets[j] for j in range(len(offsets))] != expected:
+    ...         failures.append(i)
+    >>> failures, offsets.getList() == expected
+    ([], True)
+    """
+
+    def __init__(self, offsets=()):
+        self._offsets = list(offsets)
+        # the offsets from _shiftIndex on are stored without _shift
+        self._shiftIndex = len(self._offsets)
+        self._shift = 0
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self._offsets)
+        offset = self._offsets[index]
+        if index >= self._shiftIndex:
+            offset += self._shift
+        return offset
+
+    def getList(self):
+        self._moveShift(len(self._offsets))
+        return list(self._offsets)
+
+    def bisectRight(self, value):
+        """
+        Get the index after the last offset that is not greater than value.
+        """
+        offsets = self._offsets
+        shiftIndex = self._shiftIndex
+        if shiftIndex < len(offsets) and offsets[shiftIndex] + self._shift <= value:
+            return bisect_right(offsets, value - self._shift, shiftIndex)
+        return bisect_right(offsets, value, 0, shiftIndex)
+
+    def replace(self, start, end, offsets, delta):
+        """
+        Replace the offsets from start to end with offsets
+        and add delta to the offsets after them.
+        """
+        self._moveShift(end)
+        self._offsets[start:end] = offsets
+        self._shiftIndex = start + len(offsets)
+        self._shift += delta
+
+    def _moveShift(self, index):
+        offsets = self._offsets
+        shiftIndex = self._shiftIndex
+        shift = self._shift
+        if shift and index > shiftIndex:
+            offsets[shiftIndex:index] = [offset + shift for offset in offsets[shiftIndex:index]]
+        elif shift and index < shiftIndex:
+            offsets[index:shiftIndex] = [offset - shift for offset in offsets[index:shiftIndex]]
+        self._shiftIndex = index
+        if index == len(offsets):
+            self._shift = 0
+
+
+class IncrementalTextSplitter(object):
+
+    """
+    This object splits text into glyph names the same way as
+    splitText. When the text changes, only the part of the text
+    around the change is split again and the glyph names before
+    and after it are reused. setText returns the change to the
+    glyph names as (start, length, glyphNames): the glyph names
+    from start to start + length were replaced with glyphNames.
+
+    >>> splitter = IncrementalTextSplitter({97:"a", 98:"b", 99:"c"})
+    >>> splitter.setText("abc/x.alt cba")
+    (0, 0, ['a', 'b', 'c', 'x.alt', 'c', 'b', 'a'])
+    >>> splitter.setText("abc/x.alt cba")
+    >>> splitter.setText("abc/x.sc cba")
+    (3, 1, ['x.sc'])
+    >>> splitter.setText("abc/x.sc/cba")
+    (3, 4, ['x.sc', 'cba'])
+    >>> splitter.setText("ab/x.sc/cba")
+    (2, 1, [])
+    >>> splitter.getGlyphNames()
+    ['a', 'b', 'x.sc', 'cba']
+
+    - Test changing the cmap
+    >>> splitter.setCmap({97:"A"})
+    >>> splitter.setText("ab/x.sc/cba")
+    (0, 4, ['A', '.notdef', 'x.sc', 'cba'])
+
+    - Test random edits against splitText
+    >>> import random
+    >>> rng = random.Random(0)
+    >>> cmap = {42:"asterisk", 97:"a"}
+    >>> splitter = IncrementalTextSplitter(cmap)
+    >>> glyphNames = []
+    >>> text = ""
+    >>> failures = []
+    >>> for i in range(3000):
+    ...     start = rng.randint(0, len(text))
+    ...     end = rng.randint(start, min(len(text), start + 4))
+    ...     newText = "".join(rng.choice("/ ab*") for j in range(rng.randint(0, 4)))
+    ...     text = text[:start] + newText + text[end:]
+    ...     change = splitter.setText(text)
+    ...     if change is not None:
+    ...         glyphStart, length, inserted = change
+    ...         glyphNames[glyphStart:glyphStart + length] = inserted
+    ...     expected = splitText(text, cmap)
+    ...     if glyphNames != expected or splitter.getGlyphNames() != expected:
+    ...         failures.append(text)
+    >>> failures
+    []
+    """
+
+    def __init__(self, cmap, fallback=".notdef"):
+        self._fallback = fallback
+        self._text = ""
+        # the tokens are the matches of _splitTextRE. for each
+        # token the start in the text and the index of its first
+        # glyph name are stored.
+        self._tokenStarts = OffsetList()
+        self._tokenGlyphStarts = OffsetList()
+        self._glyphNames = []
+        self._needsSplit = True
+        self.setCmap(cmap)
+
+    def setCmap(self, cmap):
+        """
+        Set the cmap, or CmapResolver. The whole text
+        will be split again on the next call to setText.
+        """
+        self._getGlyphNames = _getGlyphNamesGetter(cmap)
+        self._needsSplit = True
+
+    def getText(self):
+        return self._text
+
+    def getGlyphNames(self):
+        """
+        Get the list of glyph names. This is the list used
+        by the splitter, so it must not be modified directly.
+        """
+        return self._glyphNames
+
+    def setText(self, text):
+        """
+        Set the text and return the change to the glyph names.
+        None is returned if the glyph names did not change.
+        """
+        if self._needsSplit:
+            return self._splitAll(text)
+        oldText = self._text
+        if text == oldText:
+            return None
+        # find the changed range
+        limit = min(len(text), len(oldText))
+        prefix = _commonPrefixLength(oldText, text, limit)
+        suffix = _commonSuffixLength(oldText, text, limit - prefix)
+        delta = len(text) - len(oldText)
+        tokenStarts = self._tokenStarts
+        glyphStarts = self._tokenGlyphStarts
+        oldGlyphNames = self._glyphNames
+        # the token that ends at the change can grow, so the
+        # split starts again at the token containing the last
+        # unchanged character. a run of characters is cut there
+        # instead, as each character is a glyph name of its own.
+        if prefix == 0:
+            keptTokens = 0
+            scanStart = 0
+            keptGlyphs = 0
+        else:
+            index = tokenStarts.bisectRight(prefix - 1) - 1
+            tokenStart = tokenStarts[index]
+            if oldText[tokenStart] != "/":
+                keptTokens = index + 1
+                scanStart = prefix
+                keptGlyphs = glyphStarts[index] + prefix - tokenStart
+            else:
+                keptTokens = index
+                scanStart = tokenStart
+                keptGlyphs = glyphStarts[index]
+        # split until a token starts at a position where the old
+        # text was split in the same way.
+        unchangedStart = len(text) - suffix
+        scannedStarts = []
+        scannedGlyphStarts = []
+        scannedGlyphNames = []
+        tail = None
+        for m in _splitTextRE.finditer(text, scanStart):
+            start = m.start()
+            if start >= unchangedStart:
+                tail = self._findTail(start - delta)
+                if tail is not None:
+                    break
+            scannedStarts.append(start)
+            scannedGlyphStarts.append(keptGlyphs + len(scannedGlyphNames))
+            glyphNames, held = _splitChunk(m.group(0), self._getGlyphNames, self._fallback, True)
+            scannedGlyphNames.extend(glyphNames)
+        if tail is None:
+            tail = (len(tokenStarts), len(oldGlyphNames), [], [])
+        tailIndex, tailGlyphStart, tailTokenStarts, tailGlyphStarts = tail
+        # assemble
+        glyphDelta = keptGlyphs + len(scannedGlyphNames) - tailGlyphStart
+        tokenStarts.replace(keptTokens, tailIndex, scannedStarts + [start + delta for start in tailTokenStarts], delta)
+        glyphStarts.replace(keptTokens, tailIndex, scannedGlyphStarts + [glyphStart + glyphDelta for glyphStart in tailGlyphStarts], glyphDelta)
+        self._glyphNames[keptGlyphs:tailGlyphStart] = scannedGlyphNames
+        self._text = text
+        change = (keptGlyphs, tailGlyphStart - keptGlyphs, scannedGlyphNames)
+        if not change[1] and not change[2]:
+            return None
+        return change
+
+    def _findTail(self, position):
+        # find the old tokens from position on, if the old text was
+        # split at position. a run of characters can be cut anywhere.
+        tokenStarts = self._tokenStarts
+        if position >= len(self._text):
+            return (len(tokenStarts), len(self._glyphNames), [], [])
+        index = tokenStarts.bisectRight(position) - 1
+        tokenStart = tokenStarts[index]
+        glyphStart = self._tokenGlyphStarts[index]
+        if tokenStart == position:
+            return (index, glyphStart, [], [])
+        if self._text[tokenStart] != "/":
+            glyphStart += position - tokenStart
+            return (index + 1, glyphStart, [position], [glyphStart])
+        return None
+
+    def _splitAll(self, text):
+        oldCount = len(self._glyphNames)
+        tokenStarts = []
+        glyphStarts = []
+        glyphNames = []
+        for m in _splitTextRE.finditer(text):
+            tokenStarts.append(m.start())
+            glyphStarts.append(len(glyphNames))
+            names, held = _splitChunk(m.group(0), self._getGlyphNames, self._fallback, True)
+            glyphNames.extend(names)
+        self._text = text
+        self._tokenStarts = OffsetList(tokenStarts)
+        self._tokenGlyphStarts = OffsetList(glyphStarts)
+        # the list object is kept
+        self._glyphNames[:] = glyphNames
+        self._needsSplit = False
+        return (0, oldCount, list(glyphNames))
 
 
 if __name__ =="__main__":
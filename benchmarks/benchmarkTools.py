@@ -0,0 +1,70 @@
+"""
+Helpers shared by the benchmark scripts in this directory.
+
+The scripts are plain Python and only exercise the pure Python
+tools, so they run without AppKit. Run them from anywhere:
+
+    python benchmarks/glyphCellGrid.py
+
+Each script times the code as it was before the change it
+covers (reproduced inline) against the current tools and
+prints a table of the best time of several runs.
+"""
+
+import os
+import sys
+import time
+
+# time the working copy, not an installed defconAppKit
+libDirectory = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Lib")
+if libDirectory not in sys.path:
+    sys.path.insert(0, libDirectory)
+
+
+def bestOf(function, repeat=5, number=1):
+    """
+    Get the best time, in seconds, of one call to function.
+    """
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        for j in range(number):
+            function()
+        duration = (time.perf_counter() - start) / number
+        if best is None or duration < best:
+            best = duration
+    return best
+
+
+def formatTime(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 1e-3:
+        return "%.2f us" % (seconds * 1e6)
+    if seconds < 1:
+        return "%.2f ms" % (seconds * 1e3)
+    return "%.2f s" % seconds
+
+
+def printTable(title, rows):
+    """
+    Print rows of (label, before, after) times.
+    Either time may be None when it was not measured.
+    """
+    print(title)
+    header = ("", "before", "after", "speedup")
+    lines = [header]
+    for label, before, after in rows:
+        if before is not None and after:
+            speedup = before / after
+            if speedup < 10:
+                speedup = "%.1fx" % speedup
+            else:
+                speedup = "%.0fx" % speedup
+        else:
+            speedup = "-"
+        lines.append((label, formatTime(before), formatTime(after), speedup))
+    widths = [max(len(line[i]) for line in lines) for i in range(len(header))]
+    for line in lines:
+        print("  " + line[0].ljust(widths[0]) + "".join("  " + text.rjust(width) for text, width in zip(line[1:], widths[1:])))
+    print()
@@ -0,0 +1,111 @@
+"""
+Per keystroke work in the feature text editor on large files.
+
+Before: every edit colored the edited lines and then searched the
+whole document for feature and table blocks to update the pop up.
+After: FeatureTextHighlighter relexes from the edited line until
+the lexer state converges and the edit is queued for the symbol
+index, which searches the text on its worker thread.
+
+The before side is only timed up to BEFORE_LIMIT characters.
+"""
+
+import re
+
+import benchmarkTools
+from featureTextRuns import makeFeatureText, breakFeatureTextIntoRunsBefore
+from defconAppKit.tools.featureTextTools import FeatureTextHighlighter
+from defconAppKit.tools.featureTextSymbolIndex import FeatureTextSymbolIndex
+
+BEFORE_LIMIT = 200000
+
+_commentSubRE = re.compile(
+    "(#.*)$",
+    re.MULTILINE
+)
+_stringRE = re.compile(
+    "(\".*\")"
+)
+_blockOpenScanRE = re.compile(
+    "([\s;]+)"
+    "(feature|table)"
+    "\s+"
+    "([A-Za-z0-9]+)"
+    "\s*"
+    "(\{)"
+)
+_lineEndRE = re.compile("([\r\n]+)", re.MULTILINE)
+
+
+def findBlockOpenLineStarts(text):
+    strippedText = _commentSubRE.sub("", text)
+    strippedText = _stringRE.sub("", strippedText)
+    found = []
+    truncatedText = strippedText
+    offset = 0
+    while True:
+        m = _blockOpenScanRE.search(truncatedText)
+        if m is None:
+            break
+        else:
+            start, end = m.span()
+            start += len(m.group(1))
+            truncatedText = truncatedText[end:]
+            start += offset
+            end += offset
+            offset = end
+            lineBreaks = _lineEndRE.findall(strippedText[:start])
+            lineNumber = len("".join(lineBreaks))
+            lines = text.splitlines()[:lineNumber]
+            characters = sum([len(line) for line in lines])
+            characterIndex = characters + len("".join(lineBreaks[:len(lines)]))
+            found.append((m.group(3), characterIndex))
+    return found
+
+
+def makeBlockText(size):
+    # split the kerning into many features so there are blocks to find
+    lines = makeFeatureText(size).splitlines()
+    for i in range(0, len(lines), 200):
+        if lines[i].startswith("        pos"):
+            lines[i] = "} kern;\nfeature kern {" + lines[i]
+    return "\n".join(lines)
+
+
+def keystrokeBefore(text, start, insertion):
+    newText = text[:start] + insertion + text[start:]
+    lineStart = newText.rfind("\n", 0, start) + 1
+    lineEnd = newText.find("\n", start + len(insertion))
+    breakFeatureTextIntoRunsBefore(newText[lineStart:lineEnd])
+    findBlockOpenLineStarts(newText)
+
+
+def run(sizes=(200000, 2000000)):
+    rows = []
+    for size in sizes:
+        text = makeBlockText(size)
+        # an edit in the middle of a kerning line
+        start = text.find("pos", len(text) // 2) + 4
+        highlighter = FeatureTextHighlighter(text)
+        symbolIndex = FeatureTextSymbolIndex(delay=60)
+        symbolIndex.textChanged(text)
+        for label, insertion in (("type a character", "x"), ("type a line break", "\n")):
+            typed = text[:start] + insertion + text[start:]
+
+            def after():
+                # type and delete, so the text is the same after each call
+                highlighter.replaceRange(typed, start, 0, len(insertion))
+                symbolIndex.textEdited(start, 0, insertion)
+                highlighter.replaceRange(text, start, len(insertion), 0)
+                symbolIndex.textEdited(start, len(insertion), "")
+
+            before = None
+            if size <= BEFORE_LIMIT:
+                before = benchmarkTools.bestOf(lambda: keystrokeBefore(text, start, insertion), repeat=1)
+            rows.append(("%s, %d KB" % (label, size // 1000), before, benchmarkTools.bestOf(after, number=100) / 2))
+        symbolIndex.close()
+    benchmarkTools.printTable("Work on the main thread per keystroke", rows)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,110 @@
+"""
+Breaking generated kerning feature files into highlighting runs.
+
+Before: each run type was found by searching the text and slicing
+off everything up to the end of the match, so every pass copied
+the rest of the document for each match.
+After: breakFeatureTextIntoRuns scans with finditer and absolute
+offsets.
+
+The before side is quadratic, so it is only timed up to
+BEFORE_LIMIT characters.
+"""
+
+import re
+
+import benchmarkTools
+from defconAppKit.tools.featureTextTools import breakFeatureTextIntoRuns, _keywords, _tokenRE, _classNameRE, _includeRE, _stringRE, _commentRE
+
+BEFORE_LIMIT = 1000000
+
+_keywordRE = re.compile(
+    "^"
+    "(" + "|".join(_keywords.splitlines()) + ")"
+    "[>\s;(]+"
+    "|"
+    "[<\s;]+"
+    "(" + "|".join(_keywords.splitlines()) + ")"
+    "[>\s;(]+"
+)
+
+
+def findRuns(text, pattern):
+    runs = []
+    offset = 0
+    while 1:
+        m = pattern.search(text)
+        if m is None:
+            break
+        else:
+            start, end = m.span()
+            runs.append((start + offset, end + offset))
+            offset = offset + end
+            text = text[end:]
+            if not text:
+                break
+    return runs
+
+
+def breakFeatureTextIntoRunsBefore(text):
+    runs = []
+    runs.append(("tokens", findRuns(text, _tokenRE)))
+    runs.append(("keywords", findRuns(text, _keywordRE)))
+    runs.append(("classNames", findRuns(text, _classNameRE)))
+    runs.append(("includes", findRuns(text, _includeRE)))
+    runs.append(("strings", findRuns(text, _stringRE)))
+    runs.append(("comments", findRuns(text, _commentRE)))
+    return runs
+
+
+def makeFeatureText(size):
+    lines = [
+        "# generated kerning",
+        "languagesystem DFLT dflt;",
+        "include(classes.fea);",
+        "table name {",
+        "    nameid 9 \"Designer\";",
+        "} name;",
+    ]
+    length = sum(len(line) + 1 for line in lines)
+    index = 0
+    while length < size / 2:
+        line = "@kern%d = [a%d b%d c%d.alt d%d];" % (index, index, index, index, index)
+        lines.append(line)
+        length += len(line) + 1
+        index += 1
+    lines.append("feature kern {")
+    lines.append("    lookup kern1 {")
+    pair = 0
+    while length < size:
+        if pair % 50 == 0:
+            line = "        # class %d" % pair
+        else:
+            line = "        pos @kern%d @kern%d -%d;" % (pair % index, (pair * 7) % index, pair % 90)
+        lines.append(line)
+        length += len(line) + 1
+        pair += 1
+    lines.append("    } kern1;")
+    lines.append("} kern;")
+    return "\n".join(lines)
+
+
+def run(sizes=(100000, 1000000, 10000000)):
+    rows = []
+    for size in sizes:
+        text = makeFeatureText(size)
+        assert breakFeatureTextIntoRuns(text[:10000]) == breakFeatureTextIntoRunsBefore(text[:10000])
+        after = benchmarkTools.bestOf(lambda: breakFeatureTextIntoRuns(text), repeat=3)
+        before = None
+        if size <= BEFORE_LIMIT:
+            before = benchmarkTools.bestOf(lambda: breakFeatureTextIntoRunsBefore(text), repeat=1)
+        if size < 1000000:
+            label = "%d KB" % (size // 1000)
+        else:
+            label = "%d MB" % (size // 1000000)
+        rows.append((label, before, after))
+    benchmarkTools.printTable("breakFeatureTextIntoRuns on generated kerning features", rows)
+
+
+if __name__ == "__main__":
+    run()
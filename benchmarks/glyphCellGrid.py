@@ -0,0 +1,64 @@
+"""
+Hit testing in the glyph cell view.
+
+Before: every cell rect that had been drawn was stored in a dict
+and hit testing scanned the dict with a point-in-rect test. After
+scrolling through the whole view the dict holds every cell.
+After: GlyphCellGrid computes the index from the point.
+"""
+
+import random
+
+import benchmarkTools
+from defconAppKit.tools.glyphCellGrid import GlyphCellGrid
+
+
+def pointInRect(point, rect):
+    x, y = point
+    (left, top), (width, height) = rect
+    return left <= x < left + width and top <= y < top + height
+
+
+def buildClickRects(grid):
+    clickRectsToIndex = {}
+    for index in range(grid.cellCount):
+        clickRectsToIndex[grid.rectForIndex(index)] = index
+    return clickRectsToIndex
+
+
+def findGlyphForLocation(clickRectsToIndex, location):
+    found = None
+    for rect, index in clickRectsToIndex.items():
+        if pointInRect(location, rect):
+            found = index
+            break
+    return found
+
+
+def run(cellCount=40000, columnCount=20, cellSize=50, pointCount=20):
+    grid = GlyphCellGrid(cellWidth=cellSize, cellHeight=cellSize, columnCount=columnCount, cellCount=cellCount)
+    clickRectsToIndex = buildClickRects(grid)
+    random.seed(1)
+    height = grid.getRowCount() * cellSize
+    points = [(random.uniform(0, columnCount * cellSize), random.uniform(0, height)) for i in range(pointCount)]
+    for point in points:
+        assert findGlyphForLocation(clickRectsToIndex, point) == grid.indexForPoint(point)
+
+    def before():
+        for point in points:
+            findGlyphForLocation(clickRectsToIndex, point)
+
+    def after():
+        for point in points:
+            grid.indexForPoint(point)
+
+    rows = [(
+        "indexForPoint",
+        benchmarkTools.bestOf(before, repeat=3) / pointCount,
+        benchmarkTools.bestOf(after, number=1000) / pointCount
+    )]
+    benchmarkTools.printTable("Hit testing %d cells, time per point" % cellCount, rows)
+
+
+if __name__ == "__main__":
+    run()
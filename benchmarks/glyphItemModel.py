@@ -0,0 +1,89 @@
+"""
+Editing 10,000 items of a glyph collection.
+
+Before: each append, insert or delete was its own array controller
+edit. Every edit posted an arrangedObjects change and the cell view
+rebuilt its glyph name list from the arranged items.
+After: a batch goes through GlyphItemModel in one call and the
+view is updated once.
+"""
+
+import benchmarkTools
+from defconAppKit.tools.glyphItemModel import GlyphItemModel
+
+
+class Item(object):
+
+    def __init__(self, glyphName):
+        self._name = glyphName
+
+    def Name(self):
+        return self._name
+
+
+class ArrangedObjects(object):
+
+    def __init__(self, glyphNames):
+        self.items = [Item(glyphName) for glyphName in glyphNames]
+        self.observe()
+
+    def observe(self):
+        # what the cell view did for every arrangedObjects change
+        self.glyphNames = [item.Name() for item in self.items]
+
+    def delete(self, index):
+        del self.items[index]
+        self.observe()
+
+    def insert(self, index, item):
+        self.items.insert(index, item)
+        self.observe()
+
+
+def run(itemCount=20000, editCount=10000):
+    glyphNames = ["glyph%05d" % i for i in range(itemCount)]
+    newNames = ["new%05d" % i for i in range(editCount)]
+    editIndexes = list(range(0, itemCount, itemCount // editCount))[:editCount]
+    insertIndexes = list(range(0, 2 * editCount, 2))
+    rows = []
+
+    def beforeRemove():
+        arranged = ArrangedObjects(glyphNames)
+        for index in reversed(editIndexes):
+            arranged.delete(index)
+
+    def afterRemove():
+        model = GlyphItemModel(glyphNames)
+        model.remove(editIndexes)
+
+    rows.append(("remove %d" % editCount, benchmarkTools.bestOf(beforeRemove, repeat=1), benchmarkTools.bestOf(afterRemove)))
+
+    def beforeInsert():
+        arranged = ArrangedObjects(glyphNames)
+        for index, glyphName in zip(insertIndexes, newNames):
+            arranged.insert(index, Item(glyphName))
+
+    def afterInsert():
+        model = GlyphItemModel(glyphNames)
+        model.insert(insertIndexes, newNames)
+
+    rows.append(("insert %d" % editCount, benchmarkTools.bestOf(beforeInsert, repeat=1), benchmarkTools.bestOf(afterInsert)))
+
+    def beforeMove():
+        # no move existed, it was a delete and an insert per glyph
+        arranged = ArrangedObjects(glyphNames)
+        for index in reversed(editIndexes):
+            item = arranged.items[index]
+            arranged.delete(index)
+            arranged.insert(0, item)
+
+    def afterMove():
+        model = GlyphItemModel(glyphNames)
+        model.move(editIndexes, 0)
+
+    rows.append(("move %d to the front" % editCount, benchmarkTools.bestOf(beforeMove, repeat=1), benchmarkTools.bestOf(afterMove)))
+    benchmarkTools.printTable("Editing %d of %d items" % (editCount, itemCount), rows)
+
+
+if __name__ == "__main__":
+    run()
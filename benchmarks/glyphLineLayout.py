@@ -0,0 +1,109 @@
+"""
+Redrawing part of a 50,000 glyph proof line.
+
+Before: every redraw walked all of the glyph records, computing
+each glyph rect and storing it for the alternates menu, and drew
+every glyph whatever the dirty rect was.
+After: GlyphLineLayout lays the records out once and a redraw only
+visits the records in the dirty rect. Changing a few records lays
+out the records from the first change on again.
+
+Drawing a glyph is not timed. The before side drew every glyph,
+the after side only draws the visible ones.
+"""
+
+import random
+
+import benchmarkTools
+from defconAppKit.tools.glyphLineLayout import GlyphLineLayout
+
+scale = 0.05
+upm = 1000
+descender = -250
+bufferLeft = bufferTop = 15
+
+
+class GlyphRecord(object):
+
+    def __init__(self, glyph, advanceWidth, xAdvance=0):
+        self.glyph = glyph
+        self.advanceWidth = advanceWidth
+        self.advanceHeight = 0
+        self.xPlacement = 0
+        self.yPlacement = 0
+        self.xAdvance = xAdvance
+        self.yAdvance = 0
+        self.alternates = []
+
+
+def drawBefore(glyphRecords):
+    # the record walk of the old drawRectLeftToRight_
+    alternateRects = {}
+    height = upm * scale
+    left = bufferLeft
+    bottom = bufferTop
+    drawn = 0
+    for recordIndex, glyphRecord in enumerate(glyphRecords):
+        w = glyphRecord.advanceWidth
+        h = glyphRecord.advanceHeight
+        xP = glyphRecord.xPlacement
+        yP = glyphRecord.yPlacement
+        xA = glyphRecord.xAdvance
+        yA = glyphRecord.yAdvance
+        bottom += yP * scale
+        glyphHeight = height + ((h + yA) * scale)
+        glyphLeft = left + (xP * scale)
+        glyphWidth = (w + xA) * scale
+        rect = ((glyphLeft, bottom), (glyphWidth, glyphHeight))
+        alternateRects[rect] = recordIndex
+        zeroZeroPoint = (glyphLeft, bottom + height + (descender * scale))
+        rect = ((-xP, descender - yP), (w, upm))
+        drawn += 1
+        left += glyphWidth
+    return drawn
+
+
+def drawAfter(layout, glyphRecords, xMin, xMax):
+    # the record walk of _drawLayout
+    drawn = 0
+    for index in layout.getVisibleRange(xMin, xMax):
+        glyphRecord = glyphRecords[layout.getRecordIndex(index)]
+        zeroZeroPoint = layout.getZeroZeroPoint(index)
+        translation = layout.getTranslation(index)
+        rect = layout.getGlyphRect(index)
+        drawn += 1
+    return drawn
+
+
+def run(recordCount=50000, dirtyWidth=1000):
+    rng = random.Random(1)
+    glyphRecords = [GlyphRecord("glyph%d" % rng.randrange(500), rng.randint(200, 800), rng.choice((0, 0, -40))) for i in range(recordCount)]
+    rows = []
+    # the view is as wide as the line
+    viewWidth = GlyphLineLayout(glyphRecords, scale, upm, descender, bufferLeft, bufferTop).getWidth() + 2 * bufferLeft
+    # a dirty rect in the middle of the line
+    xMin = viewWidth / 2
+    for rightToLeft in (False, True):
+        direction = "right to left" if rightToLeft else "left to right"
+
+        def layOut():
+            return GlyphLineLayout(glyphRecords, scale, upm, descender, bufferLeft, bufferTop, rightToLeft=rightToLeft, viewWidth=viewWidth)
+
+        layout = layOut()
+        visible = drawAfter(layout, glyphRecords, xMin, xMin + dirtyWidth)
+        assert visible
+        rows.append(("redraw %d points, %s" % (dirtyWidth, direction), benchmarkTools.bestOf(lambda: drawBefore(glyphRecords)), benchmarkTools.bestOf(lambda: drawAfter(layout, glyphRecords, xMin, xMin + dirtyWidth), number=100)))
+        rows.append(("layout pass, %s" % direction, None, benchmarkTools.bestOf(layOut)))
+    # a kerning change in the middle of the line
+    middle = recordCount // 2
+
+    def kern():
+        glyphRecords[middle].xAdvance -= 10
+        layout.updateRecords(glyphRecords, [middle])
+
+    rows.append(("update one record in the middle", None, benchmarkTools.bestOf(kern)))
+    benchmarkTools.printTable("Drawing a %d glyph line, %d glyphs visible" % (recordCount, visible), rows)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,111 @@
+"""
+Completion in the glyph name combo box on a 40,000 glyph font.
+
+Before: every keystroke sorted the glyph names and scanned them,
+for the first name starting with the text when typing and for the
+names the text starts with when deleting.
+After: GlyphNamePrefixIndex keeps the names sorted and bisects.
+"""
+
+import random
+
+import benchmarkTools
+from defconAppKit.tools.glyphNamePrefixIndex import GlyphNamePrefixIndex
+
+
+def makeGlyphNames(count):
+    glyphNames = ["uni%04X" % (0x4E00 + i) for i in range(count - 2000)]
+    for i in range(1000):
+        glyphNames.append("glyph%d" % i)
+        glyphNames.append("glyph%d.alt" % i)
+    return glyphNames
+
+
+def forwardSearch(text, glyphNames):
+    match = None
+    glyphNames = list(sorted(glyphNames))
+    for glyphName in glyphNames:
+        if glyphName.startswith(text):
+            match = glyphName
+            break
+    return match
+
+
+def backspaceSearch(text, glyphNames):
+    match = None
+    glyphNames = list(sorted(glyphNames))
+    matches = []
+    for glyphName in glyphNames:
+        if text.startswith(glyphName):
+            matches.append(glyphName)
+        elif match is not None:
+            break
+    diff = None
+    for m in matches:
+        d = len(m) - len(text)
+        if diff is None or d < diff:
+            match = m
+    return match
+
+
+def run(glyphCount=40000, queryCount=20):
+    glyphNames = makeGlyphNames(glyphCount)
+    random.seed(1)
+    # the dict order of font.keys() is not sorted
+    random.shuffle(glyphNames)
+    index = GlyphNamePrefixIndex(glyphNames)
+    forwardQueries = [glyphName[:5] for glyphName in random.sample(glyphNames, queryCount)]
+    backspaceQueries = [glyphName + ".al" for glyphName in random.sample(glyphNames, queryCount)]
+    for text in forwardQueries:
+        assert forwardSearch(text, glyphNames) == index.firstNameWithPrefix(text)
+    for text in backspaceQueries:
+        assert backspaceSearch(text, glyphNames) == index.longestNameThatIsPrefixOf(text)
+    rows = []
+
+    def beforeForward():
+        for text in forwardQueries:
+            forwardSearch(text, glyphNames)
+
+    def afterForward():
+        for text in forwardQueries:
+            index.firstNameWithPrefix(text)
+
+    rows.append((
+        "typing",
+        benchmarkTools.bestOf(beforeForward, repeat=3) / queryCount,
+        benchmarkTools.bestOf(afterForward, number=1000) / queryCount
+    ))
+
+    def beforeBackspace():
+        for text in backspaceQueries:
+            backspaceSearch(text, glyphNames)
+
+    def afterBackspace():
+        for text in backspaceQueries:
+            index.longestNameThatIsPrefixOf(text)
+
+    rows.append((
+        "deleting",
+        benchmarkTools.bestOf(beforeBackspace, repeat=3) / queryCount,
+        benchmarkTools.bestOf(afterBackspace, number=1000) / queryCount
+    ))
+
+    # a glyph added and removed again, as the font notifications do
+    newNames = ["new%d" % i for i in range(queryCount)]
+
+    def afterEdit():
+        for glyphName in newNames:
+            index.addName(glyphName)
+        for glyphName in newNames:
+            index.removeName(glyphName)
+
+    rows.append((
+        "adding and removing a name",
+        None,
+        benchmarkTools.bestOf(afterEdit, number=100) / queryCount
+    ))
+    benchmarkTools.printTable("Completing glyph names in a %d glyph font, time per query" % glyphCount, rows)
+
+
+if __name__ == "__main__":
+    run()
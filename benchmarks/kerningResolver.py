@@ -0,0 +1,107 @@
+"""
+Kerning a 10,000 glyph line with a font that has 120,000
+class kerning pairs.
+
+Before: the line looked each pair of glyph names up in the kerning
+and ignored the kerning groups, and every kerning change looked up
+all of the pairs again.
+After: KerningResolver resolves glyph and group pairs through
+reverse group maps and caches the values. A change only discards
+the affected values, and GlyphPairIndex finds the pairs in the
+line that need a new value.
+
+The old lookup misses all of the group kerning, so it is only
+listed for its cost. The updates are compared with looking up the
+whole line again with groups, which is what a change cost before
+with correct values.
+"""
+
+import random
+
+import benchmarkTools
+from defconAppKit.tools.kerningResolver import KerningResolver, GlyphPairIndex, firstGroupPrefix, secondGroupPrefix
+
+
+def makeFont(glyphCount=4000, groupCount=400, pairsPerGroup=300, exceptionCount=20000):
+    rng = random.Random(1)
+    glyphNames = ["glyph%d" % i for i in range(glyphCount)]
+    groups = {}
+    for i, glyphName in enumerate(glyphNames):
+        groups.setdefault(firstGroupPrefix + "g%d" % (i % groupCount), []).append(glyphName)
+        groups.setdefault(secondGroupPrefix + "g%d" % ((i * 7) % groupCount), []).append(glyphName)
+    firstGroups = sorted(name for name in groups if name.startswith(firstGroupPrefix))
+    secondGroups = sorted(name for name in groups if name.startswith(secondGroupPrefix))
+    kerning = {}
+    for left in firstGroups:
+        for right in rng.sample(secondGroups, pairsPerGroup):
+            kerning[left, right] = rng.randint(-100, 20)
+    classPairCount = len(kerning)
+    # glyph + glyph, glyph + group and group + glyph exceptions
+    for i in range(exceptionCount):
+        left = rng.choice((rng.choice(glyphNames), rng.choice(firstGroups)))
+        right = rng.choice((rng.choice(glyphNames), rng.choice(secondGroups)))
+        kerning[left, right] = rng.randint(-100, 20)
+    return glyphNames, groups, kerning, classPairCount
+
+
+def run(lineLength=10000):
+    glyphNames, groups, kerning, classPairCount = makeFont()
+    rng = random.Random(2)
+    line = [rng.choice(glyphNames) for i in range(lineLength)]
+    pairs = list(zip(line, line[1:]))
+    pairIndex = GlyphPairIndex(pairs)
+    rows = []
+
+    def kernBefore():
+        return [kerning.get(pair, 0) for pair in pairs]
+
+    def kernCold():
+        resolver = KerningResolver(kerning, groups)
+        return [resolver.get(left, right) for left, right in pairs]
+
+    resolver = KerningResolver(kerning, groups)
+    values = [resolver.get(left, right) for left, right in pairs]
+
+    def kernWarm():
+        return [resolver.get(left, right) for left, right in pairs]
+
+    rows.append(("old pair lookup of the line", benchmarkTools.bestOf(kernBefore), None))
+    requery = benchmarkTools.bestOf(kernCold)
+    rows.append(("kern the line, cold cache", None, requery))
+    rows.append(("kern the line, warm cache", None, benchmarkTools.bestOf(kernWarm)))
+
+    def updatePositions(positions):
+        for index in positions:
+            left, right = pairs[index]
+            values[index] = resolver.get(left, right)
+
+    # a class pair used in the line changes
+    changedPair = (firstGroupPrefix + "g0", sorted(right for left, right in kerning if left == firstGroupPrefix + "g0")[0])
+
+    def pairChanged():
+        kerning[changedPair] -= 1
+        lefts, rights = resolver.pairChanged(changedPair)
+        updatePositions(pairIndex.findPairs(lefts, rights))
+
+    rows.append(("update after a class pair change", requery, benchmarkTools.bestOf(pairChanged)))
+    # a glyph moves between two kerning groups
+    movingGlyph = line[0]
+    groupNames = [firstGroupPrefix + "g1", firstGroupPrefix + "g2"]
+
+    def groupChanged():
+        for groupName in groupNames:
+            if movingGlyph in groups[groupName]:
+                groups[groupName].remove(movingGlyph)
+            else:
+                groups[groupName].append(movingGlyph)
+            side, changed = resolver.groupChanged(groupName)
+            updatePositions(pairIndex.findLefts(changed))
+
+    rows.append(("update after a group change", requery, benchmarkTools.bestOf(groupChanged) / len(groupNames)))
+    # the updated values match a new lookup of the whole line
+    assert values == kernCold()
+    benchmarkTools.printTable("Kerning a %d glyph line, %d class pairs, %d pairs in all" % (lineLength, classPairCount, len(kerning)), rows)
+
+
+if __name__ == "__main__":
+    run()
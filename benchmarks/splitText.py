@@ -0,0 +1,104 @@
+"""
+Splitting 1,000,000 characters of text into glyph names.
+
+Before: splitText walked the text one character at a time and
+looked every plain character up in the cmap, checking for a list
+of glyph names each time.
+After: splitText tokenizes with a regular expression and resolves
+runs of plain characters at once, either through a per call cache
+or through a CmapResolver made once for the font.
+"""
+
+import random
+
+import benchmarkTools
+from defconAppKit.tools.textSplitter import splitText, CmapResolver
+
+
+def characterToGlyphName(c, cmap):
+    v = ord(c)
+    v = cmap.get(v)
+    if isinstance(v, list):
+        v = v[0]
+    return v
+
+
+def splitTextBefore(text, cmap, fallback=".notdef"):
+    text = text.replace("//", "/slash ")
+    glyphNames = []
+    compileStack = None
+    for c in text:
+        if c == "/":
+            if compileStack is not None:
+                if compileStack:
+                    glyphNames.append("".join(compileStack))
+            compileStack = []
+        elif compileStack is not None:
+            if c == " ":
+                if compileStack:
+                    glyphNames.append("".join(compileStack))
+                compileStack = None
+            else:
+                compileStack.append(c)
+        else:
+            glyphName = characterToGlyphName(c, cmap)
+            if glyphName is None:
+                glyphName = fallback
+            glyphNames.append(glyphName)
+    if compileStack is not None and compileStack:
+        glyphNames.append("".join(compileStack))
+    return glyphNames
+
+
+# 40,000 ideographs from the BMP and from plane 2
+cjkCodes = list(range(0x4E00, 0x4E00 + 20000)) + list(range(0x20000, 0x20000 + 20000))
+
+
+def makeCmap():
+    # like font.unicodeData, which maps to lists of glyph names
+    cmap = {}
+    for code in range(0x20, 0x7F):
+        cmap[code] = ["glyph%d" % code, "glyph%d.alt" % code]
+    for code in cjkCodes:
+        cmap[code] = ["uni%04X" % code]
+    return cmap
+
+
+def makeTexts(length):
+    rng = random.Random(1)
+    latin = "".join(chr(c) for c in range(0x21, 0x7F) if c != 0x2F) + " "
+    cjk = [chr(code) for code in cjkCodes]
+    texts = []
+    texts.append(("latin", "".join(rng.choice(latin) for i in range(length))))
+    texts.append(("CJK", "".join(rng.choice(cjk) for i in range(length))))
+    # proofing strings with glyph names between the characters
+    parts = []
+    size = 0
+    while size < length:
+        if rng.random() < .2:
+            part = rng.choice(("/uni%04X " % rng.choice(cjkCodes), "/a.alt ", "//"))
+        else:
+            part = "".join(rng.choice(latin) for i in range(rng.randint(1, 8)))
+        parts.append(part)
+        size += len(part)
+    texts.append(("mixed with names", "".join(parts)[:length]))
+    return texts
+
+
+def run(length=1000000):
+    cmap = makeCmap()
+    resolver = CmapResolver(cmap)
+    rows = []
+    for label, text in makeTexts(length):
+        expected = splitTextBefore(text, cmap)
+        assert splitText(text, cmap) == expected
+        assert splitText(text, resolver) == expected
+        before = benchmarkTools.bestOf(lambda: splitTextBefore(text, cmap), repeat=3)
+        rows.append((label + ", cmap", before, benchmarkTools.bestOf(lambda: splitText(text, cmap), repeat=3)))
+        rows.append((label + ", resolver", before, benchmarkTools.bestOf(lambda: splitText(text, resolver), repeat=3)))
+    rows.append(("making the resolver", None, benchmarkTools.bestOf(lambda: CmapResolver(cmap))))
+    benchmarkTools.printTable("splitText on %d characters with a %d entry cmap" % (length, len(cmap)), rows)
+
+
+if __name__ == "__main__":
+    run()